@@ -9,22 +9,50 @@ Converts PDF chapters using MinerU CLI to produce structured output:
 - {filename}_model.json — Raw model inference
 - /images/ — Extracted images
 
+Chapters are converted in page windows by one worker process that calls
+MinerU's do_parse with the models loaded once; when the mineru package is
+not importable from this interpreter, the CLI runs once per window.
+
 Usage:
     python convert_chapter_mineru.py 1         # Convert Chapter 1
     python convert_chapter_mineru.py all       # Convert all chapters
+
+Options:
+    --stall-timeout SECONDS   Kill MinerU after this long without page progress (default 300)
+    --chunk-pages N           Pages per MinerU window; finished windows survive a retry (default 16, 0 = whole chapter)
+    --no-publish              With "all": don't publish each chapter to public/data as it finishes
+    --profile [MODE]          cProfile (default) or tracemalloc snapshot of the slowest stage
 """
 
 import os
+import sys
 import subprocess
 import glob
 import re
 import shutil
 import json
+import queue
+import signal
+import threading
+import time
+from importlib.util import find_spec
 from pathlib import Path
 
 # Configuration
 INPUT_DIR = "pdf-processing/chapters"
 OUTPUT_DIR = "public/data/mineru"  # New directory for MinerU CLI output
+STALL_TIMEOUT = int(os.getenv("MINERU_STALL_TIMEOUT", "300"))  # Kill after 5 min without progress
+CHUNK_PAGES = int(os.getenv("MINERU_CHUNK_PAGES", "16"))  # Pages per MinerU run
+PROGRESS_FILE = "progress.json"
+# Printed by the window worker after each finished window
+WINDOW_DONE = "WINDOW_DONE"
+
+# Publishing (footnote repair + export) lives with the other pipeline scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from pipeline_telemetry import span, peak_rss_mb, add_profile_argument, setup_from_args
+
+# tqdm-style counters MinerU prints per stage, e.g. "Layout Predict: 40%|████ | 21/52"
+PROGRESS_PATTERN = re.compile(r'(?P<stage>[A-Za-z][\w \-]*?)?:?\s*(?:\d+%\|[^|]*\|)?\s*(?P<done>\d+)/(?P<total>\d+)')
 
 def check_mineru_installed():
     """Check if MinerU CLI is available."""
@@ -45,27 +73,276 @@ def check_mineru_installed():
         return False
 
 
-def convert_chapter(chapter_num: int) -> bool:
+def find_chapter_pdf(chapter_num: int):
+    """Find the chapter PDF - use regex to match exact chapter number."""
+    for pdf in glob.glob(os.path.join(INPUT_DIR, "Ch*.pdf")):
+        basename = os.path.basename(pdf)
+        # Match ChN_ or ChN. or ChN- (followed by non-digit)
+        match = re.match(r'^Ch(\d+)[_.\-]', basename)
+        if match and int(match.group(1)) == chapter_num:
+            return pdf
+    return None
+
+
+def count_pdf_pages(pdf_path: str):
+    """Page count via pypdf (same dependency as splitter.py). None if unavailable."""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(pdf_path).pages)
+    except Exception:
+        return None
+
+
+def plan_chunks(total_pages, chunk_pages: int):
+    """
+    Split a chapter into inclusive (start, end) page windows.
+
+    MinerU only writes its outputs when a run finishes, so converting in
+    windows is what lets a killed run keep the pages it already finished.
+    """
+    if not total_pages or chunk_pages <= 0:
+        return [(0, None)]
+    return [(start, min(start + chunk_pages, total_pages) - 1)
+            for start in range(0, total_pages, chunk_pages)]
+
+
+def chunk_dir_name(start: int, end) -> str:
+    if end is None:
+        return "pages_all"
+    return f"pages_{start:04d}-{end:04d}"
+
+
+def load_progress(chapter_output_dir: str) -> dict:
+    path = os.path.join(chapter_output_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def save_progress(chapter_output_dir: str, progress: dict):
+    path = os.path.join(chapter_output_dir, PROGRESS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def find_output_file(root: str, suffix: str):
+    """MinerU nests outputs as <out>/<pdf_name>/<method>/<pdf_name><suffix>."""
+    matches = glob.glob(os.path.join(root, "**", f"*{suffix}"), recursive=True)
+    return sorted(matches)[0] if matches else None
+
+
+def _pump_output(stream, events: queue.Queue):
+    """Reader thread: split MinerU output on \\r as well as \\n so tqdm bars are seen live."""
+    pending = b""
+    while True:
+        chunk = stream.read1(4096) if hasattr(stream, "read1") else stream.read(4096)
+        if not chunk:
+            break
+        pending += chunk
+        parts = re.split(rb'[\r\n]', pending)
+        pending = parts.pop()
+        for part in parts:
+            if part.strip():
+                events.put(part.decode('utf-8', errors='replace'))
+    if pending.strip():
+        events.put(pending.decode('utf-8', errors='replace'))
+    events.put(None)
+
+
+def kill_process_group(proc: subprocess.Popen):
+    """Kill MinerU and every process it spawned (it runs in its own session)."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError):
+        proc.kill()
+    proc.wait()
+
+
+def run_with_watchdog(cmd, stall_timeout: float, label: str = "", on_line=None) -> str:
+    """
+    Run MinerU with stdout/stderr streamed live.
+
+    The process is killed only when no page progress has been seen for
+    `stall_timeout` seconds - a slow but healthy chapter keeps running.
+    on_line(line) is called for every output line; returning True counts
+    as progress.
+
+    Returns "ok", "failed" or "stalled".
+    """
+    # A session of its own, so a stall kills MinerU's model workers too
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+    events = queue.Queue()
+    reader = threading.Thread(target=_pump_output, args=(proc.stdout, events), daemon=True)
+    reader.start()
+
+    last_progress = time.monotonic()
+    counters = {}
+    tail = []
+
+    while True:
+        try:
+            line = events.get(timeout=1.0)
+        except queue.Empty:
+            line = ""
+        except KeyboardInterrupt:
+            kill_process_group(proc)
+            raise
+
+        if line is None:
+            break
+
+        if line:
+            tail = (tail + [line])[-20:]
+            if on_line and on_line(line):
+                last_progress = time.monotonic()
+                continue
+            match = PROGRESS_PATTERN.search(line)
+            if match:
+                stage = (match.group('stage') or "pages").strip()
+                done, total = int(match.group('done')), int(match.group('total'))
+                if counters.get(stage) != done:
+                    counters[stage] = done
+                    last_progress = time.monotonic()
+                    print(f"  [{label}] {stage}: {done}/{total}")
+
+        if time.monotonic() - last_progress > stall_timeout:
+            print(f"  [{label}] No progress for {stall_timeout:.0f}s - killing MinerU")
+            kill_process_group(proc)
+            return "stalled"
+
+    returncode = proc.wait()
+    if returncode != 0:
+        print(f"MinerU CLI error (exit {returncode}):")
+        print("\n".join(tail))
+        return "failed"
+    return "ok"
+
+
+def run_window_worker(pdf_path: str, chapter_output_dir: str, windows):
+    """
+    Worker process: convert page windows one after another in-process.
+
+    The MinerU CLI loads its models on every run; calling do_parse here
+    loads them once per chapter. Prints WINDOW_DONE after each window so
+    the parent can record it before the next one starts.
+    """
+    os.environ.setdefault("MINERU_MODEL_SOURCE", "huggingface")
+    from mineru.cli.common import do_parse, read_fn
+    from mineru.utils.config_reader import get_device
+    os.environ.setdefault("MINERU_DEVICE_MODE", get_device())
+
+    pdf_name = Path(pdf_path).stem
+    pdf_bytes = read_fn(Path(pdf_path))
+    for start, end in windows:
+        chunk_root = os.path.join(chapter_output_dir, chunk_dir_name(start, end))
+        do_parse(chunk_root, [pdf_name], [pdf_bytes], ["ch"], start_page_id=start, end_page_id=end)
+        print(f"{WINDOW_DONE} {start} {end}", flush=True)
+
+
+def convert_windows(pdf_path: str, chapter_output_dir: str, windows, stall_timeout: float, on_done) -> str:
+    """
+    Convert page windows under the watchdog, calling on_done(window) as each finishes.
+
+    With MinerU importable here, one worker process converts every window
+    with the models loaded once; otherwise the CLI runs once per window.
+    Returns "ok", "failed" or "stalled".
+    """
+    if find_spec("mineru") is not None:
+        def on_line(line: str) -> bool:
+            if not line.startswith(WINDOW_DONE):
+                return False
+            start, end = line.split()[1:3]
+            on_done((int(start), None if end == "None" else int(end)))
+            return True
+
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", pdf_path, chapter_output_dir]
+        cmd += [f"{start}:{end}" for start, end in windows]
+        print(f"Running MinerU worker: {len(windows)} page windows")
+        return run_with_watchdog(cmd, stall_timeout, label=Path(pdf_path).stem, on_line=on_line)
+
+    for start, end in windows:
+        cmd = ["mineru", "-p", pdf_path, "-o", os.path.join(chapter_output_dir, chunk_dir_name(start, end))]
+        if end is not None:
+            cmd += ["-s", str(start), "-e", str(end)]
+        print(f"Running: {' '.join(cmd)}")
+        status = run_with_watchdog(cmd, stall_timeout, label=chunk_dir_name(start, end))
+        if status != "ok":
+            return status
+        on_done((start, end))
+    return "ok"
+
+
+def merge_chunks(chapter_output_dir: str, pdf_name: str, chunks) -> bool:
+    """Stitch per-window outputs into one chapter, re-basing page_idx."""
+    merged_blocks = []
+    merged_md = []
+    images_dir = os.path.join(chapter_output_dir, "images")
+
+    for start, end in chunks:
+        chunk_root = os.path.join(chapter_output_dir, chunk_dir_name(start, end))
+        cl_path = find_output_file(chunk_root, "_content_list.json")
+        if not cl_path:
+            print(f"  ✗ {chunk_dir_name(start, end)}: content_list missing")
+            return False
+
+        with open(cl_path, 'r', encoding='utf-8') as f:
+            blocks = json.load(f)
+        for block in blocks:
+            if 'page_idx' in block:
+                block['page_idx'] += start
+        merged_blocks.extend(blocks)
+
+        md_path = find_output_file(chunk_root, ".md")
+        if md_path:
+            with open(md_path, 'r', encoding='utf-8') as f:
+                merged_md.append(f.read())
+
+        chunk_images = os.path.join(os.path.dirname(cl_path), "images")
+        if os.path.isdir(chunk_images):
+            os.makedirs(images_dir, exist_ok=True)
+            for name in os.listdir(chunk_images):
+                target = os.path.join(images_dir, name)
+                if not os.path.exists(target):
+                    shutil.copy(os.path.join(chunk_images, name), target)
+
+    with open(os.path.join(chapter_output_dir, f"{pdf_name}_content_list.json"), 'w', encoding='utf-8') as f:
+        json.dump(merged_blocks, f, ensure_ascii=False)
+    with open(os.path.join(chapter_output_dir, f"{pdf_name}.md"), 'w', encoding='utf-8') as f:
+        f.write("\n\n".join(merged_md))
+    return True
+
+
+def convert_chapter(chapter_num: int, stall_timeout: float = STALL_TIMEOUT,
+                    chunk_pages: int = CHUNK_PAGES) -> bool:
     """
     Convert a single chapter PDF using MinerU CLI.
+
+    The PDF is converted in page windows of `chunk_pages`; finished windows
+    are recorded in progress.json, so re-running after a stall resumes from
+    the first unfinished window instead of starting over.
     
     Args:
         chapter_num: Chapter number (1-15)
+        stall_timeout: Seconds without page progress before MinerU is killed
+        chunk_pages: Pages per MinerU run (0 = whole chapter in one run)
         
     Returns:
         True if successful
     """
-    # Find the PDF - use regex to match exact chapter number
-    all_pdfs = glob.glob(os.path.join(INPUT_DIR, "Ch*.pdf"))
-    pdf_path = None
-    
-    for pdf in all_pdfs:
-        basename = os.path.basename(pdf)
-        # Match ChN_ or ChN. or ChN- (followed by non-digit)
-        match = re.match(r'^Ch(\d+)[_.\-]', basename)
-        if match and int(match.group(1)) == chapter_num:
-            pdf_path = pdf
-            break
+    with span("convert", chapter=f"Ch{chapter_num}") as s:
+        ok = _convert_chapter(chapter_num, stall_timeout, chunk_pages, s)
+        s.fields["success"] = ok
+        return ok
+
+
+def _convert_chapter(chapter_num: int, stall_timeout: float, chunk_pages: int, s) -> bool:
+    pdf_path = find_chapter_pdf(chapter_num)
     
     if not pdf_path:
         print(f"ERROR: No PDF found for Chapter {chapter_num} in {INPUT_DIR}")
@@ -82,24 +359,44 @@ def convert_chapter(chapter_num: int) -> bool:
     print(f"{'='*60}")
     
     try:
-        # Run MinerU CLI
-        cmd = [
-            "mineru",
-            "-p", pdf_path,
-            "-o", chapter_output_dir
-        ]
-        
-        print(f"Running: {' '.join(cmd)}")
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=900  # 15 minute timeout per chapter
-        )
-        
-        if result.returncode != 0:
-            print(f"MinerU CLI error:\n{result.stderr}")
+        total_pages = count_pdf_pages(pdf_path)
+        chunks = plan_chunks(total_pages, chunk_pages)
+        s.bytes_read = os.path.getsize(pdf_path)
+        s.items = total_pages or 0
+
+        # Completed windows only count if they were planned the same way
+        progress = load_progress(chapter_output_dir)
+        if progress.get("pdf") != pdf_name or progress.get("chunks") != [list(c) for c in chunks]:
+            progress = {"pdf": pdf_name, "chunks": [list(c) for c in chunks], "completed": []}
+        completed = {tuple(c) for c in progress["completed"]}
+
+        if completed:
+            print(f"Resuming: {len(completed)}/{len(chunks)} page windows already converted")
+
+        pending = [c for c in chunks if c not in completed]
+        for start, end in pending:
+            chunk_root = os.path.join(chapter_output_dir, chunk_dir_name(start, end))
+            if os.path.exists(chunk_root):
+                # Partial output from a killed run - MinerU cannot resume mid-window
+                shutil.rmtree(chunk_root)
+
+        def window_done(window):
+            completed.add(window)
+            progress["completed"] = sorted(list(c) for c in completed)
+            save_progress(chapter_output_dir, progress)
+
+        if pending:
+            with span("mineru_windows", chapter=f"Ch{chapter_num}") as ws:
+                status = convert_windows(pdf_path, chapter_output_dir, pending, stall_timeout, window_done)
+                ws.items = len(completed) - (len(chunks) - len(pending))
+                ws.fields.update(result=status, child_peak_rss_mb=peak_rss_mb(children=True))
+            if status != "ok" or len(completed) < len(chunks):
+                if status == "stalled":
+                    print(f"ERROR: Chapter {chapter_num} stalled; "
+                          f"{len(completed)}/{len(chunks)} page windows kept for retry")
+                return False
+
+        if not merge_chunks(chapter_output_dir, pdf_name, chunks):
             return False
         
         # Verify expected outputs exist
@@ -112,6 +409,7 @@ def convert_chapter(chapter_num: int) -> bool:
             filepath = os.path.join(chapter_output_dir, filename)
             if os.path.exists(filepath):
                 size = os.path.getsize(filepath)
+                s.bytes_written += size
                 print(f"  ✓ {filename} ({size:,} bytes)")
             else:
                 print(f"  ✗ {filename} (missing)")
@@ -132,19 +430,25 @@ def convert_chapter(chapter_num: int) -> bool:
         print(f"\n✓ Chapter {chapter_num} conversion complete!")
         return True
         
-    except subprocess.TimeoutExpired:
-        print(f"ERROR: Timeout processing Chapter {chapter_num}")
-        return False
     except Exception as e:
         print(f"ERROR: {e}")
         return False
 
 
-def convert_all_chapters():
-    """Convert all chapter PDFs."""
+def convert_all_chapters(stall_timeout: float = STALL_TIMEOUT, chunk_pages: int = CHUNK_PAGES,
+                         publish: bool = True) -> bool:
+    """
+    Convert all chapter PDFs.
+
+    Each chapter is footnote-repaired and published to public/data as soon
+    as it converts, so readers get it without waiting for the whole batch.
+
+    Returns:
+        True if every chapter converted
+    """
     
     if not check_mineru_installed():
-        return
+        return False
     
     # Ensure output directory exists
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -153,7 +457,7 @@ def convert_all_chapters():
     pdf_files = glob.glob(os.path.join(INPUT_DIR, "Ch*.pdf"))
     if not pdf_files:
         print(f"No PDFs found in {INPUT_DIR}")
-        return
+        return False
     
     # Extract chapter numbers
     chapters = []
@@ -167,10 +471,17 @@ def convert_all_chapters():
     
     successful = 0
     failed = 0
+    published = 0
+    
+    if publish:
+        from publish_chapter import publish_chapter
     
     for ch_num in chapters:
-        if convert_chapter(ch_num):
+        if convert_chapter(ch_num, stall_timeout, chunk_pages):
             successful += 1
+            if publish and publish_chapter(os.path.join(OUTPUT_DIR, f"Ch{ch_num}"), ch_num,
+                                           name=Path(find_chapter_pdf(ch_num)).stem):
+                published += 1
         else:
             failed += 1
     
@@ -179,28 +490,48 @@ def convert_all_chapters():
     print(f"{'='*60}")
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
+    if publish:
+        print(f"Published: {published}")
+    return failed == 0
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+
+    if sys.argv[1:2] == ["--worker"]:
+        # convert_windows() runs this file as its window worker: PDF, output dir, start:end...
+        run_window_worker(sys.argv[2], sys.argv[3],
+                          [(int(w.split(":")[0]), None if w.split(":")[1] == "None" else int(w.split(":")[1]))
+                           for w in sys.argv[4:]])
+        sys.exit(0)
+    
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("target", nargs="?")
+    parser.add_argument("--stall-timeout", type=float, default=STALL_TIMEOUT)
+    parser.add_argument("--chunk-pages", type=int, default=CHUNK_PAGES)
+    parser.add_argument("--no-publish", action="store_true")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
     
-    if len(sys.argv) < 2:
+    if not args.target:
         print(__doc__)
         print("\nAvailable chapters:")
         for pdf in sorted(glob.glob(os.path.join(INPUT_DIR, "Ch*.pdf"))):
             print(f"  - {os.path.basename(pdf)}")
         sys.exit(1)
     
-    arg = sys.argv[1].lower()
+    arg = args.target.lower()
     
     if arg == "all":
-        convert_all_chapters()
+        ok = convert_all_chapters(args.stall_timeout, args.chunk_pages, publish=not args.no_publish)
     else:
         try:
             ch_num = int(arg)
-            if check_mineru_installed():
-                convert_chapter(ch_num)
         except ValueError:
             print(f"Invalid argument: {arg}")
-            print("Usage: python convert_chapter_mineru.py <chapter_number|all>")
+            print("Usage: python convert_chapter_mineru.py <chapter_number|all> [--stall-timeout S] [--chunk-pages N]")
             sys.exit(1)
+        ok = check_mineru_installed() and convert_chapter(ch_num, args.stall_timeout, args.chunk_pages)
+    # pipeline.py and taxprep.py convert go by the exit code
+    sys.exit(0 if ok else 1)
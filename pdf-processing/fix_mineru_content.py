@@ -3,23 +3,29 @@
 MinerU Content Fixer Script with Smart Footnote Recovery
 
 Processes MinerU middle.json to:
-1. Fix heading hierarchy using bbox height
+1. Fix heading hierarchy (scripts/heading_classifier.py: learned height tiers + numbering)
 2. Inject HTML for "CHAPTER X" eyebrow labels
 3. Recover footnotes from discarded_blocks using page position analysis
 4. Output clean Markdown with HTML passthrough
 
 Usage:
-    python fix_mineru_content.py <input_middle.json> <output.md>
+    python fix_mineru_content.py <input_middle.json> <output.md> [--profile [cprofile|tracemalloc]]
 
 Example:
     python fix_mineru_content.py Ch1_Intro_to_Corp_Tax_middle.json Fixed_Chapter_1.md
 """
 
-import json
+import argparse
+import os
 import re
 import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from pipeline_telemetry import span, add_profile_argument, setup_from_args
+from block_store import loads as load_blocks
+from heading_classifier import EYEBROW, BODY, HeadingClassifier
+
 
 def extract_text_from_block(block: dict) -> str:
     """Extract text from a MinerU block (handles nested lines/spans structure)."""
@@ -41,18 +47,31 @@ def extract_text_from_block(block: dict) -> str:
 
 def process_mineru_json(json_path: str, output_md_path: str):
     """Process MinerU middle.json with smart footnote recovery."""
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with span("render_markdown", chapter=Path(json_path).stem, file=json_path) as s:
+        s.bytes_read = os.path.getsize(json_path)
+        pages, total_footnotes = _process_mineru_json(json_path, output_md_path)
+        s.items = pages
+        s.bytes_written = os.path.getsize(output_md_path)
+        s.fields["footnotes"] = total_footnotes
+
+
+def _process_mineru_json(json_path: str, output_md_path: str):
+    # middle.json, or a content list in JSON or .blocks form
+    with open(json_path, 'rb') as f:
+        data = load_blocks(f.read())
     
     full_text = []
     total_footnotes = 0
     
     # Handle different JSON structures
-    pages = data.get('pdf_info', [])
+    pages = data.get('pdf_info', []) if isinstance(data, dict) else []
     if not pages and isinstance(data, list):
         # content_list.json structure - flat array
         pages = [{'preproc_blocks': data}]
+
+    # Heading tiers are learned over the whole chapter before rendering any page
+    classifier = HeadingClassifier.fit(
+        [b for page in pages for b in page.get('preproc_blocks', page.get('blocks', []))])
     
     for page_index, page in enumerate(pages):
         page_content = []
@@ -90,9 +109,7 @@ def process_mineru_json(json_path: str, output_md_path: str):
             # Get geometry
             bbox = block.get('bbox', [0, 0, 0, 0])
             y_position = bbox[1] if len(bbox) > 1 else 0
-            block_height = (bbox[3] - bbox[1]) if len(bbox) >= 4 else 0
             source = block.get('_source', 'main')
-            block_type = block.get('type', 'text')
             
             # 4. LOGIC: Is this a Footnote?
             # Criteria:
@@ -110,28 +127,13 @@ def process_mineru_json(json_path: str, output_md_path: str):
                 
             elif source == 'main':
                 # This is real content - apply hierarchy logic
-                is_title = block_type in ('title', 'heading') or block.get('text_level', 0) > 0
+                level = classifier.level(block, text)
                 
-                if is_title:
-                    # EYEBROW: "CHAPTER X" with explicit HTML
-                    if re.match(r'^CHAPTER\s+\w+$', text, re.IGNORECASE):
-                        page_content.append(f'<div class="chapter-eyebrow">{text}</div>\n')
-                    
-                    # EYEBROW: "PART X" with explicit HTML
-                    elif re.match(r'^PART\s+\w+$', text, re.IGNORECASE):
-                        page_content.append(f'<div class="chapter-eyebrow">{text}</div>\n')
-                    
-                    # H1: Massive titles (height > 50)
-                    elif block_height > 50:
-                        page_content.append(f"# {text}\n")
-                    
-                    # H2: Section headers (height > 15)
-                    elif block_height > 15:
-                        page_content.append(f"## {text}\n")
-                    
-                    # H3: Subsections
-                    else:
-                        page_content.append(f"### {text}\n")
+                if level == EYEBROW:
+                    # EYEBROW: "CHAPTER X" / "PART X" with explicit HTML
+                    page_content.append(f'<div class="chapter-eyebrow">{text}</div>\n')
+                elif level != BODY:
+                    page_content.append(f"{'#' * level} {text}\n")
                 else:
                     # Regular body text
                     page_content.append(f"{text}\n")
@@ -155,23 +157,22 @@ def process_mineru_json(json_path: str, output_md_path: str):
     print(f"✅ Processed {len(pages)} pages")
     print(f"✅ Recovered {total_footnotes} footnotes (using page-position analysis)")
     print(f"✅ Output written to: {output_md_path}")
+    return len(pages), total_footnotes
 
 
 def main():
-    if len(sys.argv) < 3:
-        print(__doc__)
-        print("\nError: Please provide input and output file paths")
-        print("Usage: python fix_mineru_content.py <input.json> <output.md>")
-        sys.exit(1)
-    
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
-    if not Path(input_path).exists():
-        print(f"Error: Input file not found: {input_path}")
+    parser = argparse.ArgumentParser(description="Render MinerU middle.json (or a content list) to markdown")
+    parser.add_argument("input", help="middle.json, content_list.json or .blocks file")
+    parser.add_argument("output", help="Markdown output path")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
+
+    if not Path(args.input).exists():
+        print(f"Error: Input file not found: {args.input}")
         sys.exit(1)
-    
-    process_mineru_json(input_path, output_path)
+
+    process_mineru_json(args.input, args.output)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,4 @@
 import os
-from pypdf import PdfReader, PdfWriter
 
 # Configuration
 INPUT_PDF = "Fundamentals of Corporate Taxation.pdf"
@@ -28,6 +27,8 @@ CHAPTERS = [
 ]
 
 def split_pdf():
+    from pypdf import PdfReader, PdfWriter
+
     if not os.path.exists(INPUT_PDF):
         print(f"Error: {INPUT_PDF} not found.")
         return
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Content-addressed Asset Store
+
+Every MinerU conversion lands in a fresh output/<uuid>/Ch{N}_<Name>/auto/
+tree, so reruns pile up duplicate images and markdown and nothing records
+which run is current. This store keeps one copy of each file:
+
+    .asset-store/objects/<sha256[:2]>/<sha256>   — file contents, once
+    .asset-store/runs.json                       — {"version": 1,
+        "runs": {"<uuid>": {"chapter": 15, "label": "Ch15_S_Corporations", "mtime": 1712345678.9,
+                            "files": {"auto/images/<name>.jpg": "<sha256>", ...}}},
+        "current": {"15": "<uuid>"}, "pinned": {"15": "<uuid>"}}
+
+ingest hashes each run's files into objects/ and replaces them with hard
+links to the stored copy. Identical figures across runs then share one
+inode. Where hard links fail (another filesystem), the run keeps its own
+copy but is still recorded. Files already linked to their object are not
+re-hashed, so ingest is cheap after the first run. Ingested runs are
+read-only: editing a linked file in place would change every run sharing
+it, so fixers write their output to public/data, as they already do.
+
+The newest run of each chapter is current unless --pin chooses another.
+current_run_dirs() is what the build stages read instead of globbing
+every run.
+
+gc keeps the current run plus the newest --keep - 1 older runs of each
+chapter, deletes the other run directories, then removes objects that no
+surviving run references.
+
+Usage:
+    python scripts/asset_store.py ingest
+    python scripts/asset_store.py ingest --pin 15=1a8ed2d4-8a67-456b-a0b9-728a0a83e060
+    python scripts/asset_store.py gc --keep 2 --dry-run
+    python scripts/asset_store.py status
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional
+
+from atomic_io import write_json_atomic
+from pipeline_telemetry import span
+
+OUTPUT_DIR = "output"
+STORE_DIR = ".asset-store"
+OBJECTS_DIR = os.path.join(STORE_DIR, "objects")
+RUNS_PATH = os.path.join(STORE_DIR, "runs.json")
+STORE_VERSION = 1
+DEFAULT_KEEP = 2
+
+RUN_CHAPTER = re.compile(r'^Ch(\d+)_')
+
+
+def object_path(digest: str) -> str:
+    return os.path.join(OBJECTS_DIR, digest[:2], digest)
+
+
+def file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def load_runs() -> dict:
+    if os.path.exists(RUNS_PATH):
+        with open(RUNS_PATH, 'r', encoding='utf-8') as f:
+            runs = json.load(f)
+        if runs.get("version") == STORE_VERSION:
+            return runs
+    return {"version": STORE_VERSION, "runs": {}, "current": {}, "pinned": {}}
+
+
+def find_runs(output_dir: str = OUTPUT_DIR, recorded: Optional[Dict[str, dict]] = None) -> Dict[str, dict]:
+    """uuid -> {"chapter", "label", "path", "mtime"} for each output/<uuid>/Ch{N}_*/ tree.
+
+    Hard-linked files share one mtime across runs, so a run's age is taken
+    from the store once it has been ingested.
+    """
+    recorded = recorded or {}
+    runs = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, "*", "Ch*_*"))):
+        match = RUN_CHAPTER.match(os.path.basename(path))
+        if not match or not os.path.isdir(path):
+            continue
+        run_id = os.path.basename(os.path.dirname(path))
+        mtime = recorded.get(run_id, {}).get("mtime") or max(
+            (os.path.getmtime(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files),
+            default=os.path.getmtime(path))
+        runs[run_id] = {"chapter": int(match.group(1)), "label": os.path.basename(path), "path": path,
+                        "mtime": mtime}
+    return runs
+
+
+def choose_current(found: Dict[str, dict], pinned: Dict[str, str]) -> Dict[str, str]:
+    """Chapter -> run id: the pinned run if it still exists, else the newest."""
+    current = {}
+    for run_id, run in sorted(found.items(), key=lambda item: item[1]["mtime"]):
+        current[str(run["chapter"])] = run_id
+    for chapter, run_id in pinned.items():
+        if run_id in found:
+            current[chapter] = run_id
+    return current
+
+
+def current_run_dirs(output_dir: str = OUTPUT_DIR) -> Dict[int, str]:
+    """Chapter -> output/<uuid>/Ch{N}_<Name> of its current run (newest when the store has no pointer)."""
+    store = load_runs()
+    found = find_runs(output_dir, store["runs"])
+    current = choose_current(found, store["pinned"])
+    return {int(chapter): found[run_id]["path"] for chapter, run_id in current.items()}
+
+
+# ============================================================================
+# INGEST
+# ============================================================================
+
+def store_file(path: str, stats: dict) -> str:
+    """Hash path into objects/ and hard-link it to the stored copy; returns its digest."""
+    digest = file_hash(path)
+    target = object_path(digest)
+    stats["bytes_read"] += os.path.getsize(path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+        stats["stored"] += 1
+        return digest
+
+    if os.path.samefile(path, target):
+        return digest
+    try:
+        # Swap the duplicate for a link to the stored copy; the temp name keeps the swap atomic
+        tmp = f"{path}.link-tmp"
+        os.link(target, tmp)
+        os.replace(tmp, path)
+        stats["deduplicated"] += 1
+        stats["bytes_saved"] += os.path.getsize(target)
+    except OSError:
+        pass
+    return digest
+
+
+def ingest(output_dir: str = OUTPUT_DIR, pins: Optional[Dict[str, str]] = None) -> dict:
+    start = time.time()
+    store = load_runs()
+    found = find_runs(output_dir, store["runs"])
+    stats = {"stored": 0, "deduplicated": 0, "bytes_saved": 0, "bytes_read": 0, "unchanged": 0}
+
+    with span("asset_ingest") as s:
+        for run_id, run in sorted(found.items()):
+            previous = store["runs"].get(run_id, {}).get("files", {})
+            files = {}
+            for root, _, names in os.walk(run["path"]):
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    rel = os.path.relpath(path, run["path"]).replace(os.sep, "/")
+                    digest = previous.get(rel)
+                    # Already a link to its object: nothing to hash
+                    if digest and os.path.exists(object_path(digest)) and os.path.samefile(path, object_path(digest)):
+                        files[rel] = digest
+                        stats["unchanged"] += 1
+                        continue
+                    files[rel] = store_file(path, stats)
+            store["runs"][run_id] = {"chapter": run["chapter"], "label": run["label"], "mtime": run["mtime"],
+                                     "files": files}
+
+        # Runs deleted by hand since the last ingest
+        for run_id in set(store["runs"]) - set(found):
+            del store["runs"][run_id]
+        store["pinned"].update(pins or {})
+        store["pinned"] = {c: r for c, r in store["pinned"].items() if r in found}
+        store["current"] = choose_current(found, store["pinned"])
+        write_json_atomic(RUNS_PATH, store, indent=2)
+        s.items = stats["stored"] + stats["deduplicated"]
+        s.bytes_read = stats["bytes_read"]
+        s.fields.update(deduplicated=stats["deduplicated"], bytes_saved=stats["bytes_saved"])
+
+    print(f"✅ Ingested {len(found)} runs: {stats['stored']} new objects, {stats['deduplicated']} duplicates linked "
+          f"({stats['bytes_saved'] / 1024:.0f} KB saved), {stats['unchanged']} unchanged "
+          f"({time.time() - start:.2f}s)")
+    return store
+
+
+# ============================================================================
+# GARBAGE COLLECTION
+# ============================================================================
+
+def collect(output_dir: str = OUTPUT_DIR, keep: int = DEFAULT_KEEP, dry_run: bool = False) -> List[str]:
+    """Delete runs beyond the retention and unreferenced objects; returns the deleted run ids."""
+    store = ingest(output_dir)
+    found = find_runs(output_dir, store["runs"])
+    by_chapter: Dict[str, List[str]] = {}
+    for run_id, run in found.items():
+        by_chapter.setdefault(str(run["chapter"]), []).append(run_id)
+
+    doomed = []
+    for chapter, run_ids in sorted(by_chapter.items(), key=lambda item: int(item[0])):
+        current = store["current"].get(chapter)
+        older = sorted((r for r in run_ids if r != current), key=lambda r: found[r]["mtime"], reverse=True)
+        doomed.extend(older[max(0, keep - 1):])
+
+    referenced = {digest for run_id, run in store["runs"].items() if run_id not in doomed
+                  for digest in run["files"].values()}
+    orphans = [path for path in glob.glob(os.path.join(OBJECTS_DIR, "*", "*"))
+               if os.path.basename(path) not in referenced]
+    freed = sum(os.path.getsize(p) for p in orphans)
+
+    verb = "Would delete" if dry_run else "Deleted"
+    for run_id in doomed:
+        run = found[run_id]
+        print(f"   {verb} run {run_id} ({run['label']})")
+        if not dry_run:
+            shutil.rmtree(os.path.join(output_dir, run_id))
+            del store["runs"][run_id]
+    if not dry_run:
+        for path in orphans:
+            os.remove(path)
+        write_json_atomic(RUNS_PATH, store, indent=2)
+    print(f"✅ GC (keep {keep}): {verb.lower()} {len(doomed)} runs and {len(orphans)} objects "
+          f"({freed / 1024:.0f} KB)")
+    return doomed
+
+
+def status(output_dir: str = OUTPUT_DIR):
+    store = load_runs()
+    found = find_runs(output_dir, store["runs"])
+    current = set(choose_current(found, store.get("pinned", {})).values())
+    apparent = unique = 0
+    seen = set()
+    for run_id, run in sorted(found.items(), key=lambda item: (item[1]["chapter"], -item[1]["mtime"])):
+        size = 0
+        for root, _, names in os.walk(run["path"]):
+            for name in names:
+                st = os.stat(os.path.join(root, name))
+                size += st.st_size
+                if (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino))
+                    unique += st.st_size
+        apparent += size
+        flags = ("current" if run_id in current else "") + (" pinned" if run_id in store["pinned"].values() else "")
+        ingested = "" if run_id in store["runs"] else " (not ingested)"
+        print(f"  Ch{run['chapter']:<3} {run_id}  {size / 1024:>7.0f} KB  {flags.strip()}{ingested}")
+    print(f"   {len(found)} runs, {apparent / 1024:.0f} KB apparent, {unique / 1024:.0f} KB on disk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate MinerU output runs and garbage-collect old ones")
+    parser.add_argument("command", choices=["ingest", "gc", "status"])
+    parser.add_argument("--output", default=OUTPUT_DIR, help="MinerU output directory")
+    parser.add_argument("--pin", action="append", default=[], metavar="CHAPTER=UUID",
+                        help="Make a run current for its chapter (repeatable)")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP,
+                        help=f"Runs to keep per chapter, current included (default {DEFAULT_KEEP})")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what gc would delete")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        pins = dict(p.split("=", 1) for p in args.pin)
+        ingest(args.output, {c.lstrip("Ch"): r for c, r in pins.items()})
+    elif args.command == "gc":
+        collect(args.output, max(1, args.keep), args.dry_run)
+    else:
+        status(args.output)
+
+
+if __name__ == "__main__":
+    main()
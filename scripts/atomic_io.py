@@ -0,0 +1,38 @@
+"""
+Atomic File Writes
+
+Every pipeline output is written to a temp file in its own directory and
+os.replace()d into place, so the app and the other stages never see a
+half-written file. Lives apart from publish_chapter.py so that the modules
+publish_chapter imports (fix_chapter_footnotes) can use it too.
+
+Usage:
+    from atomic_io import write_atomic, write_json_atomic
+
+    write_json_atomic("public/data/manifest.json", manifest, indent=2)
+"""
+
+import json
+import os
+import tempfile
+
+
+def write_atomic(path: str, data):
+    """Write str/bytes to path via a temp file in the same directory + os.replace."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json_atomic(path: str, data, indent=None):
+    write_atomic(path, json.dumps(data, indent=indent, ensure_ascii=False))
@@ -0,0 +1,163 @@
+"""
+Benchmark fixtures built from the shipped chapters.
+
+The repo ships rendered chapters (public/data/Ch{N}.json, output/*/…/auto/*.md,
+public/data/chapters/ch1_structured.html) but not the MinerU content lists
+they came from. These helpers rebuild MinerU-shaped content_list.json and
+middle.json documents from that text so the CPU-bound stages can be run
+offline without a MinerU install.
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pdf-processing"))
+
+PUBLIC_DATA_DIR = "public/data"
+CH1_HTML = "public/data/chapters/ch1_structured.html"
+
+PAGE_SIZE = [612, 792]
+# In-text footnote references as they survive in MinerU markdown ("attributes.1 The")
+INLINE_REF = re.compile(r'[a-z\.\,\"\”](\d{1,3})(?=\s|$)')
+
+
+def chapter_page_counts() -> Dict[int, int]:
+    """Chapter number -> page count, from the splitter's page ranges."""
+    from splitter import CHAPTERS
+    return {int(re.match(r'Ch(\d+)', label).group(1)): end - start + 1 for start, end, label in CHAPTERS}
+
+
+def load_shipped_chapters() -> Dict[int, dict]:
+    """Chapter number -> {"name", "md_content"} from public/data and the current output/ runs."""
+    chapters = {}
+    for path in sorted(glob.glob(os.path.join(PUBLIC_DATA_DIR, "Ch*.json"))):
+        match = re.match(r'Ch(\d+)\.json$', os.path.basename(path))
+        if not match:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            results = json.load(f).get("results", {})
+        for name, result in results.items():
+            chapters[int(match.group(1))] = {"name": name, "md_content": result.get("md_content", "")}
+
+    from asset_store import current_run_dirs
+    for num, run_dir in sorted(current_run_dirs().items()):
+        for path in sorted(glob.glob(os.path.join(run_dir, "auto", "*.md"))):
+            if num not in chapters:
+                with open(path, 'r', encoding='utf-8') as f:
+                    chapters[num] = {"name": os.path.splitext(os.path.basename(path))[0], "md_content": f.read()}
+    return chapters
+
+
+def markdown_paragraphs(md: str) -> List[str]:
+    return [p.strip() for p in re.split(r'\n\s*\n', md) if p.strip()]
+
+
+def paragraph_pages(paragraphs: List[str], page_count: int) -> List[int]:
+    """Estimated page_idx of each paragraph, spreading them over page_count pages by cumulative length."""
+    per_page = (sum(len(p) for p in paragraphs) or 1) / max(page_count, 1)
+    pages = []
+    seen_chars = 0
+    for para in paragraphs:
+        pages.append(min(int(seen_chars / per_page), page_count - 1))
+        seen_chars += len(para)
+    return pages
+
+
+def markdown_to_content_list(md: str, page_count: int) -> List[dict]:
+    """
+    Split chapter markdown into MinerU content_list blocks.
+
+    Paragraphs are spread over `page_count` pages by cumulative length; each
+    page gets a page_number block and a page_footnote block for every inline
+    reference found on it, as MinerU would emit them.
+    """
+    paragraphs = markdown_paragraphs(md)
+
+    blocks = []
+    page_idx = 0
+    y = 72.0
+    page_refs = []
+
+    def close_page(idx, refs):
+        for offset, num in enumerate(refs):
+            blocks.append({"type": "page_footnote", "text": f"{num} See id. at {num}.",
+                           "bbox": [72, 690 + offset * 12, 540, 700 + offset * 12], "page_idx": idx})
+        blocks.append({"type": "page_number", "text": str(idx + 1), "bbox": [300, 750, 312, 760], "page_idx": idx})
+
+    for para, new_page in zip(paragraphs, paragraph_pages(paragraphs, page_count)):
+        while page_idx < new_page:
+            close_page(page_idx, page_refs)
+            page_idx, page_refs, y = page_idx + 1, [], 72.0
+
+        height = 12.0 * (1 + len(para) // 90)
+        bbox = [72, round(y), 540, round(y + height)]
+        y = min(y + height + 6, 680)
+
+        if para.startswith("#"):
+            blocks.append({"type": "text", "text": para.lstrip("# ").strip(), "text_level": 1,
+                           "bbox": [72, bbox[1], 540, bbox[1] + 18], "page_idx": page_idx})
+        elif para.startswith("<table"):
+            blocks.append({"type": "table", "table_body": para, "table_caption": [], "table_footnote": [],
+                           "img_path": "", "bbox": bbox, "page_idx": page_idx})
+        elif para.startswith("!["):
+            img = re.search(r'\(([^)]+)\)', para)
+            blocks.append({"type": "image", "img_path": img.group(1) if img else "", "image_caption": [],
+                           "image_footnote": [], "bbox": bbox, "page_idx": page_idx})
+        else:
+            blocks.append({"type": "text", "text": para, "bbox": bbox, "page_idx": page_idx})
+            page_refs.extend(int(m.group(1)) for m in INLINE_REF.finditer(para) if 0 < int(m.group(1)) <= 300)
+
+    close_page(page_idx, page_refs)
+    return blocks
+
+
+def content_list_to_middle(blocks: List[dict]) -> dict:
+    """Regroup content_list blocks into middle.json pdf_info pages (lines/spans)."""
+    pages: Dict[int, dict] = {}
+    for block in blocks:
+        idx = block.get("page_idx", 0)
+        page = pages.setdefault(idx, {"page_idx": idx, "page_size": PAGE_SIZE,
+                                      "preproc_blocks": [], "discarded_blocks": []})
+        text = block.get("text", "")
+        middle_block = {
+            "type": "title" if block.get("text_level") else "text",
+            "bbox": block.get("bbox", [0, 0, 0, 0]),
+            "lines": [{"bbox": block.get("bbox", [0, 0, 0, 0]),
+                       "spans": [{"type": "text", "content": line}]}
+                      for line in text.split("\n") if line],
+        }
+        if block.get("type") in ("page_footnote", "page_number", "header"):
+            middle_block["type"] = "discarded"
+            page["discarded_blocks"].append(middle_block)
+        else:
+            page["preproc_blocks"].append(middle_block)
+    return {"pdf_info": [pages[i] for i in sorted(pages)], "_backend": "pipeline", "_version_name": "2.6.8"}
+
+
+def html_paragraphs(html_path: str = CH1_HTML) -> List[str]:
+    """Plain text of each <p>/<h*> element in a Pandoc-style HTML chapter."""
+    with open(html_path, 'r', encoding='utf-8') as f:
+        html = f.read().replace('\n', ' ')
+    elements = re.findall(r'<(p|h[1-4])[^>]*>(.*?)</\1>', html)
+    return [re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', '', body)).strip() for _, body in elements]
+
+
+def build_fixtures() -> List[dict]:
+    """One fixture per shipped chapter: name, content_list, middle, pages."""
+    page_counts = chapter_page_counts()
+    fixtures = []
+    for num, chapter in sorted(load_shipped_chapters().items()):
+        pages = page_counts.get(num, 40)
+        content_list = markdown_to_content_list(chapter["md_content"], pages)
+        fixtures.append({
+            "chapter": num,
+            "name": chapter["name"],
+            "pages": pages,
+            "content_list": content_list,
+            "middle": content_list_to_middle(content_list),
+        })
+    return fixtures
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark Suite
+
+Times the CPU-bound pipeline stages on fixtures rebuilt from the shipped
+chapters (see bench_fixtures.py) — no MinerU install or network needed:
+
+- fix_chapter_footnotes   process_file() on every chapter's content_list.json, cold
+- fix_chapter_footnotes_incremental
+                          the same rerun after one page per chapter changed,
+                          with the previous run's footnotes-state sidecar
+- fix_mineru_content      process_mineru_json() on every chapter's middle.json
+- process_ch1_v2          generate_html_from_json() on the Chapter 1 content list
+- process_ch1_v3          process_html() on ch1_structured.html + content list
+
+For each stage it records wall time (median of --repeat runs), throughput
+(blocks/s, pages/s) and peak Python memory (tracemalloc, separate run), then
+compares against scripts/bench_baseline.json and exits 1 if any stage got
+slower or hungrier than --threshold (default 25%).
+
+Baselines are machine-specific: re-record with --save-baseline after
+changing hardware.
+
+--synthetic runs a scaling sweep instead, on documents from
+synth_content_list.py, and prints throughput per document size so
+super-linear stages stand out.
+
+Usage:
+    python scripts/bench_pipeline.py                    # Compare against baseline
+    python scripts/bench_pipeline.py --save-baseline    # Record a new baseline
+    python scripts/bench_pipeline.py --only fix_chapter_footnotes --repeat 10
+    python scripts/bench_pipeline.py --synthetic 10,100,1000,10000 --repeat 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Benchmarks time the stages themselves; keep their telemetry spans out of the working dir
+os.environ.setdefault("PIPELINE_TELEMETRY", "off")
+
+import bench_fixtures
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+# ============================================================================
+# STAGES
+# Each stage: setup(fixtures, tmp) -> state; run(state); plus block/page counts.
+# setup() runs before every repeat and is not timed.
+# ============================================================================
+
+def setup_fix_chapter_footnotes(fixtures, tmp):
+    from fix_chapter_footnotes import state_path
+    paths = []
+    for fx in fixtures:
+        path = os.path.join(tmp, f"Ch{fx['chapter']}_content_list.json")
+        write_json(path, fx["content_list"])
+        # The previous repeat's sidecar would turn this into an incremental run
+        if os.path.exists(state_path(path)):
+            os.remove(state_path(path))
+        paths.append(path)
+    return paths
+
+
+def setup_fix_chapter_footnotes_incremental(fixtures, tmp):
+    paths = setup_fix_chapter_footnotes(fixtures, tmp)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_fix_chapter_footnotes(paths)
+    # An edit on one page in the middle of each chapter, as after a re-export
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            blocks = json.load(f)
+        texts = [b for b in blocks if b.get('type') == 'text' and b.get('text')]
+        if texts:
+            texts[len(texts) // 2]['text'] += " (revised)"
+        write_json(path, blocks)
+    return paths
+
+
+def run_fix_chapter_footnotes(paths):
+    from fix_chapter_footnotes import process_file
+    for path in paths:
+        process_file(path)
+
+
+def setup_fix_mineru_content(fixtures, tmp):
+    jobs = []
+    for fx in fixtures:
+        path = os.path.join(tmp, f"Ch{fx['chapter']}_middle.json")
+        if not os.path.exists(path):
+            write_json(path, fx["middle"])
+        jobs.append((path, os.path.join(tmp, f"Ch{fx['chapter']}_fixed.md")))
+    return jobs
+
+
+def run_fix_mineru_content(jobs):
+    from fix_mineru_content import process_mineru_json
+    for json_path, md_path in jobs:
+        process_mineru_json(json_path, md_path)
+
+
+def _ch1(fixtures):
+    return next(fx for fx in fixtures if fx["chapter"] == 1)
+
+
+def setup_process_ch1_v2(fixtures, tmp):
+    import process_ch1_v2
+    path = os.path.join(tmp, "ch1_content_list.json")
+    if not os.path.exists(path):
+        write_json(path, _ch1(fixtures)["content_list"])
+    process_ch1_v2.JSON_FILE = path
+    process_ch1_v2.OUTPUT_FILE = os.path.join(tmp, "Ch1_v2.html")
+    return process_ch1_v2
+
+
+def run_process_ch1_v2(module):
+    module.generate_html_from_json()
+
+
+def setup_process_ch1_v3(fixtures, tmp):
+    import process_ch1_v3
+    path = os.path.join(tmp, "ch1_content_list.json")
+    if not os.path.exists(path):
+        write_json(path, _ch1(fixtures)["content_list"])
+    html = _ch1(fixtures).get("html")
+    if html is not None:
+        process_ch1_v3.HTML_PATH = os.path.join(tmp, "ch1.html")
+        with open(process_ch1_v3.HTML_PATH, 'w', encoding='utf-8') as f:
+            f.write(html)
+    else:
+        process_ch1_v3.HTML_PATH = os.path.abspath(bench_fixtures.CH1_HTML)
+    process_ch1_v3.JSON_PATH = path
+    process_ch1_v3.OUTPUT_PATH = os.path.join(tmp, "Ch1_v3.html")
+    return process_ch1_v3
+
+
+def run_process_ch1_v3(module):
+    module.process_html()
+
+
+def book_counts(fixtures):
+    return sum(len(fx["content_list"]) for fx in fixtures), sum(fx["pages"] for fx in fixtures)
+
+
+def ch1_counts(fixtures):
+    ch1 = _ch1(fixtures)
+    return len(ch1["content_list"]), ch1["pages"]
+
+
+STAGES = {
+    "fix_chapter_footnotes": (setup_fix_chapter_footnotes, run_fix_chapter_footnotes, book_counts),
+    "fix_chapter_footnotes_incremental": (setup_fix_chapter_footnotes_incremental, run_fix_chapter_footnotes,
+                                          book_counts),
+    "fix_mineru_content": (setup_fix_mineru_content, run_fix_mineru_content, book_counts),
+    "process_ch1_v2": (setup_process_ch1_v2, run_process_ch1_v2, ch1_counts),
+    "process_ch1_v3": (setup_process_ch1_v3, run_process_ch1_v3, ch1_counts),
+}
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+@contextlib.contextmanager
+def stage_dir(tmp):
+    """Run a stage from its temp dir, so cwd-relative caches and outputs never land in the repo."""
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def measure(name, fixtures, repeat):
+    setup, run, counts = STAGES[name]
+    blocks, pages = counts(fixtures)
+    tmp = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        times = []
+        for _ in range(repeat):
+            state = setup(fixtures, tmp)
+            with stage_dir(tmp), contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                run(state)
+                times.append(time.perf_counter() - start)
+
+        # Memory in a separate run: tracemalloc slows everything down
+        state = setup(fixtures, tmp)
+        tracemalloc.start()
+        with stage_dir(tmp), contextlib.redirect_stdout(io.StringIO()):
+            run(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    median = statistics.median(times)
+    return {
+        "wall_s": round(median, 5),
+        "min_s": round(min(times), 5),
+        "blocks": blocks,
+        "pages": pages,
+        "blocks_per_s": round(blocks / median, 1) if median else None,
+        "pages_per_s": round(pages / median, 1) if median else None,
+        "peak_mem_mb": round(peak / (1 << 20), 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages (empty if none)."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, label in (("wall_s", "time"), ("peak_mem_mb", "memory")):
+            if base.get(key) and res[key] > base[key] * (1 + threshold):
+                regressions.append(f"{name}: {label} {base[key]} -> {res[key]} "
+                                   f"(+{(res[key] / base[key] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_sweep(names, sizes, repeat, seed=0):
+    """Throughput of each stage on synthetic documents of increasing size."""
+    from synth_content_list import generate, to_pandoc_html
+
+    sweep = {name: {} for name in names}
+    print(f"\n{'pages':>8}{'blocks':>10}" + "".join(f"{n[:20]:>22}" for n in names))
+    for pages in sizes:
+        blocks = generate(pages, seed)
+        fixtures = [{"chapter": 1, "name": f"synthetic_{pages}p", "pages": pages, "content_list": blocks,
+                     "middle": bench_fixtures.content_list_to_middle(blocks), "html": to_pandoc_html(blocks)}]
+        row = f"{pages:>8,}{len(blocks):>10,}"
+        for name in names:
+            res = measure(name, fixtures, repeat)
+            sweep[name][pages] = res
+            row += f"{res['pages_per_s']:>15,.0f} pg/s "
+        print(row)
+    return sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU-bound pipeline stages offline")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (median reported)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression ratio (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {os.path.basename(BASELINE_FILE)}")
+    parser.add_argument("--json", help="Also write results to this file")
+    parser.add_argument("--synthetic", help="Scaling sweep over these page counts, e.g. 10,100,1000")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --synthetic documents")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(STAGES)
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        print(f"Unknown stage(s): {', '.join(unknown)}")
+        sys.exit(2)
+
+    if args.synthetic:
+        sweep = run_sweep(names, [int(p) for p in args.synthetic.split(",")], args.repeat, args.seed)
+        if args.json:
+            write_json(args.json, sweep)
+        return
+
+    fixtures = bench_fixtures.build_fixtures()
+    print(f"Fixtures: {len(fixtures)} chapters, "
+          f"{sum(len(f['content_list']) for f in fixtures):,} blocks, {sum(f['pages'] for f in fixtures):,} pages")
+
+    results = {}
+    print(f"\n{'stage':<36}{'median':>10}{'blocks/s':>12}{'pages/s':>10}{'peak MB':>10}")
+    for name in names:
+        res = measure(name, fixtures, args.repeat)
+        results[name] = res
+        print(f"{name:<36}{res['wall_s']:>9.3f}s{res['blocks_per_s']:>12,.0f}{res['pages_per_s']:>10,.0f}{res['peak_mem_mb']:>10.1f}")
+
+    if args.json:
+        write_json(args.json, results)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        write_json(BASELINE_FILE, baseline)
+        print(f"\nBaseline saved to {BASELINE_FILE}")
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        print("\nNo baseline yet - run with --save-baseline")
+        return
+
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ Regressions beyond {args.threshold:.0%}:")
+        for msg in regressions:
+            print(f"  {msg}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
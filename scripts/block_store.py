@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Columnar Block Store
+
+A compact binary alternative to indent=4 content_list.json for MinerU
+blocks, using only the standard library (array + zlib):
+
+    b"MBLK1\\n" | uint32 header length | header JSON | zlib column payloads
+
+Every key becomes a column holding the values of the blocks that have it:
+- type      — dictionary-encoded (one byte per block)
+- page_idx  — int32 array
+- bbox      — flat int32 / float64 array, 4 values per block
+- text, ... — all string values of a key as one NUL-separated UTF-8 blob
+              (char offsets instead if a value contains NUL)
+- anything else (lists, None, mixed types) — one JSON array per column
+
+Each block also records its key order (a "shape"), so unpacking gives back
+exactly the original list: json.dumps(unpack(pack(x)), indent=4) matches
+the input file byte for byte. Columns are stored separately, so
+read_column() can fetch page_idx or type without decoding text.
+
+load_content_list() / save_content_list() dispatch on the extension
+(.blocks or .json) and are what the pipeline scripts use to read and write
+content lists.
+
+Usage:
+    python scripts/block_store.py pack Ch3_content_list.json       # -> Ch3_content_list.blocks
+    python scripts/block_store.py unpack Ch3_content_list.blocks   # -> Ch3_content_list.json
+    python scripts/block_store.py bench                            # Size / load time for the book
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+from itertools import compress, repeat
+from typing import Dict, List
+
+MAGIC = b"MBLK1\n"
+EXTENSION = ".blocks"
+INT32 = (-(1 << 31), (1 << 31) - 1)
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def _typed_array(values: list):
+    """array('i') / array('d') if every value is an int / float, else None."""
+    if all(type(v) is int for v in values):
+        if not values or (min(values) >= INT32[0] and max(values) <= INT32[1]):
+            return array('i', values)
+        return None
+    if all(type(v) is float for v in values):
+        return array('d', values)
+    return None
+
+
+def _encode_column(name: str, values: list):
+    """Return (encoding, extra header fields, raw bytes) for one column."""
+    if name == "bbox" and all(type(v) is list and len(v) == 4 for v in values):
+        flat = _typed_array([c for v in values for c in v])
+        if flat is not None:
+            return "bbox_" + flat.typecode, {}, flat.tobytes()
+
+    if all(type(v) is str for v in values):
+        uniques = sorted(set(values))
+        if len(uniques) <= 255 and len(uniques) * 4 < len(values):
+            index = {v: i for i, v in enumerate(uniques)}
+            return "dict", {"values": uniques}, bytes(index[v] for v in values)
+        if not any("\x00" in v for v in values):
+            return "str0", {}, "\x00".join(values).encode('utf-8')
+        offsets = array('I', [0])
+        total = 0
+        for v in values:
+            total += len(v)
+            offsets.append(total)
+        return "str", {}, offsets.tobytes() + "".join(values).encode('utf-8')
+
+    typed = _typed_array(values)
+    if typed is not None:
+        return typed.typecode, {}, typed.tobytes()
+
+    return "json", {}, json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(blocks: List[dict], level: int = 0) -> bytes:
+    """Pack a content list into the columnar format (level 0 = uncompressed columns)."""
+    shapes: Dict[tuple, int] = {}
+    shape_ids = array('H')
+    columns: Dict[str, list] = {}
+    for block in blocks:
+        keys = tuple(block)
+        shape_ids.append(shapes.setdefault(keys, len(shapes)))
+        for key in keys:
+            columns.setdefault(key, []).append(block[key])
+
+    header = {"count": len(blocks), "shapes": [list(k) for k in shapes], "byteorder": sys.byteorder, "columns": []}
+    header["codec"] = "zlib" if level else "raw"
+    pack = (lambda raw: zlib.compress(raw, level)) if level else bytes
+    payloads = [pack(shape_ids.tobytes())]
+    header["shape_bytes"] = len(payloads[0])
+    for name, values in columns.items():
+        encoding, extra, raw = _encode_column(name, values)
+        payload = pack(raw)
+        header["columns"].append(dict(name=name, encoding=encoding, count=len(values), bytes=len(payload), **extra))
+        payloads.append(payload)
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(payloads)
+
+
+# ============================================================================
+# DECODING
+# ============================================================================
+
+def _read_header(data: bytes):
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a block store file")
+    (length,) = struct.unpack_from("<I", data, len(MAGIC))
+    start = len(MAGIC) + 4
+    return json.loads(data[start:start + length]), start + length
+
+
+def _decode_column(col: dict, raw: bytes, byteorder: str) -> list:
+    encoding = col["encoding"]
+    if encoding == "json":
+        return json.loads(raw)
+    if encoding == "dict":
+        values = col["values"]
+        return [values[i] for i in raw]
+    if encoding == "str0":
+        return raw.decode('utf-8').split("\x00") if col["count"] else []
+    if encoding == "str":
+        offsets = array('I')
+        split = (col["count"] + 1) * offsets.itemsize
+        offsets.frombytes(raw[:split])
+        if byteorder != sys.byteorder:
+            offsets.byteswap()
+        text = raw[split:].decode('utf-8')
+        return [text[offsets[i]:offsets[i + 1]] for i in range(col["count"])]
+
+    typecode = encoding[-1]
+    values = array(typecode)
+    values.frombytes(raw)
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    values = values.tolist()
+    if encoding.startswith("bbox_"):
+        quads = iter(values)
+        return list(map(list, zip(quads, quads, quads, quads)))
+    return values
+
+
+def _columns(data: bytes, names=None):
+    header, offset = _read_header(data)
+    unpack = zlib.decompress if header.get("codec", "zlib") == "zlib" else bytes
+    shape_raw = data[offset:offset + header["shape_bytes"]]
+    offset += header["shape_bytes"]
+    columns = {}
+    for col in header["columns"]:
+        if names is None or col["name"] in names:
+            raw = unpack(data[offset:offset + col["bytes"]])
+            columns[col["name"]] = _decode_column(col, raw, header["byteorder"])
+        offset += col["bytes"]
+    return header, shape_raw, columns
+
+
+def loads(data: bytes) -> List[dict]:
+    """Unpack the columnar format (or parse JSON, if data is not one)."""
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+    header, shape_raw, columns = _columns(data)
+    shape_ids = array('H')
+    shape_ids.frombytes(zlib.decompress(shape_raw) if header.get("codec", "zlib") == "zlib" else shape_raw)
+    if header["byteorder"] != sys.byteorder:
+        shape_ids.byteswap()
+
+    shapes = [tuple(keys) for keys in header["shapes"]]
+    order = _key_order(shapes)
+    if order is None:
+        # Key orders disagree between blocks: assemble block by block
+        iters = {name: iter(values) for name, values in columns.items()}
+        shape_iters = [[iters[k] for k in keys] for keys in shapes]
+        return [dict(zip(shapes[sid], [next(it) for it in shape_iters[sid]])) for sid in shape_ids]
+
+    # Fill a column at a time; inserting keys in a global order consistent with
+    # every shape reproduces each block's own key order
+    blocks = [{} for _ in range(header["count"])]
+    for key in order:
+        has_key = [key in keys for keys in shapes]
+        targets = blocks if all(has_key) else compress(blocks, [has_key[sid] for sid in shape_ids])
+        deque(map(dict.__setitem__, targets, repeat(key), columns[key]), maxlen=0)
+    return blocks
+
+
+def _key_order(shapes: List[tuple]):
+    """One key order consistent with every shape's key order, or None if there is none."""
+    after: Dict[str, set] = {}
+    indegree: Dict[str, int] = {}
+    for keys in shapes:
+        for key in keys:
+            after.setdefault(key, set())
+            indegree.setdefault(key, 0)
+        for a, b in zip(keys, keys[1:]):
+            if b not in after[a]:
+                after[a].add(b)
+                indegree[b] += 1
+    ready = [k for k in indegree if indegree[k] == 0]
+    order = []
+    while ready:
+        key = ready.pop(0)
+        order.append(key)
+        for nxt in sorted(after[key], key=list(indegree).index):
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                ready.append(nxt)
+    return order if len(order) == len(indegree) else None
+
+
+def read_column(path: str, name: str) -> list:
+    """One key's values (for the blocks that have it) without decoding the rest."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        return [b[name] for b in json.loads(data) if name in b]
+    return _columns(data, {name})[2].get(name, [])
+
+
+# ============================================================================
+# FILE API
+# ============================================================================
+
+def load_content_list(path: str) -> List[dict]:
+    """Read a content list from .blocks or .json."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def save_content_list(blocks: List[dict], path: str, level: int = 0):
+    """Write a content list: columnar for .blocks, indent=4 JSON (the MinerU layout) otherwise."""
+    if path.endswith(EXTENSION):
+        data = dumps(blocks, level)
+        with open(path, 'wb') as f:
+            f.write(data)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(blocks, f, indent=4, ensure_ascii=False)
+
+
+def to_json_bytes(path: str) -> bytes:
+    """A content list as the original indent=4 JSON, whichever format it is stored in."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        return data
+    return json.dumps(loads(data), indent=4, ensure_ascii=False).encode('utf-8')
+
+
+def bench(repeat: int = 5):
+    """Whole-book size and load time: indent=4 JSON vs .blocks."""
+    import statistics
+    import tempfile
+    import bench_fixtures
+
+    blocks = [b for fx in bench_fixtures.build_fixtures() for b in fx["content_list"]]
+    tmp = tempfile.mkdtemp(prefix="block-store-")
+    paths = {"json indent=4": os.path.join(tmp, "book_content_list.json"),
+             ".blocks": os.path.join(tmp, "book_content_list.blocks"),
+             ".blocks --level 6": os.path.join(tmp, "book_content_list.z.blocks")}
+    save_content_list(blocks, paths["json indent=4"])
+    save_content_list(blocks, paths[".blocks"])
+    save_content_list(blocks, paths[".blocks --level 6"], level=6)
+    assert load_content_list(paths[".blocks"]) == blocks
+
+    def timed(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+
+    def load_json():
+        with open(paths["json indent=4"], 'r', encoding='utf-8') as f:
+            json.load(f)
+
+    base_size = os.path.getsize(paths["json indent=4"])
+    base_time = timed(load_json)
+    print(f"{len(blocks):,} blocks")
+    print(f"{'format':<26}{'size':>12}{'load':>12}")
+    print(f"{'json indent=4':<26}{base_size / 1024:>9,.0f} KB{base_time * 1000:>10.1f}ms")
+    for name in (".blocks", ".blocks --level 6"):
+        size = os.path.getsize(paths[name])
+        seconds = timed(lambda: load_content_list(paths[name]))
+        print(f"{name:<26}{size / 1024:>9,.0f} KB{seconds * 1000:>10.1f}ms"
+              f"   ({base_size / size:.1f}x smaller, {base_time / seconds:.1f}x faster)")
+    seconds = timed(lambda: read_column(paths[".blocks"], "page_idx"))
+    print(f"{'.blocks page_idx only':<26}{'':>12}{seconds * 1000:>10.1f}ms")
+
+    for path in paths.values():
+        os.remove(path)
+    os.rmdir(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert content lists between JSON and the columnar .blocks format")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("pack", "unpack"):
+        p = sub.add_parser(command)
+        p.add_argument("files", nargs="+")
+        p.add_argument("-o", "--output", help="Output path (single input only)")
+        p.add_argument("--level", type=int, default=0, help="zlib level for pack (0 = uncompressed)")
+    p = sub.add_parser("bench")
+    p.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.repeat)
+        return
+
+    for path in args.files:
+        stem = os.path.splitext(path)[0]
+        target = args.output or stem + (EXTENSION if args.command == "pack" else ".json")
+        blocks = load_content_list(path)
+        if args.command == "pack":
+            save_content_list(blocks, target, args.level)
+        else:
+            with open(target, 'wb') as f:
+                f.write(json.dumps(blocks, indent=4, ensure_ascii=False).encode('utf-8'))
+        print(f"✅ {path} ({os.path.getsize(path):,} bytes) -> {target} ({os.path.getsize(target):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Citation Index Builder
+
+Parses every chapter once for I.R.C. sections, Treasury Regulations, cases
+and Revenue Rulings/Procedures, and writes:
+
+- public/data/citations/Ch{N}.json      — Forward index: {"chapter": "ch-2",
+                                          "citations": [[key, page, record_id, text], ...]}
+- public/data/citations/where-cited.json — Reverse index: {key: {"type", "label",
+                                          "count", "cited": [[chapter_id, page, record_id], ...]}}
+
+Locations use the ids and book pages of the records the app imports (see
+build_record_deltas.py): the page is on the CHAPTER_DEFINITIONS basis, so
+["ch-2", 75, "ch-2-A-1"] is page ch-2-p75, and the record id is the
+deepest section, subsection or sub-subsection of section-tree.json that
+holds the cite. Markdown-only chapters have no section records; their
+cites are filed under the chapter id and estimated pages.
+
+Keys use the search index's canonical citation tokens (§351(a), reg§1.351-1,
+revrul:68-55) plus case:<name>, so the app can cross-link the two. A
+statute cite is also filed under its parents: "every page citing § 351" is
+where-cited["§351"], which includes the § 351(a) and § 351(g)(2) cites.
+
+Matches the data model in src/lib/db.ts (StatuteReference.section "351",
+CaseReference.name/citation, RulingReference.number "68-55").
+
+Usage:
+    python scripts/build_citation_index.py
+    python scripts/build_citation_index.py --lookup "§ 351"
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from atomic_io import write_json_atomic
+from build_search_index import (REG_CITE, RULING_CITE, SECTION_CITE, LIST_ITEM, MARKUP, SKIP_BLOCKS, _with_prefixes,
+                                block_text, chapter_blocks, chapter_first_page, chapter_sources, normalize_text,
+                                ruling_name, tokenize)
+from build_section_tree import chapter_definitions, chapter_tree
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+CITATIONS_DIR = os.path.join(PUBLIC_DATA_DIR, "citations")
+WHERE_CITED = "where-cited.json"
+
+# Party names: capitalized words joined by single spaces ("Indmar Products Co., Inc.")
+PARTY_WORD = r"[A-Z][A-Za-z.'’&-]*,?"
+PARTY = PARTY_WORD + r"(?: (?:(?:of|and|the|&|de) )?" + PARTY_WORD + r"){0,6}"
+REPORTER = (r"(?:U\.S\.|F\.(?: ?\d[a-z]{1,2})?|F\. ?Supp\.(?: ?\d[a-z]{1,2})?|T\.C\.(?: Memo\.)?|B\.T\.A\.|"
+            r"S\. ?Ct\.|Ct\. ?Cl\.|A\.F\.T\.R\.(?: ?2d)?|AFTR(?: ?2d)?|USTC)")
+CASE_CITE = re.compile(
+    r"(" + PARTY + r") v\. (Comm(?:issione)?['’]?r|" + PARTY + r")"
+    r"(?:,? ?(\d{1,4} " + REPORTER + r" \d+(?:, \d+(?:-\d+)?(?=[,;.)]| \(|$))*(?: ?\([^()]{0,40}\d{4}\))?))?")
+LEADING_WORDS = {"see", "in", "cf.", "cf", "the", "but", "also", "and", "accord", "compare", "e.g.,", "e.g.", "under"}
+# Abbreviations that end with a period inside a party name; any other "Word." ends a sentence
+NAME_ABBREVIATIONS = {"co.", "inc.", "corp.", "bros.", "mfg.", "transp.", "ltd.", "nat.", "natl.", "res.", "def.",
+                      "mut.", "jr.", "sr.", "assn.", "ass'n.", "dept.", "est.", "int'l.", "ry.", "r.r.", "comm'r."}
+
+
+def clean_party(name: str) -> str:
+    words = name.strip(" ,").split(" ")
+    # Drop everything up to the last sentence end ("Code. Commissioner v. Clark")
+    for i in range(len(words) - 2, -1, -1):
+        word = words[i].rstrip(",").lower()
+        if word.endswith(".") and word not in NAME_ABBREVIATIONS and word.count(".") == 1 and len(word) > 3:
+            words = words[i + 1:]
+            break
+    while len(words) > 1 and words[0].lower() in LEADING_WORDS:
+        words = words[1:]
+    name = " ".join(words).strip(" ,")
+    if name.endswith(".") and name.rsplit(" ", 1)[-1].lower() not in NAME_ABBREVIATIONS:
+        name = name[:-1]
+    return name
+
+
+def extract_citations(text: str) -> List[dict]:
+    """Every citation in a passage, in order: {"key", "type", "label", "text", ...}."""
+    text = MARKUP.sub(" ", normalize_text(text))
+    found = []
+    taken = []
+
+    def free(match):
+        return not any(match.start() < end and start < match.end() for start, end in taken)
+
+    for match in REG_CITE.finditer(text):
+        section = match.group(1)
+        found.append((match.start(), {"key": _with_prefixes("reg§", section)[0], "type": "regulation",
+                                      "label": f"Treas. Reg. § {section}", "section": section,
+                                      "text": match.group(0).strip()}))
+        taken.append(match.span())
+
+    for match in SECTION_CITE.finditer(text):
+        if not free(match):
+            continue
+        for section in [match.group(1)] + LIST_ITEM.findall(match.group(2) or ""):
+            found.append((match.start(), {"key": "§" + section.lower(), "type": "statute", "label": f"§ {section}",
+                                          "section": section, "text": match.group(0).strip()}))
+        taken.append(match.span())
+
+    for match in RULING_CITE.finditer(text):
+        name = ruling_name(match.group(1))
+        if name not in ("revrul", "revproc") or not match.group(2):
+            continue
+        label = "Rev. Rul." if name == "revrul" else "Rev. Proc."
+        found.append((match.start(), {"key": f"{name}:{match.group(2)}", "type": "ruling",
+                                      "label": f"{label} {match.group(2)}", "number": match.group(2),
+                                      "text": match.group(0).strip()}))
+        taken.append(match.span())
+
+    for match in CASE_CITE.finditer(text):
+        plaintiff = clean_party(match.group(1))
+        defendant = clean_party(match.group(2))
+        if re.match(r"Comm(?:issione)?['’]?r$", defendant):
+            defendant = "Commissioner"
+        if len(plaintiff) < 3 or len(defendant) < 3:
+            continue
+        name = f"{plaintiff} v. {defendant}"
+        entry = {"key": "case:" + name.lower().replace("’", "'"), "type": "case", "label": name,
+                 "name": name, "text": match.group(0).strip()}
+        if match.group(3):
+            entry["citation"] = match.group(3)
+        found.append((match.start(), entry))
+
+    return [entry for _, entry in sorted(found, key=lambda item: item[0])]
+
+
+def parent_keys(key: str) -> List[str]:
+    """§351(a)(1) -> [§351(a), §351]; other keys have no parents."""
+    if key.startswith("§") or key.startswith("reg§"):
+        prefix = "reg§" if key.startswith("reg§") else "§"
+        return _with_prefixes(prefix, key[len(prefix):])[1:]
+    return []
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def block_records(num: int, blocks: List[dict], chapter_def: dict) -> List[str]:
+    """Record id of every block: the deepest section-tree node whose block range holds it, else the chapter."""
+    ids = [f"ch-{num}"] * len(blocks)
+    ranges = chapter_tree(num, blocks, chapter_def)["blocks"]
+    # ch-2-A, then ch-2-A-1, then ch-2-A-1-a: deeper nodes overwrite their parents
+    for record_id, (first, last) in sorted(ranges.items(), key=lambda item: item[0].count("-")):
+        ids[first:last + 1] = [record_id] * (last - first + 1)
+    return ids
+
+
+def record_passages(num: int, kind: str, blocks: List[dict], chapter_def) -> Dict[Tuple[str, int], List[str]]:
+    """(record id, book page) -> the block texts in reading order."""
+    if kind == "content_list" and chapter_def:
+        records = block_records(num, blocks, chapter_def)
+    else:
+        records = [f"ch-{num}"] * len(blocks)
+    first_page = chapter_first_page(num)
+    passages: Dict[Tuple[str, int], List[str]] = {}
+    for block, record_id in zip(blocks, records):
+        if block.get("type") in SKIP_BLOCKS:
+            continue
+        text = block_text(block).strip()
+        if text:
+            passages.setdefault((record_id, first_page + block.get("page_idx", 0)), []).append(text)
+    return passages
+
+
+def build_citation_index(out_dir: str = CITATIONS_DIR) -> dict:
+    start = time.time()
+    where_cited: Dict[str, dict] = {}
+    seen = defaultdict(set)
+    total = 0
+    defs = chapter_definitions()
+
+    with span("citation_index") as s:
+        for num, (kind, raw) in sorted(chapter_sources().items()):
+            s.bytes_read += len(raw)
+            chapter_id = f"ch-{num}"
+            passages = record_passages(num, kind, chapter_blocks(num, kind, raw), defs.get(num))
+            forward = []
+            for (record_id, page), texts in passages.items():
+                for cite in (c for text in texts for c in extract_citations(text)):
+                    forward.append([cite["key"], page, record_id, cite["text"]])
+                    for key in [cite["key"]] + parent_keys(cite["key"]):
+                        entry = where_cited.get(key)
+                        if entry is None:
+                            label = cite["label"] if key == cite["key"] else \
+                                ("Treas. Reg. § " if key.startswith("reg§") else "§ ") + key.split("§", 1)[1]
+                            entry = where_cited[key] = {"type": cite["type"], "label": label, "count": 0, "cited": []}
+                            if cite.get("citation"):
+                                entry["citation"] = cite["citation"]
+                        entry["count"] += 1
+                        location = (chapter_id, page, record_id)
+                        if location not in seen[key]:
+                            seen[key].add(location)
+                            entry["cited"].append(list(location))
+            total += len(forward)
+            write_json_atomic(os.path.join(out_dir, f"Ch{num}.json"), {"chapter": chapter_id, "citations": forward})
+
+        ordered = {key: where_cited[key] for key in sorted(where_cited)}
+        write_json_atomic(os.path.join(out_dir, WHERE_CITED), ordered, indent=1)
+        s.items = total
+
+    by_type = defaultdict(int)
+    for entry in where_cited.values():
+        by_type[entry["type"]] += 1
+    print(f"✅ Citation index: {total:,} citations, {len(where_cited):,} distinct keys "
+          f"({', '.join(f'{n} {t}' for t, n in sorted(by_type.items()))}) in {time.time() - start:.2f}s")
+    return ordered
+
+
+def lookup(query: str, index_dir: str = CITATIONS_DIR):
+    """Resolve a citation as typed ("§ 351", "Rev. Rul. 68-55", "Gregory v. Helvering") to its entry."""
+    with open(os.path.join(index_dir, WHERE_CITED), 'r', encoding='utf-8') as f:
+        where_cited = json.load(f)
+    cites = extract_citations(query)
+    key = cites[0]["key"] if cites else "case:" + query.strip().lower()
+    if key not in where_cited and not cites:
+        tokens = tokenize(query)
+        key = tokens[0] if tokens else key
+    return key, where_cited.get(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the forward and where-cited citation indexes")
+    parser.add_argument("--out", default=CITATIONS_DIR, help="Index directory")
+    parser.add_argument("--lookup", help="Show where a citation is cited (uses the existing index)")
+    args = parser.parse_args()
+
+    if args.lookup:
+        if not os.path.exists(os.path.join(args.out, WHERE_CITED)):
+            print(f"ERROR: No citation index in {args.out} - build it first")
+            sys.exit(1)
+        key, entry = lookup(args.lookup, args.out)
+        if not entry:
+            print(f"Not cited: {key}")
+            return
+        print(f"{entry['label']} ({key}): {entry['count']} citations in {len(entry['cited'])} places")
+        for chapter_id, page, record_id in entry["cited"]:
+            print(f"  {chapter_id}-p{page}  {record_id}")
+        return
+
+    build_citation_index(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Content Block Builder
+
+Parses each chapter's md_content into the typed ContentBlock AST of
+src/types/reader.ts once per build, so the reader renders a section
+without running parseStructuralElements() and parseMarkdownTable() from
+src/services/content-parser.ts on every format. Writes
+public/data/blocks/:
+
+    blocks/Ch{N}.json  — {"chapter": 2,
+                          "sections": [FormattedContent + "letter"],
+                          "markers": [ContentMarker]}
+    blocks/index.json  — {"chapters": {"Ch2": section count, ...}}
+
+Each section is exactly what formatSectionContent() returns for that
+section's text: the section heading, the parsed blocks (headings,
+paragraphs with statute/case/regulation markup, tables, figures, problems,
+notes, case and ruling headers, statute blocks, blockquotes), pageNumbers and
+references. Sections are the "# A. TITLE" headings, levelled by the
+shared HeadingClassifier. Pages are estimated by paragraph length over the
+chapter's page range in CHAPTER_DEFINITIONS, the book pages the app's
+imported pages carry.
+
+markers are db.ts ContentMarker records for the problem, note, case and
+revenue_ruling blocks. A block keeps the page of the paragraph it came from.
+
+The regexes are the TypeScript sources, compiled with JavaScript
+semantics by clean_text.js_regex().
+
+Usage:
+    python scripts/build_content_blocks.py
+    python scripts/build_content_blocks.py --chapter 2 --section A
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+
+from atomic_io import write_json_atomic
+from bench_fixtures import load_shipped_chapters, markdown_paragraphs, paragraph_pages
+from build_section_tree import chapter_definitions
+from clean_text import js_regex, js_trim, utf16_len
+from heading_classifier import HeadingClassifier
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+BLOCKS_DIR = os.path.join(PUBLIC_DATA_DIR, "blocks")
+INDEX_NAME = "index.json"
+TEXTBOOK_ID = "corporate-tax"
+
+SECTION_HEADING = re.compile(r'^([A-H])\.\s+(.+)', re.S)
+# ContentBlock type -> db.ts ContentType
+MARKER_TYPES = {"problem": "problem", "note": "note", "case_header": "case", "ruling_header": "revenue_ruling"}
+
+
+# ============================================================================
+# TEXT PROCESSING (content-parser.ts)
+# ============================================================================
+
+def slugify(text: str) -> str:
+    text = js_regex(r'[^\w\s-]').sub('', text.lower())
+    return js_regex(r'\s+').sub('-', text)[:50]
+
+
+PARAGRAPH_MARKUP = [
+    # Markdown bold and italic
+    (js_regex(r'\*\*([^*]+)\*\*'), r'<strong>\1</strong>'),
+    (js_regex(r'(?<!\*)\*([^*]+)\*(?!\*)'), r'<em>\1</em>'),
+    # § 351 → <span class="statute-ref" data-section="351">§ 351</span>
+    (js_regex(r'(?:IRC\s*)?(?:§|Section)\s*(\d+[A-Za-z]?(?:\([a-z0-9]+\))?)', ignore_case=True),
+     r'<span class="statute-ref" data-section="\1">§ \1</span>'),
+    # Name v. Commissioner
+    (js_regex(r'([A-Z][a-z]+(?:\s+[A-Z]\.?\s*[a-z]*)?)\s+v\.\s+'
+              r'(Commissioner|United States|[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'),
+     r'<span class="case-ref">\1 v. \2</span>'),
+    # Treas. Reg. § 1.351-1
+    (js_regex(r'Treas(?:ury)?\.?\s*Reg(?:ulation)?s?\.?\s*§?\s*([\d.-]+)', ignore_case=True),
+     r'<span class="reg-ref">Treas. Reg. § \1</span>'),
+    # Quoted definitions
+    (js_regex(r'"([^"]+)"'), r'<em class="term">"\1"</em>'),
+]
+
+
+def format_paragraph(text: str) -> str:
+    html = js_trim(text)
+    for pattern, replacement in PARAGRAPH_MARKUP:
+        html = pattern.sub(replacement, html)
+    return html
+
+
+def parse_markdown_table(text: str) -> Optional[dict]:
+    lines = js_trim(text).split('\n')
+    if len(lines) < 2 or '-' not in lines[1] or '|' not in lines[1]:
+        return None
+
+    def split_row(line: str) -> List[str]:
+        cells = [js_trim(c) for c in line.split('|')]
+        # Drop the empty cells a leading/trailing pipe leaves
+        return [c for i, c in enumerate(cells) if not ((i == 0 or i == len(cells) - 1) and c == '')]
+
+    headers = split_row(lines[0])
+    rows = [row for row in map(split_row, lines[2:]) if row]
+    if not headers:
+        return None
+    return {"type": "table", "headers": headers, "rows": rows}
+
+
+HEADING_PATTERNS = [(js_regex(r'^#\s+(.+)'), js_regex(r'^#\s+'), 1),
+                    (js_regex(r'^##\s+(.+)'), js_regex(r'^##\s+'), 2),
+                    (js_regex(r'^###\s+(.+)'), js_regex(r'^###\s+'), 3),
+                    (js_regex(r'^####\s+(.+)'), js_regex(r'^####\s+'), 4)]
+SUBSECTION = js_regex(r'^\d+\.\s+[A-Z]')
+SUBSUBSECTION = js_regex(r'^[a-z]\.\s+[A-Z]')
+CASE_HEADER = js_regex(r'^[A-Z][a-z]+.*\s+v\.\s+(Commissioner|United States|[A-Z])')
+RULING_HEADER = js_regex(r'^Rev(?:enue)?\.?\s*Rul(?:ing)?\.?\s*\d{2,4}-\d+', ignore_case=True)
+RULING_NUMBER = js_regex(r'(\d{2,4}-\d+)')
+PROBLEM = js_regex(r'^Problem', ignore_case=True)
+PROBLEM_NUMBER = js_regex(r'Problem\s*(\d+)?', ignore_case=True)
+NOTE = js_regex(r'^Note\.?$', ignore_case=True)
+INDENTED_STATUTE = js_regex(r'^\s{4,}§?\s*\d+')
+STATUTE_PARAGRAPH = js_regex(r'^\([a-z]\)\s+')
+STATUTE_NUMBER = js_regex(r'§?\s*(\d+[A-Za-z]?)')
+QUOTE_START = js_regex(r'^["\"\']')
+MARKDOWN_QUOTE = js_regex(r'^>\s')
+QUOTE_OPEN = js_regex(r'^["\"\'>]\s*')
+QUOTE_CLOSE = js_regex(r'["\"\']$')
+CAPS_HEADER = js_regex(r'^[A-Z][A-Z\d\s\.\-,:&]+$')
+TABLE_ROW = js_regex(r'^\|')
+PARAGRAPH_BREAK = js_regex(r'\n\n+')
+MARKDOWN_IMAGE = js_regex(r'^!\[([^\]]*)\]\(([^)\s]+)\)\s*([\s\S]*)$')
+
+
+def _heading(level: int, text: str) -> dict:
+    return {"type": "heading", "level": level, "text": text, "anchor": slugify(text)}
+
+
+def parse_paragraph(para: str) -> Optional[dict]:
+    """The ContentBlock parseStructuralElements() makes of one paragraph."""
+    trimmed = js_trim(para)
+    short = utf16_len(trimmed) < 100
+
+    image = MARKDOWN_IMAGE.search(trimmed)
+    if image:
+        # The client swaps the MinerU path for the optimized figure (resolveImageBlocks)
+        block = {"type": "image", "src": image.group(2)}
+        if image.group(1):
+            block["alt"] = image.group(1)
+        if js_trim(image.group(3)):
+            block["caption"] = js_trim(image.group(3))
+        return block
+    for test, prefix, level in HEADING_PATTERNS:
+        if test.search(trimmed):
+            return _heading(level, js_trim(prefix.sub('', trimmed, count=1)))
+    if SUBSECTION.search(trimmed) and short:
+        return _heading(3, trimmed)
+    if SUBSUBSECTION.search(trimmed) and short:
+        return _heading(4, trimmed)
+    if CASE_HEADER.search(trimmed) and short:
+        return {"type": "case_header", "name": trimmed, "page": 0}
+    if RULING_HEADER.search(trimmed):
+        match = RULING_NUMBER.search(trimmed)
+        return {"type": "ruling_header", "number": match.group(1) if match else '', "page": 0}
+    if PROBLEM.search(trimmed):
+        match = PROBLEM_NUMBER.search(trimmed)
+        block = {"type": "problem"}
+        if match and match.group(1):
+            block["number"] = int(match.group(1))
+        block["content"] = trimmed
+        return block
+    if NOTE.search(js_trim(trimmed.split('\n')[0])):
+        return {"type": "note", "content": trimmed}
+    if INDENTED_STATUTE.search(para) or STATUTE_PARAGRAPH.search(trimmed):
+        match = STATUTE_NUMBER.search(trimmed)
+        return {"type": "statute_block", "section": match.group(1) if match else '', "text": trimmed}
+    if QUOTE_START.search(trimmed) or MARKDOWN_QUOTE.search(trimmed):
+        return {"type": "blockquote", "content": QUOTE_CLOSE.sub('', QUOTE_OPEN.sub('', trimmed, count=1), count=1)}
+    if CAPS_HEADER.search(trimmed) and short and utf16_len(trimmed) > 3:
+        return _heading(3, trimmed)
+    lines = trimmed.split('\n')
+    if TABLE_ROW.search(trimmed) or js_trim(lines[1] if len(lines) > 1 else '').startswith('|'):
+        return parse_markdown_table(trimmed) or {"type": "paragraph", "html": format_paragraph(trimmed)}
+    if trimmed:
+        return {"type": "paragraph", "html": format_paragraph(trimmed)}
+    return None
+
+
+def parse_structural_elements(text: str) -> List[dict]:
+    """parseStructuralElements(): ContentBlocks for a section's text."""
+    blocks = (parse_paragraph(p) for p in PARAGRAPH_BREAK.split(text) if js_trim(p))
+    return [b for b in blocks if b]
+
+
+REFERENCE_PATTERNS = [
+    ("statute", js_regex(r'(?:IRC\s*)?(?:§|Section)\s*(\d+[A-Za-z]?(?:\([a-z0-9]+\))?)', ignore_case=True)),
+    ("case", js_regex(r'([A-Z][a-z]+(?:\s+[A-Z]\.?\s*[a-z]*)?)\s+v\.\s+'
+                      r'(Commissioner|United States|[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)')),
+    ("ruling", js_regex(r'Rev(?:enue)?\.?\s*Rul(?:ing)?\.?\s*(\d{2,4}-\d+)', ignore_case=True)),
+    ("regulation", js_regex(r'Treas(?:ury)?\.?\s*Reg(?:ulation)?s?\.?\s*§?\s*([\d.-]+)', ignore_case=True)),
+]
+# Reference type -> (field, whole match instead of group 1)
+REFERENCE_FIELDS = {"statute": ("section", False), "case": ("name", True), "ruling": ("number", False),
+                    "regulation": ("section", False)}
+
+
+def extract_references(text: str) -> List[dict]:
+    """extractReferences(): unique statute, case, ruling and regulation references."""
+    refs = []
+    seen = set()
+    for ref_type, pattern in REFERENCE_PATTERNS:
+        field, whole = REFERENCE_FIELDS[ref_type]
+        for match in pattern.finditer(text):
+            value = match.group(0) if whole else match.group(1)
+            if (ref_type, value) not in seen:
+                refs.append({"type": ref_type, field: value})
+                seen.add((ref_type, value))
+    return refs
+
+
+# ============================================================================
+# SECTIONS
+# ============================================================================
+
+def chapter_sections(num: int, md: str, chapter_def: dict) -> dict:
+    """FormattedContent for every lettered section of a chapter, plus its ContentMarkers."""
+    chapter_id = f"ch-{num}"
+    paragraphs = markdown_paragraphs(md)
+    first_page = chapter_def["startPage"]
+    page_count = chapter_def["endPage"] - first_page + 1
+    pages = [first_page + p for p in paragraph_pages(paragraphs, page_count)]
+    classifier = HeadingClassifier()
+
+    sections, markers = [], []
+    current = None
+    for para, page in zip(paragraphs, pages):
+        if para.startswith('#'):
+            text = re.sub(r'\s+', ' ', para.lstrip('# ').strip())
+            match = SECTION_HEADING.match(text)
+            if match and classifier.classify_text(text, is_heading=True) == 2 \
+                    and not any(s["letter"] == match.group(1) for s in sections):
+                letter, title = match.group(1), match.group(2)
+                current = {"sectionId": f"{chapter_id}-{letter}", "chapterId": chapter_id, "title": title,
+                           "letter": letter,
+                           # formatSectionContent() opens every section with its heading
+                           "blocks": [{"type": "heading", "level": 2, "text": f"{letter}. {title}",
+                                       "anchor": slugify(title)}],
+                           "pageNumbers": [page], "references": []}
+                sections.append(current)
+                continue
+        if current is None:
+            # Chapter title and eyebrow before section A
+            continue
+
+        for block in parse_structural_elements(para):
+            current["blocks"].append(block)
+            if block["type"] in MARKER_TYPES:
+                title = block.get("name") or block.get("number")
+                marker = {"id": f"{current['sectionId']}-m{len(markers)}", "textbookId": TEXTBOOK_ID,
+                          "chapterId": chapter_id, "sectionId": current["sectionId"],
+                          "type": MARKER_TYPES[block["type"]]}
+                if title:
+                    marker["title"] = str(title)
+                marker["startPage"] = page
+                markers.append(marker)
+        if page not in current["pageNumbers"]:
+            current["pageNumbers"].append(page)
+
+    for section in sections:
+        html = " ".join(b.get("html", "") for b in section["blocks"] if b["type"] == "paragraph")
+        section["references"] = extract_references(html)
+    return {"chapter": num, "sections": sections, "markers": markers}
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_content_blocks(out_dir: str = BLOCKS_DIR) -> Dict[int, dict]:
+    start = time.time()
+    chapters = {}
+    defs = chapter_definitions()
+    with span("content_blocks") as s:
+        for num, chapter in sorted(load_shipped_chapters().items()):
+            if num not in defs:
+                continue
+            md = chapter["md_content"]
+            s.bytes_read += len(md.encode('utf-8'))
+            chapters[num] = chapter_sections(num, md, defs[num])
+            write_json_atomic(os.path.join(out_dir, f"Ch{num}.json"), chapters[num])
+        write_json_atomic(os.path.join(out_dir, INDEX_NAME),
+                          {"chapters": {f"Ch{num}": len(chapter["sections"]) for num, chapter in chapters.items()}})
+        s.items = sum(len(section["blocks"]) for chapter in chapters.values() for section in chapter["sections"])
+
+    sections = sum(len(chapter["sections"]) for chapter in chapters.values())
+    markers = sum(len(chapter["markers"]) for chapter in chapters.values())
+    print(f"✅ Content blocks: {s.items:,} blocks in {sections} sections, {markers} markers, "
+          f"{len(chapters)} chapters in {time.time() - start:.2f}s")
+    return chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse chapter markdown into ContentBlocks once per build")
+    parser.add_argument("--out", default=BLOCKS_DIR, help="Output directory")
+    parser.add_argument("--chapter", type=int, help="With --section: print a section's blocks from the built file")
+    parser.add_argument("--section", help="Section letter")
+    args = parser.parse_args()
+
+    if args.chapter is not None:
+        path = os.path.join(args.out, f"Ch{args.chapter}.json")
+        if not os.path.exists(path):
+            print(f"ERROR: No content blocks at {path} - build them first")
+            sys.exit(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            chapter = json.load(f)
+        for section in chapter["sections"]:
+            if args.section is None or section["letter"] == args.section:
+                print(f"--- {section['sectionId']} {section['title']} (pp. {section['pageNumbers']})")
+                for block in section["blocks"]:
+                    text = block.get("text") or block.get("html") or block.get("content") or block.get("name") or ""
+                    print(f"  [{block['type']}] {str(text)[:100]}")
+        return
+
+    build_content_blocks(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Footnote Join Builder
+
+Resolves once per chapter which page_footnote block defines each footnote
+number and where the text refers to it. Writes one file per chapter,
+public/data/footnotes/Ch{N}.json, keyed by book page:
+
+    {"chapter": 2, "first_page": 71, "count": 118, "references": 121,
+     "pages": {"75": [{"number": 12, "text": "...", "page": 75, "block": 14,
+                       "continued": [76], "refs": [[75, 3]]}, ...]},
+     "unresolved": [[number, page, block], ...]}
+
+plus footnotes/index.json, {"chapters": {"Ch2": footnote count, ...}}, for
+the chapters that have a table.
+
+A footnote is listed under the page that defines it, any page it continues
+onto, and every page that refers to it. The reader can therefore render
+the footnotes of the visible pages straight from pages[p], with no
+matching at runtime: getChapterFootnotes() in src/lib/import-textbook.ts
+fetches the table and only falls back to getFootnotesForPages() when a
+chapter has none or first_page differs. Book pages are the importer's:
+page_idx 0 is the chapter's startPage in CHAPTER_DEFINITIONS, so
+pages["71"] belongs to page ch-2-p71. A location is [book page, index
+among that page's blocks], which indexes into the per-page raw blocks the
+app already stores.
+
+Numbered page_footnote blocks follow the footer-map marker rule of the
+footnote fixers. An unnumbered one continues the previous footnote. The
+references are the repaired $^{n}$ markers and <sup>n</sup>. Each resolves
+to the definition of n nearest its page, within MAX_REF_DISTANCE pages.
+Chapters that ship only markdown have no footnote text and are skipped.
+
+Usage:
+    python scripts/build_footnote_index.py
+    python scripts/build_footnote_index.py --chapter 2 --page 75
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from atomic_io import write_json_atomic
+from build_search_index import SKIP_BLOCKS, block_text, chapter_blocks, chapter_first_page, chapter_sources
+from page_index import FOOTNOTE_MARKER, footnote_marker
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+FOOTNOTES_DIR = os.path.join(PUBLIC_DATA_DIR, "footnotes")
+INDEX_NAME = "index.json"
+REFERENCE = re.compile(r'\$\^\{?(\d{1,3})\}?\$|<sup>(\d{1,3})</sup>')
+# A reference more than a page away from every definition of its number is OCR noise
+MAX_REF_DISTANCE = 1
+
+
+def resolve_footnotes(blocks: List[dict], first_page: int = 0) -> Tuple[List[dict], List[list]]:
+    """
+    Footnote definitions in reading order, each with its references, plus the
+    references that matched no definition, as [number, page, block].
+    """
+    footnotes = []
+    by_number: Dict[int, List[dict]] = defaultdict(list)
+    refs = []
+    slots: Dict[int, int] = defaultdict(int)
+
+    for block in blocks:
+        page_idx = block.get('page_idx', 0)
+        page = first_page + page_idx
+        slot = slots[page_idx]
+        slots[page_idx] += 1
+
+        if block.get('type') == 'page_footnote':
+            text = block.get('text', '').strip()
+            marker = footnote_marker(block)
+            if marker:
+                footnote = {"number": marker[0], "text": FOOTNOTE_MARKER.sub('', text, count=1).strip(),
+                            "page": page, "block": slot, "continued": [], "refs": []}
+                footnotes.append(footnote)
+                by_number[footnote["number"]].append(footnote)
+            elif footnotes and text:
+                last = footnotes[-1]
+                last["text"] = f"{last['text']} {text}"
+                if page != last["page"] and page not in last["continued"]:
+                    last["continued"].append(page)
+            continue
+        if block.get('type') in SKIP_BLOCKS:
+            continue
+        for match in REFERENCE.finditer(block_text(block)):
+            refs.append((int(match.group(1) or match.group(2)), page, slot))
+
+    unresolved = []
+    for number, page, slot in refs:
+        candidates = [f for f in by_number.get(number, []) if abs(f["page"] - page) <= MAX_REF_DISTANCE]
+        if not candidates:
+            unresolved.append([number, page, slot])
+            continue
+        # Nearest definition; on a tie, the one after the reference
+        footnote = min(candidates, key=lambda f: (abs(f["page"] - page), f["page"] < page))
+        footnote["refs"].append([page, slot])
+    return footnotes, unresolved
+
+
+def join_footnotes(blocks: List[dict], first_page: int = 0) -> dict:
+    """The per-page join table for one chapter's blocks."""
+    footnotes, unresolved = resolve_footnotes(blocks, first_page)
+    pages: Dict[int, List[dict]] = defaultdict(list)
+    for footnote in footnotes:
+        for page in sorted({footnote["page"], *footnote["continued"], *(p for p, _ in footnote["refs"])}):
+            pages[page].append(footnote)
+    return {
+        "first_page": first_page,
+        "count": len(footnotes),
+        "references": sum(len(f["refs"]) for f in footnotes),
+        "pages": {str(page): sorted(pages[page], key=lambda f: (f["number"], f["page"])) for page in sorted(pages)},
+        "unresolved": unresolved,
+    }
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_footnote_index(out_dir: str = FOOTNOTES_DIR) -> Dict[int, dict]:
+    start = time.time()
+    joins = {}
+    skipped = []
+    with span("footnote_index") as s:
+        for num, (kind, raw) in sorted(chapter_sources().items()):
+            if kind != "content_list":
+                skipped.append(num)
+                continue
+            s.bytes_read += len(raw)
+            joins[num] = {"chapter": num, **join_footnotes(chapter_blocks(num, kind, raw), chapter_first_page(num))}
+            write_json_atomic(os.path.join(out_dir, f"Ch{num}.json"), joins[num])
+        write_json_atomic(os.path.join(out_dir, INDEX_NAME),
+                          {"chapters": {f"Ch{num}": join["count"] for num, join in joins.items()}})
+        s.items = sum(join["count"] for join in joins.values())
+        s.fields["chapters_skipped"] = len(skipped)
+
+    refs = sum(join["references"] for join in joins.values())
+    unresolved = sum(len(join["unresolved"]) for join in joins.values())
+    print(f"✅ Footnote join: {s.items:,} footnotes, {refs:,} references ({unresolved:,} unresolved) "
+          f"in {len(joins)} chapters in {time.time() - start:.2f}s")
+    if skipped:
+        print(f"   Skipped (markdown only, no footnote text): {', '.join(f'Ch{n}' for n in skipped)}")
+    return joins
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-page footnote join tables")
+    parser.add_argument("--out", default=FOOTNOTES_DIR, help="Output directory")
+    parser.add_argument("--chapter", type=int, help="With --page: show a page's footnotes from the existing table")
+    parser.add_argument("--page", type=int, help="Book page")
+    args = parser.parse_args()
+
+    if args.chapter is not None:
+        path = os.path.join(args.out, f"Ch{args.chapter}.json")
+        if not os.path.exists(path):
+            print(f"ERROR: No footnote table at {path} - build it first")
+            sys.exit(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            join = json.load(f)
+        for footnote in join["pages"].get(str(args.page), []):
+            refs = ", ".join(f"p.{page}#{block}" for page, block in footnote["refs"]) or "none"
+            print(f"{footnote['number']:>4} (p.{footnote['page']}#{footnote['block']}, refs: {refs}) "
+                  f"{footnote['text'][:100]}")
+        return
+
+    build_footnote_index(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Record Delta Builder
+
+The app imports the textbook into IndexedDB once. Before this stage, any
+content fix meant clearImportedTextbook() and a full re-import. This stage
+builds the records the import writes and hashes each one. It then diffs
+them against the previous build and writes the difference as a patch the
+app can apply in place:
+
+    public/data/records/manifest.json     — {"schema": 1, "version": 7,
+        "hashes": {"sections": {"ch-2-A": "<sha256[:16]>", ...}, "textbookPages": {...}, ...},
+        "deltas": [{"from": 6, "to": 7, "path": "records/delta-6-7.json", "put": 12, "delete": 1}]}
+    public/data/records/delta-6-7.json    — {"from": 6, "to": 7,
+        "put": {"sections": [Section, ...]}, "delete": {"textbookPages": ["ch-2-p71", ...]}}
+
+Tables are the Dexie table names in src/lib/db.ts:
+- parts, chapters, sections, subsections and subsubsections come from
+  public/data/section-tree.json.
+- textbookPages and pageFootnotes are built the way importTextbookFromJSON()
+  builds them from a chapter's content list, so they exist only for
+  chapters that publish one.
+Page ids are deterministic (ch-2-p71, ch-2-p71-fn0), so a page keeps its
+id across builds.
+
+The version goes up only when some record changed. The last MAX_DELTAS
+deltas are kept. A client further behind than that re-imports.
+
+Usage:
+    python scripts/build_record_deltas.py
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+from atomic_io import write_json_atomic
+from build_search_index import chapter_blocks, chapter_sources
+from build_section_tree import SECTION_TREE_PATH
+from clean_text import js_regex, js_trim
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+RECORDS_DIR = os.path.join(PUBLIC_DATA_DIR, "records")
+MANIFEST_NAME = "manifest.json"
+SCHEMA_VERSION = 1
+MAX_DELTAS = 10
+HASH_CHARS = 16
+
+# section-tree.json key -> Dexie table
+TREE_TABLES = {"parts": "parts", "chapters": "chapters", "sections": "sections",
+               "subsections": "subsections", "subSubsections": "subsubsections"}
+# Footnote detection and parsing exactly as importTextbookFromJSON() does it
+FOOTNOTE_TEXT = js_regex(r'^\d+\s+')
+FOOTNOTE_PARTS = js_regex(r'^(\d+)\s+([\s\S]+)')
+FOOTNOTE_MIN_Y = 800
+
+
+def record_hash(record: dict) -> str:
+    data = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:HASH_CHARS]
+
+
+def is_footnote_block(block: dict) -> bool:
+    text = block.get('text')
+    if block.get('type') == 'page_footnote':
+        return True
+    bbox = block.get('bbox') or [0, 0]
+    return block.get('type') == 'text' and bool(text) and bool(FOOTNOTE_TEXT.search(text)) \
+        and (bbox[1] or 0) > FOOTNOTE_MIN_Y
+
+
+def chapter_pages(chapter: dict, blocks: List[dict], tree_pages: List[list], titles: Dict[str, str]):
+    """TextbookPage and PageFootnote records for one chapter with a content list."""
+    chapter_id = chapter["id"]
+    by_page: Dict[int, List[dict]] = {}
+    for block in blocks:
+        by_page.setdefault(block.get('page_idx') or 0, []).append(block)
+
+    pages, footnotes = [], []
+    for offset in range(chapter["endPage"] - chapter["startPage"] + 1):
+        page_number = chapter["startPage"] + offset
+        page_id = f"{chapter_id}-p{page_number}"
+        section_id, starts = tree_pages[offset] if offset < len(tree_pages) else tree_pages[-1]
+        page_blocks = by_page.get(offset, [])
+        pages.append({"id": page_id, "chapterId": chapter_id, "sectionId": section_id,
+                      "sectionTitle": titles.get(section_id, chapter["title"]), "pageNumber": page_number,
+                      "content": json.dumps(page_blocks, ensure_ascii=False, separators=(',', ':')),
+                      "startsNewSection": starts})
+        page_footnotes = [b for b in page_blocks if is_footnote_block(b) and b.get('text')]
+        for index, block in enumerate(page_footnotes):
+            match = FOOTNOTE_PARTS.match(js_trim(block['text']))
+            footnotes.append({"id": f"{page_id}-fn{index}", "pageId": page_id,
+                              "footnoteNumber": int(match.group(1)) if match else 0,
+                              "text": match.group(2) if match else block['text']})
+    return pages, footnotes
+
+
+def build_records(tree_path: str = SECTION_TREE_PATH) -> Dict[str, List[dict]]:
+    """Dexie table -> records, as the app's import would write them."""
+    with open(tree_path, 'r', encoding='utf-8') as f:
+        tree = json.load(f)
+    records = {table: list(tree.get(key, [])) for key, table in TREE_TABLES.items()}
+    records["textbookPages"], records["pageFootnotes"] = [], []
+
+    chapters = {c["number"]: c for c in tree["chapters"]}
+    titles = {s["id"]: s["title"] for s in tree["sections"]}
+    for num, (kind, raw) in sorted(chapter_sources().items()):
+        chapter = chapters.get(num)
+        tree_pages = tree["pages"].get(f"ch-{num}")
+        if kind != "content_list" or not chapter or not tree_pages:
+            continue
+        pages, footnotes = chapter_pages(chapter, chapter_blocks(num, kind, raw), tree_pages, titles)
+        records["textbookPages"].extend(pages)
+        records["pageFootnotes"].extend(footnotes)
+    return records
+
+
+def load_manifest(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("schema") == SCHEMA_VERSION:
+            return manifest
+    return {"schema": SCHEMA_VERSION, "version": 0, "hashes": {}, "deltas": []}
+
+
+def diff(previous: Dict[str, Dict[str, str]], records: Dict[str, List[dict]], hashes: Dict[str, Dict[str, str]]):
+    """(put, delete): records added or changed since previous, and ids no longer built."""
+    put, delete = {}, {}
+    for table in sorted(set(previous) | set(hashes)):
+        before, after = previous.get(table, {}), hashes.get(table, {})
+        changed = {rid for rid, h in after.items() if before.get(rid) != h}
+        if changed:
+            put[table] = [r for r in records[table] if r["id"] in changed]
+        removed = sorted(set(before) - set(after))
+        if removed:
+            delete[table] = removed
+    return put, delete
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_record_deltas(out_dir: str = RECORDS_DIR) -> dict:
+    start = time.time()
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = load_manifest(manifest_path)
+
+    with span("record_deltas") as s:
+        records = build_records()
+        hashes = {table: {r["id"]: record_hash(r) for r in rows} for table, rows in records.items()}
+        put, delete = diff(previous["hashes"], records, hashes)
+        s.items = sum(len(rows) for rows in records.values())
+
+        manifest = {"schema": SCHEMA_VERSION, "version": previous["version"], "hashes": hashes,
+                    "deltas": previous["deltas"]}
+        if put or delete:
+            manifest["version"] += 1
+            # The first build has nothing to patch from: clients import it in full
+            if previous["version"]:
+                name = f"delta-{previous['version']}-{manifest['version']}.json"
+                write_json_atomic(os.path.join(out_dir, name),
+                                  {"from": previous["version"], "to": manifest["version"],
+                                   "put": put, "delete": delete})
+                manifest["deltas"] = (manifest["deltas"] + [{
+                    "from": previous["version"], "to": manifest["version"], "path": f"records/{name}",
+                    "put": sum(len(v) for v in put.values()), "delete": sum(len(v) for v in delete.values()),
+                }])[-MAX_DELTAS:]
+
+        kept = {os.path.basename(d["path"]) for d in manifest["deltas"]}
+        for path in glob.glob(os.path.join(out_dir, "delta-*.json")):
+            if os.path.basename(path) not in kept:
+                os.remove(path)
+        write_json_atomic(manifest_path, manifest)
+        s.fields.update(put=sum(len(v) for v in put.values()), delete=sum(len(v) for v in delete.values()))
+
+    counts = ", ".join(f"{len(rows)} {table}" for table, rows in records.items() if rows)
+    change = (f"v{previous['version']} → v{manifest['version']}: {s.fields['put']} put, {s.fields['delete']} deleted"
+              if manifest["version"] != previous["version"] else f"v{manifest['version']} unchanged")
+    print(f"✅ Records: {counts} — {change} ({time.time() - start:.2f}s) → {manifest_path}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash the imported records and write a delta since the last build")
+    parser.add_argument("--out", default=RECORDS_DIR, help="Output directory")
+    args = parser.parse_args()
+    build_record_deltas(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Offline Search Index Builder
+
+Tokenizes every published chapter and writes a sharded inverted index to
+public/data/search/, so the app can answer a query by fetching only the
+shards its terms hash to instead of scanning md_content at runtime.
+
+Layout:
+- search/meta.json         — Shard count, BM25 stats (N, avgdl, k1, b), tokenizer
+                             version, per-chapter source hashes, shard hashes
+- search/docs/Ch{N}.json   — {"sections": [{"id", "title", "page"}],
+                              "docs": [[section, page, length, snippet], ...]}
+- search/shards/{xx}.json  — {term: {"df": n, "p": {"Ch3": [gap, tf, gap, tf, ...]}}}
+
+A document is one passage: the blocks of one section on one book page.
+Postings are chapter-local doc ids, gap-encoded, so rebuilding a chapter
+never renumbers another. A term lives in shard fnv1a32(term) % shards.
+
+Legal citations are normalized before tokenizing so that "§ 351(a)",
+"Section 351(a)" and "sec. 351(a)" all index as §351(a) (plus §351),
+"Reg. § 1.351-1(a)" as reg§1.351-1(a) (plus reg§1.351-1), and
+"Rev. Rul. 2003-51" as revrul:2003-51 (plus revrul and 2003-51).
+
+Sources, per chapter: public/data/Ch{N}_content_list.json when published
+or parsed-chapters/ content lists (exact pages), otherwise the chapter markdown with pages estimated over the
+chapter's page range in CHAPTER_DEFINITIONS, the book pages the app imports. Per-chapter postings are cached in .search-cache/
+keyed by source hash and page range: only chapters whose source or
+CHAPTER_DEFINITIONS entry changed are re-tokenized and only shards whose
+bytes changed are rewritten.
+
+Usage:
+    python scripts/build_search_index.py                 # Incremental build
+    python scripts/build_search_index.py --force         # Re-tokenize everything
+    python scripts/build_search_index.py --query "§ 351 boot"
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import block_store
+from atomic_io import write_atomic, write_json_atomic
+from bench_fixtures import load_shipped_chapters, markdown_to_content_list
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR, sha256_bytes
+
+SEARCH_DIR = os.path.join(PUBLIC_DATA_DIR, "search")
+CACHE_DIR = ".search-cache"
+# Where parse_mineru_api.py extracts API results (its OUT_DIR)
+PARSED_CHAPTERS_DIR = "parsed-chapters"
+DEFAULT_SHARDS = 32
+# 3: book pages on the importer's basis (CHAPTER_DEFINITIONS)
+TOKENIZER_VERSION = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 120
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his if in into is it its of on or
+that the their there these they this to was were which will with would not no such than
+""".split())
+
+SKIP_BLOCKS = {"page_number", "header", "page_header", "page_footer", "discarded"}
+
+# ============================================================================
+# TOKENIZER
+# ============================================================================
+
+PAREN = r'\([A-Za-z0-9]{1,4}\)'
+SUBSECTION = r'(?:' + PAREN + r')*'
+# MinerU sometimes reads § as an escaped dollar ("\$ 355(b)", "\$\$ 301; 302"), but "\$"
+# is mostly a real dollar amount: "\$10", "\$1m", "\$133,333.33", "\$20 million", or
+# OCR-garbled "\$10,0o0" and "\$1, 00". A single "\$" is only a section sigil before
+# a subsection ("355(b)") or a regulation number ("1.355-3"), which money never looks
+# like; "\$\$" is taken unless a money amount follows it. "$\$ ...$" is always math.
+MONEY = r"\s*(?:\d{1,3}\s?,(?:[\dOo]{2,3}|\s*0)|\d+(?:\.\d+)?\$?\s*'?\s*(?:million|billion|thousand)\b|\d+\.\d\d(?![\d-]))"
+OCR_SIGIL = r'(?<![$\\])\\\$'
+OCR_SECTION = (OCR_SIGIL + r'(?:\\\$(?!' + MONEY + r')|(?=\s*\d+[A-Za-z]?' + PAREN + r'))')
+OCR_REG = OCR_SIGIL + r'(?:\\\$)?(?=\s*\d+\.\d+[A-Za-z]?-)'
+SECTION_CITE = re.compile(
+    r'(?:§§?|' + OCR_SECTION + r'|\bsections?\b|\bsecs?\.|\bss\b)\s*(\d+[A-Za-z]?' + SUBSECTION + r')'
+    r'((?:\s*(?:[,;]|and|or|through)\s*\d+[A-Za-z]?' + SUBSECTION + r')*)', re.IGNORECASE)
+REG_CITE = re.compile(
+    r'(?:\b(?:treas\.\s*)?reg(?:ulation)?s?\.?:?\s*(?:§§?|' + OCR_REG + r'|\bss\b)?|§§?|' + OCR_REG +
+    r'|\bss\b)\s*(\d+\.\d+[A-Za-z]?(?:-\d+[A-Za-z]?)?' + SUBSECTION + r')',
+    re.IGNORECASE)
+RULING_CITE = re.compile(
+    r'\b(rev(?:enue)?\.?\s*rul(?:e|ing)?\.?|rev(?:enue)?\.?\s*proc(?:edure)?\.?|priv\.\s*ltr\.\s*rul\.|p\.\s*l\.\s*r\.|t\.\s*c\.\s*memo\.|i\.\s*r\.\s*c\.)'
+    r'(?:\s*(\d{2,4}-\d+|\d{6,9}))?', re.IGNORECASE)
+RULING_NAMES = {"rul": "revrul", "proc": "revproc", "privltrrul": "plr", "plr": "plr",
+                "tcmemo": "tcmemo", "irc": "irc"}
+LIST_ITEM = re.compile(r'\d+[A-Za-z]?' + SUBSECTION)
+WORD = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+# OCR renders § as "\$", "ss" or "SS"; en dashes show up inside cite numbers
+DASHES = str.maketrans({"–": "-", "‑": "-", "−": "-"})
+MARKUP = re.compile(r'<[^>]+>|\$\^\{?\d+\}?\$|!\[[^\]]*\]\([^)]*\)|[#*_`|]')
+
+
+def _with_prefixes(prefix: str, cite: str) -> List[str]:
+    """§351(a)(1) -> [§351(a)(1), §351(a), §351]."""
+    cite = cite.lower().replace(" ", "")
+    tokens = [prefix + cite]
+    while cite.endswith(")"):
+        cite = cite[:cite.rindex("(")]
+        tokens.append(prefix + cite)
+    return tokens
+
+
+def ruling_name(abbrev: str) -> str:
+    """'Rev. Rul.' / 'Revenue Ruling' / 'Rev.Rule' -> 'revrul'."""
+    key = re.sub(r'[^a-z]', '', abbrev.lower())
+    if key.startswith("rev"):
+        key = "proc" if "proc" in key else "rul"
+    return RULING_NAMES[key]
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).translate(DASHES)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms with legal citations folded to canonical tokens. Used for queries too."""
+    text = MARKUP.sub(" ", normalize_text(text))
+    tokens = []
+
+    def section(match):
+        tokens.extend(_with_prefixes("§", match.group(1)))
+        for item in LIST_ITEM.findall(match.group(2) or ""):
+            tokens.extend(_with_prefixes("§", item))
+        return " "
+
+    def regulation(match):
+        tokens.extend(_with_prefixes("reg§", match.group(1)))
+        return " "
+
+    def ruling(match):
+        name = ruling_name(match.group(1))
+        tokens.append(name)
+        if match.group(2):
+            tokens.append(f"{name}:{match.group(2)}")
+            tokens.append(match.group(2))
+        return " "
+
+    text = REG_CITE.sub(regulation, text)
+    text = SECTION_CITE.sub(section, text)
+    text = RULING_CITE.sub(ruling, text)
+
+    for word in WORD.findall(text.lower()):
+        word = word.strip(".")
+        if len(word) < 2 and not word.isdigit() or word in STOPWORDS:
+            continue
+        tokens.append(word)
+    return tokens
+
+
+def fnv1a32(term: str) -> int:
+    h = 0x811c9dc5
+    for byte in term.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h
+
+
+def shard_of(term: str, shards: int) -> str:
+    return f"{fnv1a32(term) % shards:02x}"
+
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+
+def block_text(block: dict) -> str:
+    if block.get("type") == "table":
+        return " ".join([block.get("table_body", "")] + block.get("table_caption", []) + block.get("table_footnote", []))
+    if block.get("type") == "image":
+        return " ".join(block.get("image_caption", []) + block.get("image_footnote", []))
+    return block.get("text", "")
+
+
+def chapter_content_lists() -> Dict[int, str]:
+    """Chapter number -> content list path, a published one winning over a parse_mineru_api.py run."""
+    from publish_chapter import chapter_number_from_name, find_chapter_files
+
+    content_lists = [(chapter_number_from_name(os.path.basename(d)), find_chapter_files(d)[1])
+                     for d in sorted(glob.glob(os.path.join(PARSED_CHAPTERS_DIR, "Ch*")))]
+    for path in glob.glob(os.path.join(PUBLIC_DATA_DIR, "Ch*_content_list.json")):
+        match = re.match(r'Ch(\d+)_content_list\.json$', os.path.basename(path))
+        if match:
+            content_lists.append((int(match.group(1)), path))
+    return {num: path for num, path in content_lists if num is not None and path}
+
+
+def chapter_sources() -> Dict[int, Tuple[str, bytes]]:
+    """
+    Chapter number -> (kind, raw bytes), best source winning: a published
+    content list, else one from a parse_mineru_api.py run, else markdown.
+    """
+    sources = {}
+    for num, chapter in load_shipped_chapters().items():
+        sources[num] = ("markdown", chapter["md_content"].encode('utf-8'))
+    for num, path in chapter_content_lists().items():
+        with open(path, 'rb') as f:
+            sources[num] = ("content_list", f.read())
+    return sources
+
+
+def chapter_blocks(num: int, kind: str, raw: bytes) -> List[dict]:
+    if kind == "content_list":
+        return block_store.loads(raw)
+    first_page, last_page = chapter_page_range(num)
+    page_count = last_page - first_page + 1
+    # Estimated pages; the generated footnote blocks are placeholders, not text
+    return [b for b in markdown_to_content_list(raw.decode('utf-8'), page_count) if b["type"] != "page_footnote"]
+
+
+_chapter_defs: Dict[int, dict] = {}
+_chapter_defs_lock = threading.Lock()
+
+
+def chapter_page_range(num: int) -> Tuple[int, int]:
+    """
+    (first, last) book page of a chapter, from CHAPTER_DEFINITIONS in the
+    importer: the pages the app imports, so page_idx 0 is the app's startPage.
+    """
+    # Pipeline nodes call this from worker threads
+    with _chapter_defs_lock:
+        if not _chapter_defs:
+            from build_section_tree import chapter_definitions
+            _chapter_defs.update(chapter_definitions())
+    chapter_def = _chapter_defs.get(num)
+    if chapter_def is None:
+        return 1, 40
+    return chapter_def["startPage"], chapter_def["endPage"]
+
+
+def chapter_first_page(num: int) -> int:
+    """Book page of the chapter's page_idx 0."""
+    return chapter_page_range(num)[0]
+
+
+def chapter_passages(num: int, blocks: List[dict]):
+    """
+    Split a chapter into passages: the text of one section on one book page.
+
+    Returns (sections, passages) where passages maps (section index, page)
+    to the block texts in reading order.
+    """
+    first_page = chapter_first_page(num)
+
+    sections = [{"id": f"Ch{num}.s0", "title": f"Chapter {num}", "page": first_page}]
+    passages: Dict[Tuple[int, int], List[str]] = {}
+    for block in blocks:
+        if block.get("type") in SKIP_BLOCKS:
+            continue
+        text = block_text(block).strip()
+        if not text:
+            continue
+        page = first_page + block.get("page_idx", 0)
+        if block.get("text_level"):
+            sections.append({"id": f"Ch{num}.s{len(sections)}", "title": text[:200], "page": page})
+        passages.setdefault((len(sections) - 1, page), []).append(text)
+    return sections, passages
+
+
+def index_chapter(num: int, blocks: List[dict]) -> dict:
+    """Build a chapter's passage table and postings."""
+    sections, passages = chapter_passages(num, blocks)
+    docs = []
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for doc_id, ((section, page), texts) in enumerate(passages.items()):
+        text = " ".join(texts)
+        counts = Counter(tokenize(text))
+        snippet = re.sub(r'\s+', ' ', MARKUP.sub(" ", text)).strip()[:SNIPPET_CHARS]
+        docs.append([section, page, sum(counts.values()), snippet])
+        for term, tf in counts.items():
+            postings[term].extend((doc_id, tf))
+    return {"sections": sections, "docs": docs, "postings": postings}
+
+
+def load_cached(num: int, source_sha: str):
+    """A chapter's cached postings, unless its source, page range or the tokenizer changed."""
+    path = os.path.join(CACHE_DIR, f"Ch{num}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        cached = json.load(f)
+    if (cached.get("source_sha256") != source_sha or cached.get("tokenizer") != TOKENIZER_VERSION
+            or cached.get("pages") != list(chapter_page_range(num))):
+        return None
+    return cached
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_index(out_dir: str = SEARCH_DIR, shards: int = DEFAULT_SHARDS, force: bool = False) -> dict:
+    start = time.time()
+    meta_path = os.path.join(out_dir, "meta.json")
+    old_meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            old_meta = json.load(f)
+
+    with span("search_index") as s:
+        chapters = {}
+        reindexed = []
+        for num, (kind, raw) in sorted(chapter_sources().items()):
+            source_sha = sha256_bytes(raw)
+            cached = None if force else load_cached(num, source_sha)
+            if cached is None:
+                cached = index_chapter(num, chapter_blocks(num, kind, raw))
+                cached.update({"source_sha256": source_sha, "source": kind, "tokenizer": TOKENIZER_VERSION,
+                               "pages": list(chapter_page_range(num))})
+                write_json_atomic(os.path.join(CACHE_DIR, f"Ch{num}.json"), cached)
+                reindexed.append(num)
+            docs_path = os.path.join(out_dir, "docs", f"Ch{num}.json")
+            if cached is not None and (num in reindexed or not os.path.exists(docs_path)):
+                write_json_atomic(docs_path, {"sections": cached["sections"], "docs": cached["docs"]})
+            chapters[num] = cached
+            s.bytes_read += len(raw)
+
+        # Merge per-chapter postings into shards
+        shard_terms: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        for num, cached in chapters.items():
+            key = f"Ch{num}"
+            for term, flat in cached["postings"].items():
+                entry = shard_terms[shard_of(term, shards)].setdefault(term, {"df": 0, "p": {}})
+                gaps, prev = [], 0
+                for i in range(0, len(flat), 2):
+                    gaps.extend((flat[i] - prev, flat[i + 1]))
+                    prev = flat[i]
+                entry["p"][key] = gaps
+                entry["df"] += len(flat) // 2
+
+        old_shards = old_meta.get("shard_files", {}) if old_meta.get("shards") == shards else {}
+        shard_files = {}
+        written = 0
+        for i in range(shards):
+            sid = f"{i:02x}"
+            terms = shard_terms.get(sid, {})
+            data = json.dumps({t: terms[t] for t in sorted(terms)}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            sha = sha256_bytes(data)
+            path = os.path.join(out_dir, "shards", f"{sid}.json")
+            if old_shards.get(sid, {}).get("sha256") != sha or not os.path.exists(path):
+                write_atomic(path, data)
+                written += 1
+                s.bytes_written += len(data)
+            shard_files[sid] = {"path": f"shards/{sid}.json", "sha256": sha, "terms": len(terms), "bytes": len(data)}
+
+        total_docs = sum(len(c["docs"]) for c in chapters.values())
+        total_len = sum(d[2] for c in chapters.values() for d in c["docs"])
+        meta = {
+            "version": 1,
+            "tokenizer": TOKENIZER_VERSION,
+            "hash": "fnv1a32",
+            "shards": shards,
+            "bm25": {"k1": BM25_K1, "b": BM25_B, "N": total_docs,
+                     "avgdl": round(total_len / total_docs, 3) if total_docs else 0},
+            "chapters": {f"Ch{num}": {"docs": len(c["docs"]), "sections": len(c["sections"]),
+                                      "source": c["source"], "source_sha256": c["source_sha256"],
+                                      "path": f"docs/Ch{num}.json"}
+                         for num, c in sorted(chapters.items())},
+            "shard_files": shard_files,
+        }
+        write_json_atomic(meta_path, meta, indent=2)
+        s.items = total_docs
+        s.fields.update({"reindexed": len(reindexed), "shards_written": written})
+
+    print(f"✅ Search index: {len(chapters)} chapters, {total_docs:,} passages, "
+          f"{sum(f['terms'] for f in shard_files.values()):,} terms in {shards} shards")
+    print(f"   Re-tokenized: {', '.join(f'Ch{n}' for n in reindexed) or 'none'}; "
+          f"shards rewritten: {written} ({time.time() - start:.2f}s)")
+    return meta
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+def search(query: str, index_dir: str = SEARCH_DIR, limit: int = 10) -> List[dict]:
+    """BM25 over the shards the query terms hash to - the same lookups the app makes."""
+    with open(os.path.join(index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    bm25 = meta["bm25"]
+    terms = list(dict.fromkeys(tokenize(query)))
+
+    shards = {}
+    for term in terms:
+        sid = shard_of(term, meta["shards"])
+        if sid not in shards:
+            with open(os.path.join(index_dir, meta["shard_files"][sid]["path"]), 'r', encoding='utf-8') as f:
+                shards[sid] = json.load(f)
+
+    docs_tables = {}
+
+    def docs_of(chapter):
+        if chapter not in docs_tables:
+            with open(os.path.join(index_dir, meta["chapters"][chapter]["path"]), 'r', encoding='utf-8') as f:
+                docs_tables[chapter] = json.load(f)
+        return docs_tables[chapter]
+
+    scores: Dict[Tuple[str, int], float] = defaultdict(float)
+    for term in terms:
+        entry = shards[shard_of(term, meta["shards"])].get(term)
+        if not entry:
+            continue
+        idf = math.log(1 + (bm25["N"] - entry["df"] + 0.5) / (entry["df"] + 0.5))
+        for chapter, gaps in entry["p"].items():
+            docs = docs_of(chapter)["docs"]
+            doc_id = 0
+            for i in range(0, len(gaps), 2):
+                doc_id += gaps[i]
+                tf, length = gaps[i + 1], docs[doc_id][2]
+                norm = tf + bm25["k1"] * (1 - bm25["b"] + bm25["b"] * length / bm25["avgdl"])
+                scores[(chapter, doc_id)] += idf * tf * (bm25["k1"] + 1) / norm
+
+    results = []
+    for (chapter, doc_id), score in sorted(scores.items(), key=lambda kv: -kv[1])[:limit]:
+        table = docs_of(chapter)
+        section, page, _, snippet = table["docs"][doc_id]
+        results.append({"chapter": chapter, "page": page, "section": table["sections"][section],
+                        "score": round(score, 3), "snippet": snippet})
+    print(f"   Query terms: {terms} -> loaded {len(shards)}/{meta['shards']} shards")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the sharded full-text search index")
+    parser.add_argument("--out", default=SEARCH_DIR, help="Index directory")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="Number of term shards")
+    parser.add_argument("--force", action="store_true", help="Re-tokenize every chapter")
+    parser.add_argument("--query", help="Search the existing index instead of building")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.query:
+        if not os.path.exists(os.path.join(args.out, "meta.json")):
+            print(f"ERROR: No index in {args.out} - build it first")
+            sys.exit(1)
+        for hit in search(args.query, args.out, args.limit):
+            print(f"{hit['score']:>8.2f}  {hit['chapter']} p.{hit['page']}  {hit['section']['title'][:50]}")
+            print(f"          {hit['snippet']}")
+        return
+
+    build_index(args.out, args.shards, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Section Tree Builder
+
+Computes the Part → Chapter → Section → Subsection → SubSubsection tree
+at export time and writes it to public/data/section-tree.json as records
+shaped like the db.ts interfaces. importTextbookFromJSON() can then
+bulkPut them instead of running parseChapterSections() and a
+findSectionForPage() scan per page on the user's device:
+
+    {"version": 2, "textbookId": "corporate-tax",
+     "parts": [Part], "chapters": [Chapter], "sections": [Section],
+     "subsections": [Subsection], "subSubsections": [SubSubsection],
+     "pages": {"ch-2": [["ch-2-A", true], ...]},      # per page offset: section at the top, starts a section
+     "blocks": {"ch-2-A": [first, last], ...},       # block offsets into the chapter's content list
+     "blockCounts": {"ch-2": 1893},                  # staleness check against the loaded content list
+     "sources": {"ch-2": "/data/Ch2_content_list.json"}}  # URL of the content list the tree was built from
+
+Chapter titles and page ranges come from CHAPTER_DEFINITIONS in
+src/lib/import-textbook.ts, so book pages here (startPage + page_idx)
+and the ids (ch-2, ch-2-A, ch-2-A-1) match what the import creates.
+Part ids (part-ONE) match the parts ensureTextbookForUser() creates.
+The importer loads each chapter from its "sources" URL, the same content
+list the tree and the record deltas were built from.
+Heading levels come from scripts/heading_classifier.py. Sections are only
+emitted for chapters with a real content list. Markdown-only chapters
+have estimated pages, so the app keeps parsing those itself.
+
+Usage:
+    python scripts/build_section_tree.py
+"""
+
+import argparse
+import os
+import re
+import time
+from typing import Dict, List
+
+from atomic_io import write_json_atomic
+from build_search_index import SKIP_BLOCKS, chapter_blocks, chapter_content_lists, chapter_sources
+from heading_classifier import HeadingClassifier, is_heading_block
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+SECTION_TREE_PATH = os.path.join(PUBLIC_DATA_DIR, "section-tree.json")
+IMPORT_TS = os.path.join("src", "lib", "import-textbook.ts")
+# 2: per-chapter source URLs
+TREE_VERSION = 2
+TEXTBOOK_ID = "corporate-tax"
+
+CHAPTER_DEF = re.compile(r"\{ number: (\d+), title: '((?:[^'\\]|\\.)*)', startPage: (\d+), endPage: (\d+)")
+ENUMERATED = re.compile(r'^([A-Za-z0-9]+)\.\s+(.+)')
+# (number, title, first page, last page) as ensureTextbookForUser() in src/lib/supabase-loader.ts creates them
+PARTS = [
+    ("ONE", "INTRODUCTION", 1, 68),
+    ("TWO", "TAXATION OF C CORPORATIONS", 69, 834),
+    ("THREE", "TAXATION OF S CORPORATIONS", 835, 910),
+]
+
+
+def chapter_definitions(path: str = IMPORT_TS) -> Dict[int, dict]:
+    """CHAPTER_DEFINITIONS from the importer: {number: {"title", "startPage", "endPage"}}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    defs = {int(m.group(1)): {"title": m.group(2).replace("\\'", "'"), "startPage": int(m.group(3)),
+                              "endPage": int(m.group(4))}
+            for m in CHAPTER_DEF.finditer(source)}
+    if not defs:
+        raise ValueError(f"No CHAPTER_DEFINITIONS found in {path}")
+    return defs
+
+
+def chapter_tree(num: int, blocks: List[dict], chapter_def: dict) -> dict:
+    """Sections, subsections and sub-subsections of one chapter, with page and block ranges."""
+    chapter_id = f"ch-{num}"
+    start_page = chapter_def["startPage"]
+    classifier = HeadingClassifier.fit(blocks)
+    records = {2: [], 3: [], 4: []}
+    ranges: Dict[str, List[int]] = {}
+    first_content: Dict[int, int] = {}
+    open_nodes: Dict[int, dict] = {}
+
+    def close(level: int, block: int, page_idx: int):
+        for lvl in [l for l in open_nodes if l >= level]:
+            node = open_nodes.pop(lvl)
+            node["endPage"] = max(node["startPage"], start_page + page_idx)
+            ranges[node["id"]][1] = max(ranges[node["id"]][0], block)
+
+    for i, block in enumerate(blocks):
+        if block.get('type') in SKIP_BLOCKS:
+            continue
+        page_idx = block.get('page_idx', 0)
+        at_top = page_idx not in first_content
+        first_content.setdefault(page_idx, i)
+        if block.get('type') != 'text' or not is_heading_block(block):
+            continue
+        text = re.sub(r'\s+', ' ', str(block.get('text', '')).strip())
+        level = classifier.level(block, text)
+        match = ENUMERATED.match(text)
+        if not match or level not in records:
+            continue
+        token, title = match.group(1), match.group(2)
+        if level == 2 and token.isalpha() and token.isupper():
+            node = {"id": f"{chapter_id}-{token}", "textbookId": TEXTBOOK_ID, "chapterId": chapter_id,
+                    "letter": token, "title": title}
+        elif level == 3 and token.isdigit() and 2 in open_nodes:
+            parent = open_nodes[2]["id"]
+            node = {"id": f"{parent}-{int(token)}", "textbookId": TEXTBOOK_ID, "sectionId": parent,
+                    "number": int(token), "title": title}
+        elif level == 4 and token.isalpha() and token.islower() and 3 in open_nodes:
+            parent = open_nodes[3]["id"]
+            node = {"id": f"{parent}-{token}", "textbookId": TEXTBOOK_ID, "subsectionId": parent,
+                    "letter": token, "title": title}
+        else:
+            continue
+        if node["id"] in ranges:
+            # A repeated heading (running head, out-of-order parse) continues the first one
+            continue
+
+        # The previous node ends on this page unless this heading opens the page
+        close(level, i - 1, page_idx - 1 if at_top else page_idx)
+        node["startPage"] = start_page + page_idx
+        node["endPage"] = node["startPage"]
+        ranges[node["id"]] = [i, i]
+        records[level].append(node)
+        open_nodes[level] = node
+
+    last_page_idx = max((b.get('page_idx', 0) for b in blocks), default=0)
+    close(2, len(blocks) - 1, last_page_idx)
+
+    # Section at the top of each page, carried over blank pages; before the first one, the first
+    pages = []
+    sections = records[2]
+    starts = {s["startPage"] for s in sections}
+    current = 0
+    for offset in range(chapter_def["endPage"] - start_page + 1):
+        block = first_content.get(offset)
+        while (block is not None and current + 1 < len(sections)
+               and ranges[sections[current + 1]["id"]][0] <= block):
+            current += 1
+        if sections:
+            pages.append([sections[current]["id"], start_page + offset in starts])
+
+    return {"sections": records[2], "subsections": records[3], "subSubsections": records[4],
+            "pages": pages, "blocks": ranges}
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def source_url(path: str) -> str:
+    """URL the app fetches a content list at: public/ is served from the site root."""
+    rel = os.path.relpath(path).replace(os.sep, "/")
+    return "/" + (rel[len("public/"):] if rel.startswith("public/") else rel)
+
+
+def build_section_tree(out_path: str = SECTION_TREE_PATH) -> dict:
+    start = time.time()
+    defs = chapter_definitions()
+    tree = {"version": TREE_VERSION, "textbookId": TEXTBOOK_ID, "parts": [], "chapters": [], "sections": [],
+            "subsections": [], "subSubsections": [], "pages": {}, "blocks": {}, "blockCounts": {}, "sources": {}}
+
+    for number, title, first, last in PARTS:
+        part_id = f"part-{number}"
+        tree["parts"].append({"id": part_id, "textbookId": TEXTBOOK_ID, "number": number, "title": title,
+                              "startPage": first, "endPage": last})
+        for n, chapter_def in sorted(defs.items()):
+            if first <= chapter_def["startPage"] <= last:
+                tree["chapters"].append({"id": f"ch-{n}", "textbookId": TEXTBOOK_ID, "partId": part_id,
+                                         "number": n, **chapter_def})
+
+    skipped = []
+    paths = chapter_content_lists()
+    with span("section_tree") as s:
+        for num, (kind, raw) in sorted(chapter_sources().items()):
+            if kind != "content_list" or num not in defs:
+                skipped.append(num)
+                continue
+            s.bytes_read += len(raw)
+            blocks = chapter_blocks(num, kind, raw)
+            chapter = chapter_tree(num, blocks, defs[num])
+            for key in ("sections", "subsections", "subSubsections"):
+                tree[key].extend(chapter[key])
+            tree["pages"][f"ch-{num}"] = chapter["pages"]
+            tree["blocks"].update(chapter["blocks"])
+            tree["blockCounts"][f"ch-{num}"] = len(blocks)
+            tree["sources"][f"ch-{num}"] = source_url(paths[num])
+        write_json_atomic(out_path, tree)
+        s.items = len(tree["sections"]) + len(tree["subsections"]) + len(tree["subSubsections"])
+        s.fields["chapters_skipped"] = len(skipped)
+
+    print(f"✅ Section tree: {len(tree['chapters'])} chapters, {len(tree['sections'])} sections, "
+          f"{len(tree['subsections'])} subsections, {len(tree['subSubsections'])} sub-subsections "
+          f"({time.time() - start:.2f}s) → {out_path}")
+    if skipped:
+        print(f"   No sections (no content list): {', '.join(f'Ch{n}' for n in skipped)}")
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the ready-to-insert section tree")
+    parser.add_argument("--out", default=SECTION_TREE_PATH, help="Output path")
+    args = parser.parse_args()
+    build_section_tree(args.out)
+
+
+if __name__ == "__main__":
+    main()
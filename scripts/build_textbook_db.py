@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Textbook SQLite Store
+
+Loads every conversion output once into a single SQLite database so
+consumers query it instead of re-parsing Ch{N}.json, output/*.md,
+parsed-chapters/ content lists and corporate-tax-textbook.json:
+
+- chapters   — One row per chapter: name, source kind/hash, page range
+- sections   — Heading-delimited sections (ids match the search index: Ch3.s4)
+- pages      — One row per chapter page with its block count (the importer's
+               page numbers from CHAPTER_DEFINITIONS, as in the outline).
+               Keyed by (chapter, page): a content list that runs past its
+               chapter's endPage overlaps the next chapter's first pages
+- blocks     — Every content block in reading order (type, text, bbox, image)
+- footnotes  — page_footnote blocks split into number + text
+- images     — Image/table blocks with their asset path and caption
+- outline    — The app's page outline from corporate-tax-textbook.json
+- blocks_fts — FTS5 over block text (external content, kept in sync by triggers)
+
+Rebuilds are incremental: a chapter whose source hash and page range are
+unchanged is left alone, a changed one is deleted and re-inserted in one
+transaction. Lookups (TextbookDB, --search) open the database read-only.
+
+Usage:
+    python scripts/build_textbook_db.py                 # Build / update textbook.db
+    python scripts/build_textbook_db.py --bench         # Time the query API
+    python scripts/build_textbook_db.py --search "boot"
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import time
+from typing import List
+
+from build_search_index import SKIP_BLOCKS, block_text, chapter_blocks, chapter_page_range, chapter_sources
+from pipeline_telemetry import span
+from publish_chapter import sha256_bytes
+
+DB_PATH = "textbook.db"
+OUTLINE_JSON = "corporate-tax-textbook.json"
+# 2: book pages on the importer's basis (CHAPTER_DEFINITIONS), as in the outline table
+# 3: pages keyed by (chapter, page); sources record the chapter's page range
+SCHEMA_VERSION = 3
+TABLES = ("blocks_fts", "outline", "images", "footnotes", "blocks", "pages", "sections", "chapters", "sources")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    key TEXT PRIMARY KEY, kind TEXT NOT NULL, sha256 TEXT NOT NULL, pages TEXT NOT NULL, loaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    num INTEGER PRIMARY KEY, name TEXT, source TEXT NOT NULL,
+    first_page INTEGER, last_page INTEGER, pages_estimated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id TEXT PRIMARY KEY, chapter INTEGER NOT NULL, seq INTEGER NOT NULL, title TEXT NOT NULL,
+    first_page INTEGER NOT NULL, last_page INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_chapter ON sections (chapter, seq);
+CREATE INDEX IF NOT EXISTS sections_page ON sections (first_page, last_page);
+CREATE TABLE IF NOT EXISTS pages (
+    chapter INTEGER NOT NULL, page INTEGER NOT NULL, blocks INTEGER NOT NULL, PRIMARY KEY (chapter, page)
+);
+CREATE INDEX IF NOT EXISTS pages_page ON pages (page);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY, chapter INTEGER NOT NULL, page INTEGER NOT NULL, seq INTEGER NOT NULL,
+    section TEXT NOT NULL, type TEXT NOT NULL, text_level INTEGER, text TEXT NOT NULL,
+    bbox TEXT, img_path TEXT
+);
+CREATE INDEX IF NOT EXISTS blocks_page ON blocks (page, seq);
+CREATE INDEX IF NOT EXISTS blocks_chapter ON blocks (chapter);
+CREATE INDEX IF NOT EXISTS blocks_section ON blocks (section);
+CREATE TABLE IF NOT EXISTS footnotes (
+    id INTEGER PRIMARY KEY, chapter INTEGER NOT NULL, page INTEGER NOT NULL,
+    number INTEGER, text TEXT NOT NULL, block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS footnotes_page ON footnotes (page, number);
+CREATE INDEX IF NOT EXISTS footnotes_chapter ON footnotes (chapter, number);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY, chapter INTEGER NOT NULL, page INTEGER NOT NULL,
+    path TEXT NOT NULL, caption TEXT, block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_page ON images (page);
+CREATE TABLE IF NOT EXISTS outline (
+    page INTEGER NOT NULL, chapter_id TEXT NOT NULL, section_id TEXT, path TEXT, footnotes TEXT
+);
+CREATE INDEX IF NOT EXISTS outline_page ON outline (page);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS blocks_fts USING fts5 (
+    text, content='blocks', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS blocks_ai AFTER INSERT ON blocks BEGIN
+    INSERT INTO blocks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS blocks_ad AFTER DELETE ON blocks BEGIN
+    INSERT INTO blocks_fts (blocks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+FOOTNOTE_NUMBER = re.compile(r'^\s*(?:\$\^\{?)?(\d{1,3})\b')
+
+
+def connect(path: str = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    """Open the database; for writing, (re)create the schema if it is from another version."""
+    if readonly:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found - build it first")
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.close()
+            raise RuntimeError(f"{path} was built with another schema version - rebuild it")
+        return conn
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        # Tables from another version have other keys and rows on another page basis: start over
+        for table in TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def delete_chapter(conn: sqlite3.Connection, num: int):
+    for table in ("footnotes", "images", "blocks", "pages", "sections", "chapters"):
+        conn.execute(f"DELETE FROM {table} WHERE {'num' if table == 'chapters' else 'chapter'} = ?", (num,))
+
+
+def upsert_chapter(conn: sqlite3.Connection, num: int, kind: str, raw: bytes) -> int:
+    """Replace one chapter's rows. Returns the number of blocks inserted."""
+    from splitter import CHAPTERS
+    label = next((label for _, _, label in CHAPTERS if label.startswith(f"Ch{num}_")), f"Ch{num}")
+    first_page, end_page = chapter_page_range(num)
+
+    delete_chapter(conn, num)
+    sections = [[f"Ch{num}.s0", f"Chapter {num}", first_page, first_page]]
+    page_blocks = {}
+    block_rows, footnote_rows, image_rows = [], [], []
+    next_id = (conn.execute("SELECT MAX(id) FROM blocks").fetchone()[0] or 0) + 1
+
+    for seq, block in enumerate(chapter_blocks(num, kind, raw)):
+        block_type = block.get("type", "text")
+        if block_type in SKIP_BLOCKS:
+            continue
+        text = block_text(block).strip()
+        page = first_page + block.get("page_idx", 0)
+        if block.get("text_level") and text:
+            sections.append([f"Ch{num}.s{len(sections)}", text[:200], page, page])
+        sections[-1][3] = max(sections[-1][3], page)
+
+        block_id = next_id
+        next_id += 1
+        page_blocks[page] = page_blocks.get(page, 0) + 1
+        block_rows.append((block_id, num, page, seq, sections[-1][0], block_type, block.get("text_level"), text,
+                           json.dumps(block["bbox"]) if block.get("bbox") else None, block.get("img_path") or None))
+        if block_type == "page_footnote":
+            match = FOOTNOTE_NUMBER.match(text)
+            footnote_rows.append((num, page, int(match.group(1)) if match else None, text, block_id))
+        elif block.get("img_path"):
+            caption = " ".join(block.get("image_caption", []) + block.get("table_caption", []))
+            image_rows.append((num, page, block["img_path"], caption or None, block_id))
+
+    last_page = max(page_blocks) if page_blocks else first_page
+    if last_page > end_page:
+        print(f"   {label}: content runs to page {last_page}, past endPage {end_page} in CHAPTER_DEFINITIONS")
+    conn.execute("INSERT INTO chapters VALUES (?, ?, ?, ?, ?, ?)",
+                 (num, label, kind, first_page, last_page, int(kind != "content_list")))
+    conn.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?)",
+                     [(sid, num, i, title, start, end) for i, (sid, title, start, end) in enumerate(sections)])
+    conn.executemany("INSERT INTO pages VALUES (?, ?, ?)", [(num, p, n) for p, n in sorted(page_blocks.items())])
+    conn.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", block_rows)
+    conn.executemany("INSERT INTO footnotes (chapter, page, number, text, block) VALUES (?, ?, ?, ?, ?)", footnote_rows)
+    conn.executemany("INSERT INTO images (chapter, page, path, caption, block) VALUES (?, ?, ?, ?, ?)", image_rows)
+    return len(block_rows)
+
+
+def load_outline(conn: sqlite3.Connection, raw: bytes):
+    conn.execute("DELETE FROM outline")
+    conn.executemany("INSERT INTO outline VALUES (?, ?, ?, ?, ?)",
+                     [(p["pageNumber"], p["chapterId"], p.get("sectionId"), p.get("content"),
+                       json.dumps(p.get("footnotes") or [], ensure_ascii=False))
+                      for p in json.loads(raw).get("pages", [])])
+
+
+def source_changed(conn: sqlite3.Connection, key: str, kind: str, sha: str, pages: str = "") -> bool:
+    row = conn.execute("SELECT kind, sha256, pages FROM sources WHERE key = ?", (key,)).fetchone()
+    return row is None or tuple(row) != (kind, sha, pages)
+
+
+def mark_loaded(conn: sqlite3.Connection, key: str, kind: str, sha: str, pages: str = ""):
+    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                 (key, kind, sha, pages, time.strftime("%Y-%m-%dT%H:%M:%S")))
+
+
+def build_db(path: str = DB_PATH, force: bool = False) -> List[str]:
+    """Bring the database up to date. Returns the source keys that were (re)loaded."""
+    start = time.time()
+    conn = connect(path)
+    loaded = []
+    with span("textbook_db") as s:
+        sources = chapter_sources()
+        for num, (kind, raw) in sorted(sources.items()):
+            key, sha = f"Ch{num}", sha256_bytes(raw)
+            # Book pages are startPage + page_idx: a changed page range reloads the chapter
+            pages = "%d-%d" % chapter_page_range(num)
+            s.bytes_read += len(raw)
+            if not force and not source_changed(conn, key, kind, sha, pages):
+                continue
+            with conn:
+                s.items += upsert_chapter(conn, num, kind, raw)
+                mark_loaded(conn, key, kind, sha, pages)
+            loaded.append(key)
+
+        # Chapters that no longer have a source
+        for (key,) in conn.execute("SELECT key FROM sources WHERE key LIKE 'Ch%'").fetchall():
+            if int(key[2:]) not in sources:
+                with conn:
+                    delete_chapter(conn, int(key[2:]))
+                    conn.execute("DELETE FROM sources WHERE key = ?", (key,))
+                loaded.append(f"-{key}")
+
+        if os.path.exists(OUTLINE_JSON):
+            with open(OUTLINE_JSON, 'rb') as f:
+                raw = f.read()
+            sha = sha256_bytes(raw)
+            if force or source_changed(conn, "outline", "json", sha):
+                with conn:
+                    load_outline(conn, raw)
+                    mark_loaded(conn, "outline", "json", sha)
+                loaded.append("outline")
+
+        if loaded:
+            conn.execute("INSERT INTO blocks_fts (blocks_fts) VALUES ('optimize')")
+            conn.commit()
+        s.fields["loaded"] = len(loaded)
+    conn.close()
+
+    print(f"✅ {path}: loaded {', '.join(loaded) or 'nothing (up to date)'} in {time.time() - start:.2f}s")
+    return loaded
+
+
+# ============================================================================
+# QUERY API
+# ============================================================================
+
+class TextbookDB:
+    """Read-side helpers over textbook.db, opened read-only."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.conn = connect(path, readonly=True)
+
+    def page_range(self, first: int, last: int) -> List[sqlite3.Row]:
+        """All blocks on book pages first..last, in reading order."""
+        return self.conn.execute(
+            "SELECT page, section, type, text_level, text, img_path FROM blocks "
+            "WHERE page BETWEEN ? AND ? ORDER BY page, seq", (first, last)).fetchall()
+
+    def footnotes_on_page(self, page: int) -> List[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT number, text FROM footnotes WHERE page = ? ORDER BY number", (page,)).fetchall()
+
+    def section_at(self, page: int):
+        """
+        The last section starting on or before a page (the one a reader is in).
+        Where one chapter's content runs into the next chapter's pages, the
+        later chapter owns the page.
+        """
+        return self.conn.execute(
+            "SELECT s.* FROM sections s JOIN pages p ON p.chapter = s.chapter JOIN chapters c ON c.num = s.chapter "
+            "WHERE p.page = ? AND s.first_page <= ? ORDER BY c.first_page DESC, s.seq DESC LIMIT 1",
+            (page, page)).fetchone()
+
+    def section_blocks(self, section_id: str) -> List[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT page, type, text FROM blocks WHERE section = ? ORDER BY page, seq", (section_id,)).fetchall()
+
+    def search(self, query: str, limit: int = 10) -> List[sqlite3.Row]:
+        """FTS5 match ranked by bm25, with a highlighted snippet."""
+        terms = " ".join('"' + t.replace('"', '""') + '"' for t in query.split())
+        return self.conn.execute(
+            "SELECT b.page, b.section, snippet(blocks_fts, 0, '[', ']', '…', 12) AS snippet, "
+            "bm25(blocks_fts) AS score FROM blocks_fts JOIN blocks b ON b.id = blocks_fts.rowid "
+            "WHERE blocks_fts MATCH ? ORDER BY score LIMIT ?", (terms, limit)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def bench(path: str = DB_PATH, repeat: int = 200):
+    """Median latency of each query API call over pages spread across the book."""
+    db = TextbookDB(path)
+    pages = [row[0] for row in db.conn.execute("SELECT DISTINCT page FROM pages ORDER BY page")]
+    sections = [row[0] for row in db.conn.execute("SELECT id FROM sections")]
+    if not pages:
+        print("Database is empty - build it first")
+        return
+    fn_pages = [row[0] for row in db.conn.execute("SELECT DISTINCT page FROM footnotes")] or pages
+    calls = {
+        "page_range (5 pages)": lambda i: db.page_range(pages[i % len(pages)], pages[i % len(pages)] + 4),
+        "footnotes_on_page": lambda i: db.footnotes_on_page(fn_pages[i % len(fn_pages)]),
+        "section_at": lambda i: db.section_at(pages[i % len(pages)]),
+        "section_blocks": lambda i: db.section_blocks(sections[i % len(sections)]),
+        "search": lambda i: db.search(("corporation", "boot", "redemption", "liquidation")[i % 4]),
+    }
+    print(f"\n{'query':<24}{'median':>12}{'p95':>12}")
+    for name, call in calls.items():
+        times = []
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            call(i)
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        print(f"{name:<24}{statistics.median(times) * 1e6:>10.0f}µs{times[int(len(times) * 0.95)] * 1e6:>10.0f}µs")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the SQLite/FTS5 textbook store")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument("--force", action="store_true", help="Reload every source")
+    parser.add_argument("--bench", action="store_true", help="Time the query API after building")
+    parser.add_argument("--search", help="Full-text search the database")
+    args = parser.parse_args()
+
+    if args.search:
+        db = TextbookDB(args.db)
+        for row in db.search(args.search):
+            print(f"{row['score']:>7.2f}  p.{row['page']:<4} {row['section']:<10} {row['snippet']}")
+        db.close()
+        return
+
+    build_db(args.db, args.force)
+    if args.bench:
+        bench(args.db)
+
+
+if __name__ == "__main__":
+    main()
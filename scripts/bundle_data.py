@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Static Data Bundler
+
+public/data/ is served under stable names, so browsers and the CDN have to
+revalidate every chapter on every visit. This stage copies each text
+artifact (chapter JSON and markdown, the index shards,
+corporate-tax-textbook.json) to a content-hashed name and records the
+mapping:
+
+    public/data/hashed/Ch2.3f9a0c1d22e4b7a1.json      — immutable copy
+    public/data/data-manifest.json                  — {"version": 1, "files": {
+        "Ch2.json": {"path": "/data/hashed/Ch2.3f9a0c1d22e4b7a1.json", "hash": "<sha256>",
+                     "bytes": 121304, "gzip": 30211, "br": 24980}}}
+
+vercel.json serves /data/hashed/ as immutable. The client resolves
+logical names through the manifest (src/lib/data-manifest.ts), so an
+unchanged chapter keeps its URL across deploys and a repeat visit fetches
+nothing but the manifest.
+
+Only the plain copy is written. Vercel's edge compresses responses with
+gzip or brotli per Accept-Encoding, and static .gz/.br files beside it
+would never be served. gzip and brotli are still run in memory, and their
+sizes go into the manifest as a report of what each file costs on the
+wire. Sizes of files whose hash is unchanged are taken from the previous
+manifest instead of recompressing. Hashed files from the previous manifest
+are kept for one more build, so clients still holding it can finish
+loading. Older ones are deleted.
+
+brotli is optional (pip install brotli). With --zstd-dict and the optional
+zstandard package, a dictionary is also trained over the chapter shards
+and each chapter's dictionary-compressed size is recorded as "zstd". Legal
+prose repeats the same phrases across chapters, which a shared dictionary
+captures. This only measures what a dictionary would save: browsers cannot
+decode it, so nothing is written.
+
+Usage:
+    python scripts/bundle_data.py
+    python scripts/bundle_data.py --zstd-dict
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, List
+
+from atomic_io import write_atomic, write_json_atomic
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+DATA_MANIFEST_PATH = os.path.join(PUBLIC_DATA_DIR, "data-manifest.json")
+URL_PREFIX = "/data/hashed"
+MANIFEST_VERSION = 1
+HASH_CHARS = 16
+
+BUNDLE_EXTENSIONS = {".json", ".md", ".html"}
+# Build intermediates and outputs of this stage
+SKIP_DIRS = {"hashed", "mineru"}
+CHAPTER_SHARD = re.compile(r'^Ch\d+\.json$')
+ZSTD_DICT_SIZE = 112 * 1024
+ZSTD_LEVEL = 19
+
+
+def brotli_module():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def zstd_module():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def find_data_files(data_dir: str = PUBLIC_DATA_DIR) -> List[str]:
+    """Logical names (paths relative to public/data) of the files to bundle."""
+    names = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if not (root == data_dir and d in SKIP_DIRS))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, data_dir).replace(os.sep, "/")
+            if os.path.splitext(name)[1] in BUNDLE_EXTENSIONS and rel != os.path.basename(DATA_MANIFEST_PATH):
+                names.append(rel)
+    return names
+
+
+def hashed_name(logical: str, digest: str) -> str:
+    """Ch2.json -> Ch2.<hash>.json, search/meta.json -> search/meta.<hash>.json."""
+    stem, ext = os.path.splitext(logical)
+    return f"{stem}.{digest[:HASH_CHARS]}{ext}"
+
+
+def load_manifest(path: str = DATA_MANIFEST_PATH) -> dict:
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def manifest_files(manifest: dict) -> set:
+    """Paths under hashed/ a manifest refers to."""
+    return {entry["path"][len(URL_PREFIX) + 1:] for entry in manifest.get("files", {}).values()}
+
+
+# ============================================================================
+# BUNDLING
+# ============================================================================
+
+def bundle_file(logical: str, data: bytes, out_dir: str, brotli, previous: dict, stats: dict) -> dict:
+    digest = hashlib.sha256(data).hexdigest()
+    rel = hashed_name(logical, digest)
+    target = os.path.join(out_dir, rel)
+    entry = {"path": f"{URL_PREFIX}/{rel}", "hash": digest, "bytes": len(data)}
+
+    if os.path.exists(target):
+        stats["unchanged"] += 1
+    else:
+        write_atomic(target, data)
+        stats["written"] += 1
+
+    old = previous.get("files", {}).get(logical)
+    if old and old["hash"] == digest and (brotli is None or "br" in old):
+        # Same bytes as the previous build: same compressed sizes
+        entry["gzip"] = old["gzip"]
+        if brotli is not None:
+            entry["br"] = old["br"]
+        return entry
+    entry["gzip"] = len(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        entry["br"] = len(brotli.compress(data, quality=11))
+    return entry
+
+
+def measure_zstd(shards: Dict[str, bytes], manifest: dict, zstandard) -> int:
+    """Train a shared dictionary over the chapter shards and record each shard's size with it."""
+    dictionary = zstandard.train_dictionary(ZSTD_DICT_SIZE, list(shards.values()))
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    for logical, shard in shards.items():
+        manifest["files"][logical]["zstd"] = len(compressor.compress(shard))
+    return len(dictionary.as_bytes())
+
+
+def bundle_data(data_dir: str = PUBLIC_DATA_DIR, zstd_dict: bool = False) -> dict:
+    start = time.time()
+    out_dir = os.path.join(data_dir, "hashed")
+    manifest_path = os.path.join(data_dir, os.path.basename(DATA_MANIFEST_PATH))
+    previous = load_manifest(manifest_path)
+    manifest = {"version": MANIFEST_VERSION, "files": {}}
+    brotli = brotli_module()
+    stats = {"written": 0, "unchanged": 0}
+    shards: Dict[str, bytes] = {}
+
+    with span("bundle_data") as s:
+        for logical in find_data_files(data_dir):
+            with open(os.path.join(data_dir, logical), 'rb') as f:
+                data = f.read()
+            s.bytes_read += len(data)
+            manifest["files"][logical] = bundle_file(logical, data, out_dir, brotli, previous, stats)
+            if CHAPTER_SHARD.match(logical):
+                shards[logical] = data
+
+        zstandard = zstd_module() if zstd_dict else None
+        if zstd_dict and zstandard is None:
+            print("   zstandard not installed: skipping the zstd dictionary (pip install zstandard)")
+        elif zstandard is not None and shards:
+            dict_bytes = measure_zstd(shards, manifest, zstandard)
+            zst = sum(manifest["files"][logical]["zstd"] for logical in shards)
+            gz = sum(manifest["files"][logical]["gzip"] for logical in shards)
+            print(f"   zstd dictionary ({dict_bytes / 1024:.0f} KB): chapter shards {gz / 1024:.0f} KB gzip → "
+                  f"{zst / 1024:.0f} KB zstd")
+
+        # Keep this build's files and the previous build's; anything older is unreachable
+        keep = manifest_files(manifest) | manifest_files(previous)
+        removed = 0
+        for root, _, files in os.walk(out_dir):
+            for name in files:
+                rel = os.path.relpath(os.path.join(root, name), out_dir).replace(os.sep, "/")
+                if rel not in keep:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+
+        write_json_atomic(manifest_path, manifest)
+        s.items = stats["written"]
+        s.fields.update(unchanged=stats["unchanged"], removed=removed)
+
+    raw = sum(e["bytes"] for e in manifest["files"].values())
+    gz = sum(e["gzip"] for e in manifest["files"].values())
+    br = sum(e.get("br", 0) for e in manifest["files"].values())
+    print(f"✅ Bundled {len(manifest['files'])} files: {stats['written']} written, {stats['unchanged']} unchanged, "
+          f"{removed} stale removed ({time.time() - start:.2f}s) → {manifest_path}")
+    print(f"   {raw / 1024:.0f} KB raw → {gz / 1024:.0f} KB gzip" + (f", {br / 1024:.0f} KB brotli" if br else
+                                                                       " (pip install brotli for brotli sizes)"))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write content-hashed copies of public/data")
+    parser.add_argument("--data-dir", default=PUBLIC_DATA_DIR, help="Directory to bundle")
+    parser.add_argument("--zstd-dict", action="store_true",
+                        help="Also measure a zstd dictionary over the chapter shards (needs zstandard)")
+    args = parser.parse_args()
+    bundle_data(args.data_dir, args.zstd_dict)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Offline Text Cleaner
+
+Python port of src/services/text-cleaner.ts: cleanExtractedText(),
+restoreParagraphBreaks(), detectPageBoundaries() and splitIntoPages().
+Runs the header, page-number and footnote regexes once per build instead
+of in the browser on every load, and writes public/data/cleaned/:
+
+    cleaned/Ch{N}.json  — {"chapter": 2, "source": "boundaries" | "pages",
+                           "boundaries": [PageBoundary],
+                           "pages": [CleanedPage | ReaderPage],
+                           "inputs": {"71": textFingerprint of page 71's raw text, ...}}
+    cleaned/index.json  — {"chapters": {"Ch2": page count, ...}}
+
+Records have the same shape and key order as the TypeScript interfaces.
+Chapter text with page markers ("— Page 35 —" or the running heads) is
+split with split_into_pages(). Without markers, each page of the
+chapter's content list (estimated pages for markdown-only chapters) is
+cleaned on its own under its book page number. Book pages are the
+importer's (page_idx 0 is the chapter's startPage in CHAPTER_DEFINITIONS),
+so a cleaned page's pageNumber is the TextbookPage it belongs to: page 71
+of Ch2 is ch-2-p71.
+
+The regex sources are copied verbatim and compiled by js_regex() with
+JavaScript semantics (\\s is the ECMAScript whitespace set, \\d and \\w
+are ASCII, ^/$ follow the m flag). Boundary offsets are UTF-16 code units,
+as in the browser.
+
+inputs is written for "pages" chapters only. formatSectionContent() uses a
+cleaned page in place of cleanExtractedText() when the fingerprint of the
+chunk it is formatting matches, so a page imported from other text is
+still cleaned in the browser.
+
+--cases writes the inputs and these outputs for every shipped chapter;
+--fuzz N adds N seeded random page texts built from the running heads,
+footnotes and OCR errors the regexes target. scripts/verify_text_cleaner.ts
+replays them through text-cleaner.ts and reports any record that differs.
+
+Usage:
+    python scripts/clean_text.py
+    python scripts/clean_text.py --cases text-cleaner-cases.json --fuzz 9000
+    npx tsx scripts/verify_text_cleaner.ts text-cleaner-cases.json
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from atomic_io import write_json_atomic
+from build_search_index import SKIP_BLOCKS, block_text, chapter_blocks, chapter_first_page, chapter_sources
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+CLEANED_DIR = os.path.join(PUBLIC_DATA_DIR, "cleaned")
+INDEX_NAME = "index.json"
+
+# ECMAScript WhiteSpace and LineTerminator: what \s matches and trim() strips
+JS_WHITESPACE = ("\t\n\v\f\r \u00a0\u1680" + "".join(map(chr, range(0x2000, 0x200b)))
+                 + "\u2028\u2029\u202f\u205f\u3000\ufeff")
+JS_LINE_TERMINATORS = r'[\n\r\u2028\u2029]'
+# Class escapes as the members they stand for; outside a class they are wrapped in []
+JS_CLASS_ESCAPES = {'s': "".join(f"\\u{ord(c):04x}" for c in JS_WHITESPACE), 'd': '0-9', 'w': 'A-Za-z0-9_'}
+
+
+def js_regex(source: str, multiline: bool = False, ignore_case: bool = False) -> re.Pattern:
+    """
+    Compile a JavaScript regex source with JavaScript semantics: \\s, \\d and
+    \\w are rewritten everywhere, '.', '^' and '$' outside character classes,
+    and case folding is ASCII-only.
+    """
+    out, i, in_class = [], 0, False
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            escape = source[i:i + 2]
+            members = JS_CLASS_ESCAPES.get(escape[1:])
+            out.append(escape if members is None else members if in_class else f"[{members}]")
+            i += 2
+            continue
+        if in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '.':
+            c = f"(?:(?!{JS_LINE_TERMINATORS}).)"
+        elif c == '^':
+            c = f"(?:(?<={JS_LINE_TERMINATORS})|(?<![\\s\\S]))" if multiline else r'(?<![\s\S])'
+        elif c == '$':
+            c = f"(?={JS_LINE_TERMINATORS}|(?![\\s\\S]))" if multiline else r'(?![\s\S])'
+        out.append(c)
+        i += 1
+    return re.compile("".join(out), re.ASCII | (re.IGNORECASE if ignore_case else 0))
+
+
+def js_trim(text: str) -> str:
+    return text.strip(JS_WHITESPACE)
+
+
+def text_fingerprint(text: str) -> str:
+    """textFingerprint(): 32-bit FNV-1a over the UTF-16 code units, as 8 hex digits."""
+    h = 0x811c9dc5
+    data = text.encode('utf-16-le')
+    for i in range(0, len(data), 2):
+        h = ((h ^ (data[i] | data[i + 1] << 8)) * 0x01000193) & 0xffffffff
+    return f"{h:08x}"
+
+
+def utf16_len(text: str) -> int:
+    return len(text) + sum(1 for c in text if ord(c) > 0xFFFF)
+
+
+# ============================================================================
+# MAIN CLEANING FUNCTION
+# ============================================================================
+
+HEADER_PATTERNS = [
+    js_regex(r'^(AN OVERVIEW OF THE TAXATION OF CORPORATIONS|CHAPTER \d+|PART (ONE|TWO|THREE)|AND SHAREHOLDERS)',
+             multiline=True),
+    js_regex(r'^\d+\s+(INTRODUCTION|PART \d+|TAXATION OF)', multiline=True),
+    js_regex(r'(INTRODUCTION|TAXATION OF C CORPORATIONS|TAXATION OF S CORPORATIONS)\s+PART (ONE|TWO|THREE)\s*$',
+             multiline=True),
+]
+STANDALONE_NUMBER = js_regex(r'^\s*\d{1,3}\s*$', multiline=True)
+ROMAN_NUMERAL = js_regex(r'^\s*[xivlc]+\s*$', multiline=True, ignore_case=True)
+TRAILING_NUMBER = js_regex(r'\n\s*\d{1,3}\s*$')
+FOOTNOTE_START = js_regex(r'^(\d{1,2})\s+(See,?\s+e\.g\.,?|I\.R\.C\.|See\s+generally|See\s+Chapter|Pub\.\s+L\.|'
+                          r'Rev\.\s+Rul\.|Treas\.\s+Reg\.|Compare|Note\s+that|For\s+a\s+discussion)', multiline=True)
+FOOTNOTE_NUMBER = js_regex(r'^\d{1,2}\s+')
+# (pattern, replacement) in the order cleanExtractedText() applies them
+INLINE_FIXES = [
+    # "corporations.6 Congress" → "corporations. Congress"
+    (js_regex(r'([.,"\'])\s*(\d{1,2})\s+([A-Z])'), r'\1 \3'),
+    # "word6 Next" → "word Next"
+    (js_regex(r'(\w)(\d{1,2})\s+([A-Z])'), r'\1 \3'),
+    # OCR: T[.R.C. → I.R.C.
+    (js_regex(r'T\[\\.R\\.C\\.'), 'I.R.C.'),
+    (js_regex(r'=\[LR\\.C\\.'), 'I.R.C.'),
+    (js_regex(r'LR\\.C\\.'), 'I.R.C.'),
+    (js_regex(r'I\\.R\\.C\\.\\s*§"statute-ref"[^>]*'), 'I.R.C. §'),
+    # Ligatures
+    (js_regex('ﬁ'), 'fi'),
+    (js_regex('ﬂ'), 'fl'),
+    (js_regex('ﬀ'), 'ff'),
+    # Broken section symbols
+    (js_regex(r'\$\s*(\d+)'), r'§ \1'),
+    (js_regex(r'\s+'), ' '),
+]
+
+
+def clean_extracted_text(raw_text: str, page_number: int) -> dict:
+    """cleanExtractedText(): a CleanedPage for one page of raw text."""
+    cleaned = raw_text
+    header_text: Optional[str] = None
+
+    # 1. Page headers
+    for pattern in HEADER_PATTERNS:
+        match = pattern.search(cleaned)
+        if match:
+            header_text = header_text or js_trim(match.group(0))
+            cleaned = pattern.sub('', cleaned)
+
+    # 2. Standalone page numbers
+    cleaned = STANDALONE_NUMBER.sub('', cleaned)
+    cleaned = ROMAN_NUMERAL.sub('', cleaned)
+    cleaned = TRAILING_NUMBER.sub('', cleaned)
+
+    # 3. Footnotes run from their number to the next footnote or the end
+    starts = [(int(m.group(1)), m.start()) for m in FOOTNOTE_START.finditer(cleaned)]
+    footnotes = []
+    for i, (number, start) in enumerate(starts):
+        end = starts[i + 1][1] if i + 1 < len(starts) else len(cleaned)
+        footnotes.append({"number": number,
+                          "text": js_trim(FOOTNOTE_NUMBER.sub('', js_trim(cleaned[start:end]), count=1))})
+    for i in range(len(starts) - 1, -1, -1):
+        start = starts[i][1]
+        end = starts[i + 1][1] if i + 1 < len(starts) else None
+        cleaned = cleaned[:start] + cleaned[end:] if end else cleaned[:start]
+
+    # 4-6. Inline footnote references, OCR errors, whitespace
+    for pattern, replacement in INLINE_FIXES:
+        cleaned = pattern.sub(replacement, cleaned)
+    cleaned = js_trim(cleaned)
+
+    # 7. Paragraph breaks
+    page = {"pageNumber": page_number, "mainText": restore_paragraph_breaks(cleaned), "footnotes": footnotes}
+    if header_text is not None:
+        page["headerText"] = header_text
+    return page
+
+
+# ============================================================================
+# PARAGRAPH RESTORATION
+# ============================================================================
+
+BREAK_PATTERNS = [
+    # Section letters: "A. Introduction"
+    js_regex(r'\.\s+([A-H]\.\s+[A-Z][a-z]+)'),
+    # Subsection numbers: "1. The Corporate Tax"
+    js_regex(r'\.\s+(\d+\.\s+[A-Z][a-z]+)'),
+    # Sub-subsection letters: "a. Check-the-Box"
+    js_regex(r'\.\s+([a-h]\.\s+[A-Z][a-z]+)'),
+    # Topic headers
+    js_regex(r'\.\s+(The\s+(?:Double|International|Broader|Corporate|Individual|Check))'),
+    # Paragraph starters
+    js_regex(r'\.\s+(For\s+(?:many|example|much|purposes|instance))'),
+    js_regex(r'\.\s+(In\s+(?:some|many|the|response|addition|contrast|general|summary))'),
+    js_regex(r'\.\s+(Although|However|Despite|Additionally|Moreover|Furthermore|Thus|Therefore|Consequently)'),
+    # Problem/Example markers
+    js_regex(r'\.\s+(Problem\.?)'),
+    js_regex(r'\.\s+(Example\.?)'),
+    js_regex(r'\.\s+(Note\.?)'),
+]
+
+
+def restore_paragraph_breaks(text: str) -> str:
+    for pattern in BREAK_PATTERNS:
+        text = pattern.sub(r'.\n\n\1', text)
+    return text
+
+
+# ============================================================================
+# PAGE BOUNDARIES AND SPLITTING
+# ============================================================================
+
+ODD_PAGE = js_regex(r'AN OVERVIEW OF THE TAXATION OF CORPORATIONS\s+CHAPTER (\d+)\s+AND SHAREHOLDERS\s+(\d+)')
+EVEN_PAGE = js_regex(r'(\d+)\s+(INTRODUCTION|TAXATION OF C CORPORATIONS|TAXATION OF S CORPORATIONS)'
+                     r'\s+PART (ONE|TWO|THREE)')
+PAGE_MARKER = js_regex(r'—\s*Page\s+(\d+)\s*—')
+
+
+def _find_boundaries(raw_text: str) -> List[dict]:
+    """PageBoundary records with code point offsets, in text order."""
+    boundaries = []
+    for m in ODD_PAGE.finditer(raw_text):
+        boundaries.append({"pageNumber": int(m.group(2)), "chapterRef": f"CHAPTER {m.group(1)}",
+                           "sectionContext": "AN OVERVIEW OF THE TAXATION OF CORPORATIONS AND SHAREHOLDERS",
+                           "startIndex": m.start(), "endIndex": m.end()})
+    for m in EVEN_PAGE.finditer(raw_text):
+        boundaries.append({"pageNumber": int(m.group(1)), "sectionContext": m.group(2),
+                           "startIndex": m.start(), "endIndex": m.end()})
+    for m in PAGE_MARKER.finditer(raw_text):
+        boundaries.append({"pageNumber": int(m.group(1)), "startIndex": m.start(), "endIndex": m.end()})
+    return sorted(boundaries, key=lambda b: b["startIndex"])
+
+
+def detect_page_boundaries(raw_text: str) -> List[dict]:
+    """detectPageBoundaries(): offsets in UTF-16 code units, as JavaScript reports them."""
+    boundaries = _find_boundaries(raw_text)
+    if raw_text.isascii():
+        return boundaries
+    for boundary in boundaries:
+        boundary["startIndex"] = utf16_len(raw_text[:boundary["startIndex"]])
+        boundary["endIndex"] = utf16_len(raw_text[:boundary["endIndex"]])
+    return boundaries
+
+
+def _reader_page(cleaned: dict, chapter_id: str, section_id: str, section_title: str) -> dict:
+    return {"pageNumber": cleaned["pageNumber"], "chapterId": chapter_id, "sectionId": section_id,
+            "sectionTitle": section_title, "content": cleaned["mainText"], "footnotes": cleaned["footnotes"],
+            "isPageStart": True}
+
+
+def split_into_pages(raw_text: str, chapter_id: str, section_id: str, section_title: str) -> List[dict]:
+    """splitIntoPages(): ReaderPage records, one per detected page boundary."""
+    boundaries = _find_boundaries(raw_text)
+    if not boundaries:
+        return [_reader_page(clean_extracted_text(raw_text, 0), chapter_id, section_id, section_title)]
+
+    pages = []
+    for i, boundary in enumerate(boundaries):
+        end = boundaries[i + 1]["startIndex"] if i + 1 < len(boundaries) else len(raw_text)
+        cleaned = clean_extracted_text(raw_text[boundary["endIndex"]:end], boundary["pageNumber"])
+        # Skip nearly empty pages
+        if utf16_len(cleaned["mainText"]) > 10:
+            pages.append(_reader_page(cleaned, chapter_id, section_id,
+                                      boundary.get("sectionContext") or section_title))
+    return pages
+
+
+def clean_chunks(chunks: List[dict]) -> List[dict]:
+    """cleanChunks(): chunks are {"content", "pageNumbers"}."""
+    return [clean_extracted_text(chunk["content"], (chunk["pageNumbers"] or [0])[0] or 0) for chunk in chunks]
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def chapter_page_texts(num: int, blocks: List[dict]) -> Dict[int, str]:
+    """Book page -> the raw text of its blocks, footnotes last as they are printed."""
+    first_page = chapter_first_page(num)
+    body, notes = defaultdict(list), defaultdict(list)
+    for block in blocks:
+        if block.get('type') in SKIP_BLOCKS:
+            continue
+        text = block_text(block).strip()
+        if text:
+            target = notes if block.get('type') == 'page_footnote' else body
+            target[first_page + block.get('page_idx', 0)].append(text)
+    return {page: "\n".join(body[page] + notes[page]) for page in sorted(set(body) | set(notes))}
+
+
+def clean_chapter(num: int, page_texts: Dict[int, str]) -> dict:
+    raw_text = "\n".join(page_texts.values())
+    boundaries = detect_page_boundaries(raw_text)
+    if boundaries:
+        pages = split_into_pages(raw_text, f"ch-{num}", f"ch-{num}-A", f"Chapter {num}")
+        return {"chapter": num, "source": "boundaries", "boundaries": boundaries, "pages": pages}
+    return {"chapter": num, "source": "pages", "boundaries": [],
+            "pages": [clean_extracted_text(text, page) for page, text in page_texts.items()],
+            "inputs": {str(page): text_fingerprint(text) for page, text in page_texts.items()}}
+
+
+def verification_cases(num: int, page_texts: Dict[int, str]) -> dict:
+    """Inputs and Python outputs for verify_text_cleaner.ts, exercising every exported function."""
+    marked = "".join(f"\n— Page {page} —\n{text}" for page, text in page_texts.items())
+    chapter_id = f"ch-{num}"
+    return {
+        "clean": [{"input": text, "pageNumber": page, "expected": clean_extracted_text(text, page)}
+                  for page, text in page_texts.items()],
+        "fingerprint": [{"input": text, "expected": text_fingerprint(text)} for text in page_texts.values()],
+        "split": [{"input": marked, "chapterId": chapter_id, "sectionId": f"{chapter_id}-A",
+                   "sectionTitle": f"Chapter {num}",
+                   "expected": split_into_pages(marked, chapter_id, f"{chapter_id}-A", f"Chapter {num}")}],
+        "boundaries": [{"input": marked, "expected": detect_page_boundaries(marked)}],
+    }
+
+
+# Pieces of the running heads, page numbers, footnotes, OCR errors and odd
+# whitespace that the cleaner's regexes look for
+FUZZ_FRAGMENTS = [
+    "AN OVERVIEW OF THE TAXATION OF CORPORATIONS", "CHAPTER 2", "PART ONE", "AND SHAREHOLDERS",
+    "12 INTRODUCTION", "TAXATION OF S CORPORATIONS PART TWO", "35", "xiv", "— Page 71 —", "—Page 9—",
+    "6 See, e.g., Treas. Reg. § 1.351-1.", "12 I.R.C. § 351(a).", "3 Compare Rev. Rul. 68-55.",
+    "corporations.6 Congress", "word12 Next", "T[.R.C.", "=[LR.C.", "LR.C.", "ﬁnal", "ﬂow", "$ 351",
+    "The Corporate Tax", "A. Introduction", "1. The Double Tax", "b. Check-the-Box", "Problem.", "Note.",
+    "For example,", "In contrast", "However", "AN OVERVIEW OF THE TAXATION OF CORPORATIONS CHAPTER 1 "
+    "AND SHAREHOLDERS 7", "40 TAXATION OF C CORPORATIONS PART THREE", "Peracchi v. Commissioner",
+    "\u00a0", "\u2003", "\u2028", "\ufeff", "café", "𝔸", "\t", "   ", ".",
+]
+FUZZ_SEPARATORS = [" ", "\n", "\n\n", "\r\n", "", ". "]
+
+
+def fuzz_cases(count: int, seed: int = 0) -> dict:
+    """count random page texts built from FUZZ_FRAGMENTS, as verification cases."""
+    rng = random.Random(seed)
+    cases = {"clean": [], "fingerprint": [], "split": [], "boundaries": []}
+    for i in range(count):
+        text = "".join(rng.choice(FUZZ_FRAGMENTS) + rng.choice(FUZZ_SEPARATORS)
+                       for _ in range(rng.randint(1, 40)))
+        page = rng.randint(0, 999)
+        cases["clean"].append({"input": text, "pageNumber": page, "expected": clean_extracted_text(text, page)})
+        cases["fingerprint"].append({"input": text, "expected": text_fingerprint(text)})
+        if i % 10 == 0:
+            cases["split"].append({"input": text, "chapterId": "ch-0", "sectionId": "ch-0-A",
+                                   "sectionTitle": "Fuzz",
+                                   "expected": split_into_pages(text, "ch-0", "ch-0-A", "Fuzz")})
+            cases["boundaries"].append({"input": text, "expected": detect_page_boundaries(text)})
+    return cases
+
+
+def build_cleaned_pages(out_dir: str = CLEANED_DIR, cases_path: Optional[str] = None,
+                        fuzz: int = 0) -> Dict[int, dict]:
+    start = time.time()
+    chapters = {}
+    cases = {"clean": [], "fingerprint": [], "split": [], "boundaries": []}
+    with span("clean_text") as s:
+        for num, (kind, raw) in sorted(chapter_sources().items()):
+            s.bytes_read += len(raw)
+            page_texts = chapter_page_texts(num, chapter_blocks(num, kind, raw))
+            chapters[num] = clean_chapter(num, page_texts)
+            write_json_atomic(os.path.join(out_dir, f"Ch{num}.json"), chapters[num])
+            if cases_path:
+                for key, items in verification_cases(num, page_texts).items():
+                    cases[key].extend(items)
+        write_json_atomic(os.path.join(out_dir, INDEX_NAME),
+                          {"chapters": {f"Ch{num}": len(chapter["pages"]) for num, chapter in chapters.items()}})
+        s.items = sum(len(chapter["pages"]) for chapter in chapters.values())
+        if cases_path:
+            for key, items in fuzz_cases(fuzz).items():
+                cases[key].extend(items)
+            write_json_atomic(cases_path, cases)
+
+    footnotes = sum(len(page["footnotes"]) for chapter in chapters.values() for page in chapter["pages"])
+    print(f"✅ Cleaned text: {s.items:,} pages, {footnotes:,} footnotes in {len(chapters)} chapters "
+          f"in {time.time() - start:.2f}s")
+    if cases_path:
+        print(f"   Verification cases: {sum(len(v) for v in cases.values()):,} → {cases_path}")
+    return chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean extracted text once per build")
+    parser.add_argument("--out", default=CLEANED_DIR, help="Output directory")
+    parser.add_argument("--cases", help="Also write verification cases for verify_text_cleaner.ts")
+    parser.add_argument("--fuzz", type=int, default=0, help="With --cases: add this many random page texts")
+    args = parser.parse_args()
+    if args.fuzz and not args.cases:
+        parser.error("--fuzz needs --cases")
+    build_cleaned_pages(args.out, args.cases, args.fuzz)
+
+
+if __name__ == "__main__":
+    main()
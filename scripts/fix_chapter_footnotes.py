@@ -1,18 +1,27 @@
-import json
 import re
 import argparse
 import os
 import glob
+import hashlib
+import json
+from collections import defaultdict
 from typing import List, Dict, Set, Tuple
-import bisect
+
+from pipeline_telemetry import span, add_profile_argument, setup_from_args
+from atomic_io import write_json_atomic
+from block_store import load_content_list, save_content_list
+
+# Per-page repair state kept next to the repaired file: the footer map and,
+# per page, hashes of its text before/after repair and of its footnote window
+STATE_SUFFIX = ".footnotes-state.json"
+STATE_VERSION = 1
+MAX_FOOTNOTE = 300
 
 def load_json(filepath: str) -> List[Dict]:
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return load_content_list(filepath)
 
 def save_json(data: List[Dict], filepath: str):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    save_content_list(data, filepath)
 
 def get_longest_non_decreasing_subsequence(nums: List[int]) -> List[int]:
     if not nums: return []
@@ -47,7 +56,7 @@ def filter_outliers_lis(found_nums: List[Tuple[int, int]]) -> Dict[int, Set[int]
             cleaned_map[n].add(p)
     return cleaned_map
 
-def build_footer_map(data: List[Dict], verbose=False) -> Dict[int, Set[int]]:
+def footer_markers(data: List[Dict]) -> List[Tuple[int, int]]:
     found_nums = []
     for item in data:
         if item.get('type') == 'page_footnote':
@@ -56,9 +65,12 @@ def build_footer_map(data: List[Dict], verbose=False) -> Dict[int, Set[int]]:
             match = re.match(r'^\[?(\d+)\]?\.?\s', text)
             if match:
                 num = int(match.group(1))
-                if num > 300: continue 
+                if num > MAX_FOOTNOTE: continue 
                 found_nums.append((num, page_idx))
-    cleaned_map = filter_outliers_lis(found_nums)
+    return found_nums
+
+def build_footer_map(data: List[Dict], verbose=False) -> Dict[int, Set[int]]:
+    cleaned_map = filter_outliers_lis(footer_markers(data))
     return cleaned_map
 
 def get_valid_pages(num: int, footer_map: Dict[int, Set[int]]) -> Set[int]:
@@ -103,7 +115,7 @@ def cleanup_text_single_block(text: str, page_idx: int, footer_map: Dict[int, Se
     text = re.sub(r'\$\^\{(\d+)\}\$', reverter, text)
     return text
 
-def make_replacer(page_idx, footer_map, is_bracket=False, is_sup=False):
+def make_replacer(page_idx, footer_map, is_bracket=False, is_sup=False, limit=MAX_FOOTNOTE):
     def replacer(match):
         if is_bracket or is_sup:
             prefix = ''
@@ -114,7 +126,7 @@ def make_replacer(page_idx, footer_map, is_bracket=False, is_sup=False):
             num_str = match.group(2)
             full = match.group(0)
         num = int(num_str)
-        if num == 0 or num > 300: return full
+        if num == 0 or num > limit: return full
         valid_pages = get_valid_pages(num, footer_map)
         if page_idx in valid_pages:
             return f'{prefix}$^{{{num_str}}}$'
@@ -122,53 +134,160 @@ def make_replacer(page_idx, footer_map, is_bracket=False, is_sup=False):
             return full
     return replacer
 
-def process_file(json_path):
-    print(f"Processing {json_path}...")
+def page_windows(footer_map: Dict[int, Set[int]]) -> Dict[int, int]:
+    """
+    page_idx -> bitmask of the footnote numbers valid on that page. This is all
+    of the footer map a page's repair depends on; bit MAX_FOOTNOTE + 1 stands
+    for every number above MAX_FOOTNOTE, which share one window.
+    """
+    windows = defaultdict(int)
+    for num in range(MAX_FOOTNOTE + 2):
+        for p in get_valid_pages(num, footer_map):
+            windows[p] |= 1 << num
+    return windows
+
+def content_hash(value) -> str:
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+def state_path(json_path: str) -> str:
+    return json_path + STATE_SUFFIX
+
+def load_state(json_path: str):
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(state_path(json_path), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
 
-        footer_map = build_footer_map(data)
-        
-        cleaned_data = []
-        cleanup_count = 0
+def repair_text(text: str, page_idx: int, footer_map: Dict[int, Set[int]], limit=MAX_FOOTNOTE,
+                verbose=False) -> Tuple[str, str]:
+    """Revert footnote refs invalid on this page, then mark valid ones; returns (cleaned, repaired)."""
+    cleaned_text = cleanup_text_single_block(text, page_idx, footer_map, verbose)
+    res = cleaned_text
+    res = re.sub(r'\[(\d+)\]', make_replacer(page_idx, footer_map, is_bracket=True, limit=limit), res)
+    res = re.sub(r'<sup>(\d+)</sup>', make_replacer(page_idx, footer_map, is_sup=True, limit=limit), res)
+    res = re.sub(r'([a-z\.\,\"\”])(\d+)(?=\s|$)', make_replacer(page_idx, footer_map, limit=limit), res)
+    res = re.sub(r'([a-z])(\d+)(?=\s|$)', make_replacer(page_idx, footer_map, limit=limit), res)
+    return cleaned_text, res
+
+def repair_item(item: Dict, footer_map: Dict[int, Set[int]]) -> Tuple[bool, bool]:
+    """Cleanup then fix one text block in place; returns (cleaned, modified)."""
+    orig_text = item.get('text', '')
+    if not orig_text:
+        return False, False
+    cleaned_text, res = repair_text(orig_text, item.get('page_idx'), footer_map)
+    item['text'] = res
+    return cleaned_text != orig_text, res != cleaned_text
+
+def repair_markdown(md: str, original: List[Dict], repaired: List[Dict]) -> Tuple[str, int, int]:
+    """
+    Apply a content list's footnote repairs to the markdown MinerU rendered from
+    it: each changed block's original text is found in md, in reading order, and
+    replaced by its repaired text. Returns (markdown, replaced, not found).
+    """
+    out, pos, replaced, missing = [], 0, 0, 0
+    for before, after in zip(original, repaired):
+        old, new = before.get('text', ''), after.get('text', '')
+        if not old or old == new:
+            continue
+        i = md.find(old, pos)
+        if i < 0:
+            missing += 1
+            continue
+        out += [md[pos:i], new]
+        pos = i + len(old)
+        replaced += 1
+    out.append(md[pos:])
+    return ''.join(out), replaced, missing
+
+def process_file(json_path, source=None):
+    """
+    Repair json_path in place, or repair source into json_path. Pages whose text
+    and footnote window match the last run's state are skipped; with a source,
+    their repaired text is taken from the existing json_path.
+    """
+    chapter = os.path.basename(os.path.dirname(json_path)) or None
+    with span("fix_footnotes", chapter=chapter, file=json_path) as s:
+        return _process_file(json_path, s, source)
+
+def _process_file(json_path, s, source=None):
+    input_path = source or json_path
+    print(f"Processing {input_path}...")
+    try:
+        s.bytes_read = os.path.getsize(input_path)
+        data = load_json(input_path)
+        s.items = len(data)
+        state = load_state(json_path)
+
+        # The LIS behind the footer map only reruns when the footnote markers change
+        markers = footer_markers(data)
+        markers_hash = content_hash(markers)
+        if state and state["markers"] == markers_hash:
+            footer_map = {int(n): set(pages) for n, pages in state["footer_map"].items()}
+        else:
+            footer_map = filter_outliers_lis(markers)
+        windows = page_windows(footer_map)
+
+        pages = defaultdict(list)
         for item in data:
             if item.get('type') == 'text':
-                page_idx = item.get('page_idx')
-                orig_text = item.get('text', '')
-                if orig_text:
-                    cleaned_item_text = cleanup_text_single_block(orig_text, page_idx, footer_map)
-                    if cleaned_item_text != orig_text:
-                        cleanup_count += 1
-                    item['text'] = cleaned_item_text
-            cleaned_data.append(item)
-        
-        fixed_data = []
-        changes_count = 0
-        for item in cleaned_data:
-            if item.get('type') == 'text':
-                page_idx = item.get('page_idx')
-                orig_text = item.get('text', '')
-                if orig_text:
-                    res = orig_text
-                    res = re.sub(r'\[(\d+)\]', make_replacer(page_idx, footer_map, is_bracket=True), res)
-                    res = re.sub(r'<sup>(\d+)</sup>', make_replacer(page_idx, footer_map, is_sup=True), res)
-                    res = re.sub(r'([a-z\.\,\"\”])(\d+)(?=\s|$)', make_replacer(page_idx, footer_map), res)
-                    res = re.sub(r'([a-z])(\d+)(?=\s|$)', make_replacer(page_idx, footer_map), res)
-                    
-                    if res != orig_text:
-                        changes_count += 1
-                    item['text'] = res
-            fixed_data.append(item)
-
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(fixed_data, f, indent=4, ensure_ascii=False)
-            
+                pages[item.get('page_idx')].append(item)
+
+        previous = defaultdict(list)
+        if source and state and os.path.exists(json_path):
+            for item in load_json(json_path):
+                if item.get('type') == 'text':
+                    previous[item.get('page_idx')].append(item.get('text', ''))
+
+        old_pages = state["pages"] if state else {}
+        new_pages = {}
+        skipped = cleanup_count = changes_count = 0
+        for page_idx, items in pages.items():
+            key = str(page_idx)
+            in_hash = content_hash([item.get('text', '') for item in items])
+            window = format(windows.get(page_idx, 0), 'x')
+            old = old_pages.get(key)
+            if old and old["window"] == window:
+                if in_hash == old["out"]:
+                    # Already repaired under this footnote window
+                    skipped += 1
+                    new_pages[key] = old
+                    continue
+                prev_texts = previous.get(page_idx, [])
+                if in_hash == old["in"] and len(prev_texts) == len(items) and content_hash(prev_texts) == old["out"]:
+                    for item, text in zip(items, prev_texts):
+                        item['text'] = text
+                    skipped += 1
+                    new_pages[key] = old
+                    continue
+
+            for item in items:
+                cleaned, modified = repair_item(item, footer_map)
+                cleanup_count += cleaned
+                changes_count += modified
+            new_pages[key] = {"in": in_hash, "out": content_hash([item.get('text', '') for item in items]),
+                              "window": window}
+
+        if source or skipped < len(pages) or not state:
+            save_json(data, json_path)
+            s.bytes_written = os.path.getsize(json_path)
+        write_json_atomic(state_path(json_path), {
+            "version": STATE_VERSION,
+            "markers": markers_hash,
+            "footer_map": {str(n): list(pages_) for n, pages_ in footer_map.items()},
+            "pages": new_pages,
+        })
+        s.fields.update(cleanup_revisions=cleanup_count, blocks_modified=changes_count,
+                        pages_skipped=skipped, pages=len(pages))
+
+        print(f"Pages skipped: {skipped}/{len(pages)}")
         print(f"Cleanup revisions: {cleanup_count}")
         print(f"Total blocks modified: {changes_count}")
         print(f"Done: {json_path}")
         return True
     except Exception as e:
+        s.fields["error"] = str(e)
         print(f"Error processing {json_path}: {e}")
         return False
 
@@ -176,13 +295,15 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", help="Single JSON file to fix")
     parser.add_argument("--root", help="Root directory to scan for content_list.json")
+    add_profile_argument(parser)
     args = parser.parse_args()
+    setup_from_args(args)
 
     if args.file:
         process_file(args.file)
     elif args.root:
-        pattern = os.path.join(args.root, "**", "*_content_list.json")
-        files = glob.glob(pattern, recursive=True)
+        files = [f for ext in (".json", ".blocks")
+                 for f in glob.glob(os.path.join(args.root, "**", f"*_content_list{ext}"), recursive=True)]
         print(f"Found {len(files)} files in {args.root}")
         for f in files:
             process_file(f)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Heading Classifier
+
+One rule set for heading levels, shared by fix_mineru_content.py,
+process_ch1_v2.py, process_ch1_v3.py and restructure-ch1.py.
+
+Signals, strongest first:
+1. "CHAPTER 1" / "PART TWO" eyebrow labels
+2. Enumerator prefixes: "A. " -> 2, "1. " -> 3, "a. " -> 4. An enumerator
+   that does not continue its sequence (the "A. Background" inside an
+   excerpt that follows section H) is nested as deep as possible (4).
+   Titles set in capitals ("A. TITLE") are trusted in any order, since the
+   parse can emit sections out of order. Only title blocks are promoted:
+   a body paragraph opening "1. " or "a. " stays body text unless the
+   caller passes promote_enumerated=True. The Chapter 1 renderers do that,
+   because their input carries no title marking.
+3. MinerU text_level, when the chapter uses more than one level
+4. Height tiers learned per chapter: the heights of every heading block
+   are clustered in one sorted pass, splitting at the widest gaps.
+   Tiers taller than TITLE_HEIGHT are chapter titles (1) and the rest
+   map to 2, 3 in order.
+
+Levels are classified in document order, since the enumerator sequence
+carries state from one heading to the next.
+
+Usage:
+    python scripts/heading_classifier.py Ch3_content_list.json
+"""
+
+import argparse
+import re
+from typing import Dict, Iterable, List, Optional
+
+BODY = 0
+EYEBROW = -1
+TITLE_HEIGHT = 50
+MAX_TIERS = 3
+# A tier boundary needs a gap this wide, absolute and relative to the shorter height
+MIN_GAP = 2.0
+GAP_RATIO = 0.2
+CAPITALS_RATIO = 0.7
+# Enumerated text longer than this is a list item or paragraph, not a heading
+MAX_HEADING_CHARS = 100
+
+EYEBROW_PATTERN = re.compile(r'^(?:CHAPTER|PART)\s+\w+$', re.IGNORECASE)
+# (kind, pattern, natural level)
+ENUMERATORS = [
+    ("upper", re.compile(r'^([A-H])\.\s'), 2),
+    ("number", re.compile(r'^(\d+)\.\s'), 3),
+    ("lower", re.compile(r'^(?!v\.)([a-z])\.\s'), 4),
+]
+DEEPEST = 4
+LEVEL_CLASSES = {2: "main-section", 3: "subsection", 4: "sub-subsection"}
+
+
+def block_height(block: dict) -> float:
+    bbox = block.get('bbox') or []
+    return (bbox[3] - bbox[1]) if len(bbox) >= 4 else 0
+
+
+def is_heading_block(block: dict) -> bool:
+    return block.get('type') in ('title', 'heading') or (block.get('text_level') or 0) > 0
+
+
+def cluster_tiers(heights: Iterable[float], max_tiers: int = MAX_TIERS) -> List[float]:
+    """Lower bounds of up to max_tiers height tiers, tallest first, cut at the widest gaps."""
+    values = sorted({round(h, 1) for h in heights if h > 0})
+    gaps = sorted(((values[i + 1] - values[i], i) for i in range(len(values) - 1)), reverse=True)
+    cuts = [i for gap, i in gaps[:max_tiers - 1] if gap >= max(MIN_GAP, GAP_RATIO * values[i])]
+    return sorted((values[i + 1] for i in cuts), reverse=True)
+
+
+def _mostly_capitals(title: str) -> bool:
+    """OCR lowercases stray letters ("TaxATION"), so 'capitals' means at least CAPITALS_RATIO of them."""
+    letters = [c for c in title if c.isalpha()]
+    return bool(letters) and sum(c.isupper() for c in letters) >= CAPITALS_RATIO * len(letters)
+
+
+def _enumerator_value(kind: str, token: str) -> int:
+    return int(token) if kind == "number" else ord(token.lower()) - ord('a') + 1
+
+
+class HeadingClassifier:
+    """Heading levels for one chapter; call level()/classify_text() in document order."""
+
+    def __init__(self, tiers: Optional[List[float]] = None, text_levels: bool = False):
+        self.tiers = tiers or []
+        self.text_levels = text_levels
+        self.reset()
+
+    @classmethod
+    def fit(cls, blocks: List[dict]) -> "HeadingClassifier":
+        """Learn height tiers from a chapter's heading blocks."""
+        headings = [b for b in blocks if is_heading_block(b)
+                    and not EYEBROW_PATTERN.match(str(b.get('text', '')).strip())]
+        text_levels = len({b.get('text_level') or 1 for b in headings}) > 1
+        return cls(cluster_tiers(block_height(b) for b in headings), text_levels)
+
+    def reset(self):
+        """Start a new document: forget the enumerator sequence."""
+        self._last: Dict[str, int] = {}
+
+    def _sequence_level(self, kind: str, value: int, natural: int, trusted: bool = False) -> int:
+        last = self._last.get(kind)
+        # Sections run A-H once per chapter; numbers and letters restart at 1
+        if trusted or last is None or value in (last, last + 1) or (kind != "upper" and value == 1):
+            self._last[kind] = value
+            for child_kind, _, child_level in ENUMERATORS:
+                if child_level > natural:
+                    self._last.pop(child_kind, None)
+            return natural
+        return DEEPEST
+
+    def height_level(self, height: float) -> int:
+        if height > TITLE_HEIGHT:
+            return 1
+        below_title = [t for t in self.tiers if t <= TITLE_HEIGHT]
+        tier = next((i for i, bound in enumerate(below_title) if height >= bound), len(below_title))
+        return min(2 + tier, 3)
+
+    def classify_text(self, text: str, is_heading: bool = False, height: float = 0, text_level: int = 0,
+                      promote_enumerated: bool = False) -> int:
+        """
+        BODY, EYEBROW or a heading level 1-4 for one block's text. With
+        promote_enumerated, short enumerated text is a heading even when the
+        block is not a title.
+        """
+        text = text.strip()
+        if is_heading and EYEBROW_PATTERN.match(text):
+            return EYEBROW
+        if is_heading or (promote_enumerated and len(text) < MAX_HEADING_CHARS):
+            for kind, pattern, natural in ENUMERATORS:
+                match = pattern.match(text)
+                if match:
+                    # Section titles are set in capitals: trust those whatever order the parse put them in
+                    trusted = _mostly_capitals(text[match.end():])
+                    return self._sequence_level(kind, _enumerator_value(kind, match.group(1)), natural, trusted)
+        if not is_heading:
+            return BODY
+        if self.text_levels and text_level:
+            return min(text_level, 3)
+        return self.height_level(height)
+
+    def level(self, block: dict, text: Optional[str] = None, promote_enumerated: bool = False) -> int:
+        if text is None:
+            text = str(block.get('text', ''))
+        return self.classify_text(text, is_heading_block(block), block_height(block), block.get('text_level') or 0,
+                                  promote_enumerated)
+
+
+def main():
+    from block_store import load_content_list
+
+    parser = argparse.ArgumentParser(description="Show the heading levels learned for a content list")
+    parser.add_argument("content_list")
+    args = parser.parse_args()
+
+    blocks = load_content_list(args.content_list)
+    classifier = HeadingClassifier.fit(blocks)
+    print(f"Height tiers: {classifier.tiers or 'single tier'}  text_level hierarchy: {classifier.text_levels}")
+    for block in blocks:
+        if block.get('type') != 'text':
+            continue
+        level = classifier.level(block)
+        if level != BODY:
+            label = "eyebrow" if level == EYEBROW else f"h{level}"
+            print(f"  p{block.get('page_idx', 0):>3} {label:<8} {str(block.get('text', ''))[:80]}")
+
+
+if __name__ == "__main__":
+    main()
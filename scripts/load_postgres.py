@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Postgres Bulk Loader
+
+Loads the textbook records the pipeline builds into the schema in
+supabase-schema.sql, on Supabase or on a local Postgres:
+
+    textbooks → parts → chapters → sections → subsections → subsubsections
+              → textbook_pages → page_footnotes
+
+Records come from scripts/build_record_deltas.py, the same ones the app's
+IndexedDB import gets. Ids are therefore stable (ch-2-A, ch-2-p71) and a
+reload updates rows in place. The old upload scripts inserted random ids,
+so a reload under them added rows instead.
+
+Each table is loaded in one transaction. Rows are streamed with COPY into
+a temp staging table, then merged:
+
+    INSERT ... SELECT FROM stage ON CONFLICT (id) DO UPDATE ... WHERE row IS DISTINCT FROM EXCLUDED
+
+Unchanged rows are not rewritten. For the chapters, sections and pages
+being loaded, rows that are no longer built are deleted. That includes the
+random-id pages the old scripts left behind.
+
+Row hashes of the last successful load are kept per database in
+.db-load-state.json, so a rerun only ships rows whose content changed.
+--full ignores them.
+
+Connections set prepare_threshold=None, so the Supabase transaction
+pooler (port 6543) works as well as a direct connection.
+
+Sections, pages and footnotes are built only for chapters with a content
+list (public/data/Ch*_content_list.json or parsed-chapters/). A checkout
+without any would load parts and chapters alone, so the loader stops
+instead and names the chapters it is missing.
+
+--init-schema applies supabase-schema.sql to a plain Postgres as well: it
+stubs the auth schema, and skips the uuid-ossp extension when the server
+was built without contrib (no column default uses it).
+
+psycopg 3 is optional (pip install "psycopg[binary]"). Without it,
+--dry-run still reports how many rows each table would send; nothing is
+inserted, so it reports no inserted, updated or deleted counts.
+
+scripts/verify_pipeline.py loads a synthetic chapter into a scratch
+database when VERIFY_POSTGRES_DSN is set, and checks reruns, --full and
+the deletion of stray rows.
+
+Usage:
+    python scripts/load_postgres.py --dsn postgresql://postgres@localhost/taxprep --init-schema
+    DATABASE_URL=postgresql://... python scripts/load_postgres.py
+    python scripts/load_postgres.py --dry-run
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_json_atomic
+from build_record_deltas import build_records, record_hash
+from build_section_tree import SECTION_TREE_PATH
+from pipeline_telemetry import span
+
+SCHEMA_PATH = "supabase-schema.sql"
+STATE_PATH = ".db-load-state.json"
+DSN_ENV = ("DATABASE_URL", "SUPABASE_DB_URL")
+
+TEXTBOOK = {"id": "corporate-tax", "user_id": None, "title": "Fundamentals of Corporate Taxation",
+            "file_name": "corporate-tax-textbook", "total_pages": 910, "processed": True}
+# (Postgres table, Dexie table), parents first
+TABLES = [
+    ("textbooks", None),
+    ("parts", "parts"),
+    ("chapters", "chapters"),
+    ("sections", "sections"),
+    ("subsections", "subsections"),
+    ("subsubsections", "subsubsections"),
+    ("textbook_pages", "textbookPages"),
+    ("page_footnotes", "pageFootnotes"),
+]
+# table -> (column, parent table): under each parent id being loaded, ids no longer built are deleted.
+# Sections and pages are scoped by their own chapters, so chapters without a content list keep theirs.
+REPLACE_SCOPE = {
+    "sections": ("chapter_id", "sections"),
+    "subsections": ("section_id", "sections"),
+    "subsubsections": ("subsection_id", "subsections"),
+    "textbook_pages": ("chapter_id", "textbook_pages"),
+    "page_footnotes": ("page_id", "textbook_pages"),
+}
+# What supabase-schema.sql needs from Supabase, for a plain local Postgres
+LOCAL_AUTH_STUB = """
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (id UUID PRIMARY KEY);
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE AS 'SELECT NULL::uuid';
+"""
+# No column default uses uuid-ossp, so a Postgres built without contrib can skip it
+UUID_EXTENSION = 'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'
+
+
+def snake_case(name: str) -> str:
+    return re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', name).lower()
+
+
+def table_rows(tree_path: str = SECTION_TREE_PATH) -> Dict[str, List[dict]]:
+    """Postgres table -> rows with snake_case columns."""
+    if not os.path.exists(tree_path):
+        raise SystemExit(f"❌ No section tree at {tree_path}: run scripts/build_section_tree.py first")
+    records = build_records(tree_path)
+    rows = {"textbooks": [dict(TEXTBOOK)]}
+    for table, dexie in TABLES[1:]:
+        rows[table] = [{snake_case(k): v for k, v in r.items()} for r in records[dexie]]
+    return rows
+
+
+def dsn_key(dsn: str) -> str:
+    """State key for a database: the DSN without its password."""
+    return hashlib.sha256(re.sub(r'://([^:/@]+):[^@]*@', r'://\1@', dsn).encode('utf-8')).hexdigest()[:16]
+
+
+def load_state(dsn: str) -> Dict[str, Dict[str, str]]:
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get(dsn_key(dsn), {})
+    return {}
+
+
+def save_state(dsn: str, hashes: Dict[str, Dict[str, str]]):
+    state = {}
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    state[dsn_key(dsn)] = hashes
+    write_json_atomic(STATE_PATH, state)
+
+
+def connect(dsn: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit('❌ psycopg is not installed: pip install "psycopg[binary]" (or use --dry-run)')
+    # No server-side prepared statements: they break under the Supabase transaction pooler
+    return psycopg.connect(dsn, prepare_threshold=None)
+
+
+def init_schema(conn, path: str = SCHEMA_PATH):
+    """Apply supabase-schema.sql to a database that does not have it yet."""
+    # Its own transaction: left open, it would turn each table's transaction into a savepoint of it
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.textbook_pages') IS NOT NULL")
+        if cur.fetchone()[0]:
+            print("   Schema already present")
+            return
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = 'auth')")
+        if not cur.fetchone()[0]:
+            cur.execute(LOCAL_AUTH_STUB)
+            print("   No auth schema (plain Postgres): created a minimal auth.users/auth.uid()")
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+        cur.execute("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'uuid-ossp')")
+        if not cur.fetchone()[0]:
+            sql = sql.replace(UUID_EXTENSION, "")
+            print("   No uuid-ossp extension (Postgres without contrib): skipped it")
+        cur.execute(sql)
+    print(f"   Applied {path}")
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def table_columns(cur, table: str) -> List[str]:
+    cur.execute("SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position", (table,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def scope_ids(table: str, rows: Dict[str, List[dict]]) -> List[str]:
+    """Parent ids whose children in table are replaced by this load."""
+    column, parent = REPLACE_SCOPE[table]
+    if parent == table:
+        return sorted({r[column] for r in rows[table]})
+    return sorted(r["id"] for r in rows[parent])
+
+
+def merge_table(conn, table: str, rows: List[dict], changed: List[dict],
+                scope: Optional[List[str]]) -> Tuple[int, int, int]:
+    """COPY changed rows through a staging table and merge them; returns (inserted, updated, deleted)."""
+    with conn.transaction(), conn.cursor() as cur:
+        present = {key for row in rows for key in row}
+        columns = [c for c in table_columns(cur, table) if c in present]
+        inserted = updated = deleted = 0
+        if changed:
+            column_list = ", ".join(columns)
+            cur.execute(f"CREATE TEMP TABLE stage (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            with cur.copy(f"COPY stage ({column_list}) FROM STDIN") as copy:
+                for row in changed:
+                    copy.write_row([row.get(c) for c in columns])
+            updates = [c for c in columns if c != "id"]
+            cur.execute(
+                f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM stage "
+                f"ON CONFLICT (id) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updates)} "
+                f"WHERE ({', '.join(f'{table}.{c}' for c in updates)}) "
+                f"IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in updates)}) "
+                f"RETURNING (xmax = 0)")
+            results = [r[0] for r in cur.fetchall()]
+            inserted = sum(results)
+            updated = len(results) - inserted
+
+        if scope:
+            cur.execute(f"DELETE FROM {table} WHERE {REPLACE_SCOPE[table][0]} = ANY(%s) AND NOT (id = ANY(%s))",
+                        (scope, [r["id"] for r in rows]))
+            deleted = cur.rowcount
+    return inserted, updated, deleted
+
+
+def load(dsn: Optional[str], full: bool = False, dry_run: bool = False, schema: bool = False,
+         tree_path: str = SECTION_TREE_PATH) -> dict:
+    start = time.time()
+    rows = table_rows(tree_path)
+    # Sections, pages and footnotes exist only for chapters that publish a content list
+    with_pages = {r["chapter_id"] for r in rows["textbook_pages"]}
+    without = [c["number"] for c in rows["chapters"] if c["id"] not in with_pages]
+    if without:
+        print(f"   No sections, pages or footnotes (no content list): {', '.join(f'Ch{n}' for n in without)}")
+    if not with_pages and not dry_run:
+        raise SystemExit("❌ No chapter has a content list, so only parts and chapters would load: "
+                         "publish content lists (scripts/publish_chapter.py) and rebuild the section tree")
+    hashes = {table: {r["id"]: record_hash(r) for r in records} for table, records in rows.items()}
+    previous = {} if full or dry_run or not dsn else load_state(dsn)
+    report = {}
+
+    conn = None if dry_run else connect(dsn)
+    try:
+        if conn is not None and schema:
+            init_schema(conn)
+        with span("load_postgres") as s:
+            for table, _ in TABLES:
+                table_start = time.time()
+                known = previous.get(table, {})
+                changed = [r for r in rows[table] if known.get(r["id"]) != hashes[table][r["id"]]]
+                s.bytes_read += sum(len(json.dumps(r, ensure_ascii=False)) for r in changed)
+                if conn is None:
+                    counts = (0, 0, 0)
+                else:
+                    scope = scope_ids(table, rows) if table in REPLACE_SCOPE else None
+                    counts = merge_table(conn, table, rows[table], changed, scope)
+                elapsed = time.time() - table_start
+                report[table] = {"rows": len(rows[table]), "sent": len(changed), "inserted": counts[0],
+                                 "updated": counts[1], "deleted": counts[2], "seconds": elapsed}
+                if conn is None:
+                    print(f"  {table:<16} {len(rows[table]):>6} rows  {len(changed):>6} would send")
+                    continue
+                rate = len(changed) / elapsed if elapsed > 0 else 0
+                print(f"  {table:<16} {len(rows[table]):>6} rows  {len(changed):>6} sent  "
+                      f"+{counts[0]} ~{counts[1]} -{counts[2]}  {rate:>10,.0f} rows/s")
+            s.items = sum(r["sent"] for r in report.values())
+        if conn is not None:
+            save_state(dsn, hashes)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    elapsed = time.time() - start
+    sent = sum(r["sent"] for r in report.values())
+    total = sum(r['rows'] for r in report.values())
+    if dry_run:
+        print(f"✅ Dry run: would send {sent:,} of {total:,} rows ({elapsed:.2f}s)")
+    else:
+        print(f"✅ Loaded {sent:,} of {total:,} rows in {elapsed:.2f}s "
+              f"({sent / elapsed if elapsed > 0 else 0:,.0f} rows/s)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load textbook records into Postgres/Supabase")
+    parser.add_argument("--dsn", help=f"Postgres connection string (default: ${DSN_ENV[0]} or ${DSN_ENV[1]})")
+    parser.add_argument("--init-schema", action="store_true", help=f"Apply {SCHEMA_PATH} first if it is missing")
+    parser.add_argument("--full", action="store_true", help="Send every row, not just rows changed since the last load")
+    parser.add_argument("--dry-run", action="store_true", help="Build the rows and report, without connecting")
+    args = parser.parse_args()
+
+    dsn = args.dsn or next((os.environ[k] for k in DSN_ENV if os.environ.get(k)), None)
+    if not dsn and not args.dry_run:
+        parser.error(f"no database: pass --dsn or set {DSN_ENV[0]}")
+    load(dsn, args.full, args.dry_run, args.init_schema)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+MinerU API Scheduler
+
+parse_mineru_api.py sends every chapter in one batch. The API may reject
+that batch outright, and when it does the script has nothing left to
+fall back on. parse_mineru_sequential.py goes the other way and converts
+one file per invocation. This scheduler sits between the two:
+
+- Two token buckets model the API quotas: requests per minute, and
+  pages per day refilled continuously. Every create and poll call takes a
+  request token. A batch also takes its pages before it is sent, so the
+  scheduler waits for quota locally instead of being refused.
+- Batches are packed at submission time, first-fit decreasing, up to
+  --batch-pages pages and --max-files files. When page quota runs low
+  they shrink to the pages on hand, so small chapters keep going while a
+  large one waits for the refill. Files over the per-file page or size
+  limit are reported and skipped.
+- Up to --in-flight batches are processed at once. Each one is polled
+  every --poll-interval seconds, and finished chapters are downloaded and
+  published as soon as they are done.
+- A chapter whose upload fails is reported as failed and dropped from its
+  batch, so the batch can still finish. A batch still unfinished
+  --max-batch-age hours after submission is given up on and its remaining
+  chapters are reported as failed.
+- When the API cannot be reached (connection error, timeout), the create
+  or poll is retried after a back-off that doubles with each consecutive
+  error, up to MAX_NETWORK_BACKOFF.
+- When throttled (HTTP 429/503), the scheduler backs off for Retry-After.
+  A request throttle halves the modelled request rate. A page throttle
+  empties the page bucket and halves its refill rate. A concurrency
+  throttle lowers the in-flight limit. After RECOVER_AFTER clean calls,
+  rates and the in-flight limit grow back toward their configured values
+  (AIMD).
+
+--simulate runs the scheduler against FakeMinerU, a local fake of the API
+with its own quotas and page throughput, on a virtual clock. It compares
+three strategies on the same workload: sequential (one file at a time),
+unmodelled (batches sent with no local quota model, relying on
+throttling) and scheduled. For each it reports the hours taken, how close
+that is to the fastest the fake's quotas and speed allow, and the
+requests and throttles. Days of API time simulate in well under a second,
+and no key or network is needed.
+
+Limits default to MinerU's documented ones. They are flags, because quotas
+differ per account.
+
+Usage:
+    python scripts/mineru_scheduler.py                              # Convert pdf-processing/chapters via the API
+    python scripts/mineru_scheduler.py --in-flight 3 --batch-pages 300
+    python scripts/mineru_scheduler.py --simulate                   # Compare strategies on the fake API
+    python scripts/mineru_scheduler.py --simulate --true-rpm 2 --poll-interval 10 --in-flight 4
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from typing import Dict, List
+
+from pipeline_telemetry import span, add_profile_argument, setup_from_args
+
+REQUESTS_PER_MINUTE = 60
+PAGES_PER_DAY = 2000
+MAX_FILE_PAGES = 600
+MAX_FILE_BYTES = 200 * 1024 * 1024
+MAX_BATCH_FILES = 200
+BATCH_PAGES = 200
+IN_FLIGHT = 2
+POLL_INTERVAL = 30.0
+# Consecutive unthrottled calls before the request rate / in-flight limit grow back
+RECOVER_AFTER = 10
+MIN_REQUEST_RATE = 1 / 60
+DAY = 86400.0
+# Back-off after a network error, doubled per consecutive error
+NETWORK_BACKOFF = 30.0
+MAX_NETWORK_BACKOFF = 900.0
+MAX_BATCH_AGE = 6 * 3600.0
+
+
+class Throttled(Exception):
+    """The API refused a call for quota: kind is "requests", "pages" or "concurrency"."""
+
+    def __init__(self, kind: str, retry_after: float):
+        super().__init__(f"throttled ({kind}), retry after {retry_after:.0f}s")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class Unreachable(Exception):
+    """The API could not be reached (connection error, timeout); the call can be retried."""
+
+
+class TokenBucket:
+    """rate tokens/second up to capacity, against an injectable clock."""
+
+    def __init__(self, rate: float, capacity: float, clock):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.stamp = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, n: float) -> float:
+        """Seconds until n tokens are available (inf if n exceeds the capacity)."""
+        if n > self.capacity:
+            return math.inf
+        self._refill()
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n: float) -> bool:
+        if self.wait_time(n) > 0:
+            return False
+        self.tokens -= n
+        return True
+
+    def give(self, n: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + n)
+
+    def drain(self):
+        self._refill()
+        self.tokens = 0.0
+
+
+class Chapter:
+    """One file to convert."""
+
+    def __init__(self, name: str, path: str, pages: int, size: int):
+        self.name = name
+        self.path = path
+        self.pages = pages
+        self.size = size
+
+
+class Batch:
+    def __init__(self, chapters: List[Chapter]):
+        self.chapters = chapters
+        self.pages = sum(c.pages for c in chapters)
+        self.next_poll = 0.0
+        self.deadline = math.inf
+        self.finished = set()
+
+
+def take_batch(pending: List[Chapter], limit: float, max_files: int = MAX_BATCH_FILES) -> List[Chapter]:
+    """
+    The next batch from pending (sorted largest first): first-fit up to
+    limit pages. If no chapter fits, the largest one goes alone, so
+    chapters over the batch size still get sent.
+    """
+    batch, pages = [], 0
+    for chapter in pending:
+        if pages + chapter.pages <= limit and len(batch) < max_files:
+            batch.append(chapter)
+            pages += chapter.pages
+    return batch or pending[:1]
+
+
+def split_oversized(chapters: List[Chapter], max_pages: int = MAX_FILE_PAGES, max_bytes: int = MAX_FILE_BYTES):
+    """(chapters within the per-file limits, [(chapter, reason)] for the rest)."""
+    ok, rejected = [], []
+    for chapter in chapters:
+        if chapter.pages > max_pages:
+            rejected.append((chapter, f"{chapter.pages} pages > {max_pages}"))
+        elif chapter.size > max_bytes:
+            rejected.append((chapter, f"{chapter.size / 1e6:.0f} MB > {max_bytes / 1e6:.0f} MB"))
+        else:
+            ok.append(chapter)
+    return ok, rejected
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class Scheduler:
+    """
+    Runs batches through a client (MinerUClient or FakeMinerU) within the
+    modelled quotas. With model=False the buckets are ignored and only
+    throttling slows it down.
+    """
+
+    def __init__(self, client, clock=time.monotonic, sleep=time.sleep,
+                 requests_per_minute: float = REQUESTS_PER_MINUTE, pages_per_day: float = PAGES_PER_DAY,
+                 batch_pages: int = BATCH_PAGES, max_files: int = MAX_BATCH_FILES, in_flight: int = IN_FLIGHT,
+                 poll_interval: float = POLL_INTERVAL, max_batch_age: float = MAX_BATCH_AGE, model: bool = True,
+                 verbose: bool = True):
+        self.client = client
+        self.clock = clock
+        self.sleep = sleep
+        self.base_rate = requests_per_minute / 60
+        self.base_page_rate = pages_per_day / DAY
+        self.requests = TokenBucket(self.base_rate, max(1.0, requests_per_minute / 6), clock)
+        self.pages = TokenBucket(pages_per_day / DAY, pages_per_day, clock)
+        # A batch must fit the page bucket, or it would never be admitted
+        self.batch_pages = min(batch_pages, pages_per_day) if model else batch_pages
+        self.max_files = max_files
+        self.max_in_flight = self.in_flight_limit = in_flight
+        self.poll_interval = poll_interval
+        self.max_batch_age = max_batch_age
+        self.model = model
+        self.verbose = verbose
+        self.resume_at = 0.0
+        self.clean_calls = 0
+        self.network_errors = 0
+        self.stats = {"requests": 0, "batches": 0, "pages": 0, "files": 0, "failed": 0, "network_errors": 0,
+                      "throttled": {"requests": 0, "pages": 0, "concurrency": 0}}
+
+    def log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    # ---- quota model ----
+
+    def wait_for(self, pages: int = 0) -> float:
+        """Seconds until one request (and pages, if any) fits the model and any back-off has passed."""
+        wait = max(0.0, self.resume_at - self.clock())
+        if self.model:
+            wait = max(wait, self.requests.wait_time(1), self.pages.wait_time(pages) if pages else 0.0)
+        return wait
+
+    def call(self, fn, *args, pages: int = 0):
+        """Make one API call, charging the buckets; Throttled and Unreachable are recorded and re-raised."""
+        self.requests.take(1)
+        if pages:
+            self.pages.take(pages)
+        self.stats["requests"] += 1
+        try:
+            result = fn(*args)
+        except Throttled as t:
+            if pages:
+                self.pages.give(pages)
+            self.throttled(t)
+            raise
+        except Unreachable as e:
+            if pages:
+                self.pages.give(pages)
+            self.unreachable(e)
+            raise
+        self.network_errors = 0
+        self.clean_calls += 1
+        if self.clean_calls >= RECOVER_AFTER:
+            self.clean_calls = 0
+            self.requests.rate = min(self.base_rate, self.requests.rate + self.base_rate / 10)
+            self.pages.rate = min(self.base_page_rate, self.pages.rate + self.base_page_rate / 10)
+            self.in_flight_limit = min(self.max_in_flight, self.in_flight_limit + 1)
+        return result
+
+    def throttled(self, t: Throttled):
+        self.stats["throttled"][t.kind] += 1
+        self.clean_calls = 0
+        self.resume_at = max(self.resume_at, self.clock() + t.retry_after)
+        if t.kind == "requests":
+            self.requests.rate = max(MIN_REQUEST_RATE, self.requests.rate / 2)
+            self.requests.drain()
+        elif t.kind == "pages":
+            self.pages.rate = max(self.base_page_rate / 16, self.pages.rate / 2)
+            self.pages.drain()
+        else:
+            self.in_flight_limit = max(1, self.in_flight_limit - 1)
+        self.log(f"   Throttled ({t.kind}): backing off {t.retry_after:.0f}s, "
+                 f"{self.requests.rate * 60:.1f} req/min, {self.in_flight_limit} in flight")
+
+    def unreachable(self, e: Unreachable):
+        self.stats["network_errors"] += 1
+        backoff = min(MAX_NETWORK_BACKOFF, NETWORK_BACKOFF * 2 ** self.network_errors)
+        self.network_errors += 1
+        self.resume_at = max(self.resume_at, self.clock() + backoff)
+        self.log(f"   API unreachable ({e}): retrying in {backoff:.0f}s")
+
+    def expire(self, batch_id: str, batch: Batch):
+        """Give up on a batch past its deadline: its unfinished chapters fail."""
+        left = [c.name for c in batch.chapters if os.path.basename(c.path) not in batch.finished]
+        self.stats["failed"] += len(left)
+        self.log(f"FAILED: batch {batch_id} unfinished after {self.max_batch_age / 3600:g}h: {', '.join(left)}")
+
+    # ---- main loop ----
+
+    def next_batch(self, pending: List[Chapter]):
+        """(chapters for the next batch, seconds to wait first). Batches shrink to the page tokens on hand."""
+        limit = self.batch_pages
+        if self.model:
+            self.pages.wait_time(0)
+            limit = min(limit, self.pages.tokens)
+            fitting = [c for c in pending if c.pages <= self.pages.tokens]
+            if not fitting:
+                return [], self.wait_for(pending[-1].pages)
+            pending = fitting
+        wait = self.wait_for()
+        return ([], wait) if wait > 0 else (take_batch(pending, limit, self.max_files), 0.0)
+
+    def run(self, chapters: List[Chapter]) -> dict:
+        start = self.clock()
+        pending = sorted(chapters, key=lambda c: c.pages, reverse=True)
+        if self.model:
+            for chapter in [c for c in pending if c.pages > self.pages.capacity]:
+                self.log(f"   {chapter.name}: {chapter.pages} pages exceed the daily quota, skipped")
+                self.stats["failed"] += 1
+            pending = [c for c in pending if c.pages <= self.pages.capacity]
+        in_flight: Dict[str, Batch] = {}
+        self.log(f"Scheduling {len(pending)} files ({sum(c.pages for c in pending)} pages)")
+
+        while pending or in_flight:
+            # Submit while there is room and quota
+            submit_wait = 0.0
+            while pending and len(in_flight) < self.in_flight_limit:
+                chosen, submit_wait = self.next_batch(pending)
+                if not chosen:
+                    break
+                for chapter in chosen:
+                    pending.remove(chapter)
+                batch = Batch(chosen)
+                try:
+                    batch_id, urls = self.call(self.client.create_batch, batch.chapters, pages=batch.pages)
+                except (Throttled, Unreachable):
+                    pending = sorted(pending + chosen, key=lambda c: c.pages, reverse=True)
+                    submit_wait = max(0.0, self.resume_at - self.clock())
+                    break
+                except RuntimeError as e:
+                    self.log(f"   Batch of {len(chosen)} failed to submit: {e}")
+                    self.stats["failed"] += len(chosen)
+                    continue
+                self.stats["batches"] += 1
+                failed = self.client.upload(batch.chapters, urls)
+                for chapter in failed:
+                    self.log(f"FAILED: {chapter.name} - upload failed, dropped from batch {batch_id}")
+                    self.stats["failed"] += 1
+                batch.chapters = [c for c in batch.chapters if c not in failed]
+                if not batch.chapters:
+                    continue
+                batch.next_poll = self.clock() + self.poll_interval
+                batch.deadline = self.clock() + self.max_batch_age
+                in_flight[batch_id] = batch
+                self.log(f"Submitted batch {batch_id}: {len(chosen)} files, {batch.pages} pages "
+                         f"({len(in_flight)} in flight, {len(pending)} files pending)")
+
+            # Poll the batches that are due
+            for batch_id, batch in list(in_flight.items()):
+                if self.clock() >= batch.deadline:
+                    self.expire(batch_id, batch)
+                    del in_flight[batch_id]
+                    continue
+                if batch.next_poll > self.clock() or self.wait_for() > 0:
+                    continue
+                try:
+                    results = self.call(self.client.poll, batch_id)
+                except (Throttled, Unreachable):
+                    break
+                batch.next_poll = self.clock() + self.poll_interval
+                self.collect(batch, results)
+                if len(batch.finished) == len(batch.chapters):
+                    del in_flight[batch_id]
+
+            # Sleep until the next poll or submission the quota allows
+            now = self.clock()
+            events = [max(b.next_poll, now + self.wait_for()) for b in in_flight.values()]
+            if pending and len(in_flight) < self.in_flight_limit:
+                events.append(now + submit_wait)
+            if events:
+                self.sleep(max(min(events) - now, 0.01))
+
+        self.stats["seconds"] = self.clock() - start
+        return self.stats
+
+    def collect(self, batch: Batch, results: List[dict]):
+        pages = {os.path.basename(c.path): c.pages for c in batch.chapters}
+        for item in results:
+            name = item.get("file_name", "")
+            if name in batch.finished or name not in pages:
+                continue
+            if item.get("state") == "done":
+                batch.finished.add(name)
+                if self.client.download(item):
+                    self.stats["files"] += 1
+                    self.stats["pages"] += pages[name]
+                else:
+                    self.stats["failed"] += 1
+            elif item.get("state") == "failed":
+                batch.finished.add(name)
+                self.stats["failed"] += 1
+                self.log(f"FAILED: {name} - {item.get('err_msg')}")
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+def retry_after(resp, default: float = 60.0) -> float:
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+
+class MinerUClient:
+    """The MinerU.net batch API, with quota refusals raised as Throttled and network errors as Unreachable."""
+
+    def __init__(self, publish: bool = True):
+        from parse_mineru_api import api_headers
+        self.headers = api_headers()
+        self.publish = publish
+
+    def _check(self, resp, kind: str):
+        if resp.status_code in (429, 503):
+            raise Throttled(kind, retry_after(resp))
+        if resp.status_code != 200:
+            raise RuntimeError(f"{resp.status_code} - {resp.text[:200]}")
+        data = resp.json()
+        if data.get("code") != 0:
+            raise RuntimeError(f"API Error: {data.get('msg')}")
+        return data["data"]
+
+    def create_batch(self, chapters: List[Chapter]):
+        import requests
+        from parse_mineru_api import BASE_URL
+        payload = {
+            "files": [{"name": os.path.basename(c.path), "data_id": os.path.basename(c.path),
+                       "enable_table": True, "enable_formula": True} for c in chapters],
+            "model_version": "vlm",
+        }
+        with span("api_create_batch") as s:
+            s.items = len(chapters)
+            try:
+                data = self._check(requests.post(f"{BASE_URL}/file-urls/batch", headers=self.headers,
+                                                 json=payload, timeout=30), "pages")
+            except requests.RequestException as e:
+                raise Unreachable(str(e)) from e
+        return data["batch_id"], data["file_urls"]
+
+    def upload(self, chapters: List[Chapter], urls: List[str]) -> List[Chapter]:
+        """Upload each chapter to its URL; returns the chapters that failed."""
+        from concurrent.futures import ThreadPoolExecutor
+        from parse_mineru_api import upload_single
+        tasks = [(c.path, url, i + 1, len(chapters)) for i, (c, url) in enumerate(zip(chapters, urls))]
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            uploaded = list(executor.map(upload_single, tasks))
+        # A chapter the API returned no URL for was not uploaded either
+        return [c for i, c in enumerate(chapters) if i >= len(uploaded) or not uploaded[i]]
+
+    def poll(self, batch_id: str) -> List[dict]:
+        import requests
+        from parse_mineru_api import BASE_URL
+        try:
+            resp = requests.get(f"{BASE_URL}/extract-results/batch/{batch_id}", headers=self.headers, timeout=30)
+            return self._check(resp, "requests").get("extract_result", [])
+        except requests.RequestException as e:
+            raise Unreachable(str(e)) from e
+
+    def download(self, item: dict) -> bool:
+        from parse_mineru_api import download_and_extract, publish_downloaded
+        if not download_and_extract(item):
+            return False
+        return publish_downloaded(item["file_name"]) if self.publish else True
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+class FakeMinerU:
+    """
+    Local stand-in for the batch API: its own request and page quotas, a
+    cap on unfinished batches, and a server that converts pages_per_minute
+    pages at a time, first come first served.
+    """
+
+    def __init__(self, clock, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 pages_per_day: float = PAGES_PER_DAY, pages_per_minute: float = 60.0, max_batches: int = 5):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 6), clock)
+        self.pages = TokenBucket(pages_per_day / DAY, pages_per_day, clock)
+        self.pages_per_second = pages_per_minute / 60
+        self.max_batches = max_batches
+        self.busy_until = 0.0
+        self.batches: Dict[str, Dict[str, float]] = {}
+
+    def _request(self):
+        if not self.requests.take(1):
+            raise Throttled("requests", math.ceil(self.requests.wait_time(1)))
+
+    def create_batch(self, chapters: List[Chapter]):
+        self._request()
+        now = self.clock()
+        running = sum(1 for files in self.batches.values() if max(files.values()) > now)
+        if running >= self.max_batches:
+            raise Throttled("concurrency", 60)
+        pages = sum(c.pages for c in chapters)
+        if not self.pages.take(pages):
+            raise Throttled("pages", math.ceil(min(self.pages.wait_time(pages), DAY)))
+        batch_id = f"fake-{len(self.batches) + 1}"
+        files = {}
+        for chapter in chapters:
+            self.busy_until = max(self.busy_until, now) + chapter.pages / self.pages_per_second
+            files[os.path.basename(chapter.path)] = self.busy_until
+        self.batches[batch_id] = files
+        return batch_id, [f"fake://upload/{batch_id}/{name}" for name in files]
+
+    def upload(self, chapters: List[Chapter], urls: List[str]) -> List[Chapter]:
+        return []
+
+    def poll(self, batch_id: str) -> List[dict]:
+        self._request()
+        now = self.clock()
+        return [{"file_name": name, "state": "done" if now >= done_at else "running",
+                 "full_zip_url": f"fake://zip/{name}"} for name, done_at in self.batches[batch_id].items()]
+
+    def download(self, item: dict) -> bool:
+        return True
+
+
+# ============================================================================
+# WORKLOAD
+# ============================================================================
+
+def chapter_workload(input_dir: str = "pdf-processing/chapters") -> List[Chapter]:
+    """The chapters parse_mineru_api.py would send, with page counts from splitter.CHAPTERS."""
+    from parse_mineru_api import get_chapter_files
+    pages = chapter_pages()
+    chapters = []
+    for path in get_chapter_files():
+        name = os.path.splitext(os.path.basename(path))[0]
+        chapters.append(Chapter(name, path, pages.get(name, 0), os.path.getsize(path)))
+    return chapters
+
+
+def chapter_pages() -> Dict[str, int]:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pdf-processing"))
+    from splitter import CHAPTERS
+    return {label: end - start + 1 for start, end, label in CHAPTERS}
+
+
+def simulated_workload(copies: int) -> List[Chapter]:
+    """copies of the book's chapters (Ch1 excluded, as the API scripts do), ~150 KB a page."""
+    names = [(f"{label}_copy{i}" if copies > 1 else label, pages)
+             for i in range(copies) for label, pages in chapter_pages().items() if not label.startswith("Ch1_")]
+    return [Chapter(name, f"{name}.pdf", pages, pages * 150_000) for name, pages in names]
+
+
+def simulate(args) -> List[dict]:
+    chapters = simulated_workload(args.copies)
+    total = sum(c.pages for c in chapters)
+    # Fastest possible: conversion speed, or the burst of one day's quota then its refill rate
+    best = max(total / (args.pages_per_minute * 60), (total - args.true_pages_per_day) / (args.true_pages_per_day / 24))
+    strategies = [
+        ("sequential", dict(batch_pages=1, max_files=1, in_flight=1)),
+        ("unmodelled", dict(batch_pages=args.batch_pages, in_flight=args.in_flight, model=False)),
+        ("scheduled", dict(batch_pages=args.batch_pages, in_flight=args.in_flight)),
+    ]
+    print(f"Workload: {len(chapters)} files, {total} pages. Fake API: {args.true_rpm:g} req/min, "
+          f"{args.true_pages_per_day:g} pages/day, {args.pages_per_minute:g} pages/min, "
+          f"{args.max_batches} unfinished batches")
+    print(f"Best possible: {best:.1f} hours ({total / best:,.0f} pages/hour)\n")
+    print(f"  {'strategy':<12} {'hours':>7} {'pages/h':>8} {'of best':>8} {'batches':>8} {'requests':>9} "
+          f"{'throttled (req/pages/conc)':>27}")
+    rows = []
+    for name, options in strategies:
+        clock = VirtualClock()
+        api = FakeMinerU(clock, args.true_rpm, args.true_pages_per_day, args.pages_per_minute, args.max_batches)
+        scheduler = Scheduler(api, clock, clock.sleep, args.rpm, args.pages_per_day,
+                              poll_interval=args.poll_interval, verbose=args.verbose, **options)
+        with span("mineru_simulate", strategy=name) as s:
+            stats = scheduler.run(chapters)
+            s.items = stats["files"]
+        hours = stats["seconds"] / 3600
+        rate = stats["pages"] / hours if hours else 0
+        t = stats["throttled"]
+        print(f"  {name:<12} {hours:>7.1f} {rate:>8,.0f} {best / hours if hours else 0:>8.0%} {stats['batches']:>8} "
+              f"{stats['requests']:>9} {t['requests']:>13}/{t['pages']}/{t['concurrency']}")
+        rows.append(dict(stats, strategy=name, pages_per_hour=rate))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert chapters with the MinerU.net API within its quotas")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE, help="Modelled requests per minute")
+    parser.add_argument("--pages-per-day", type=float, default=PAGES_PER_DAY, help="Modelled page quota per day")
+    parser.add_argument("--batch-pages", type=int, default=BATCH_PAGES, help="Target pages per batch")
+    parser.add_argument("--max-files", type=int, default=MAX_BATCH_FILES, help="Files per batch")
+    parser.add_argument("--in-flight", type=int, default=IN_FLIGHT, help="Batches processed at once")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Seconds between polls of a batch")
+    parser.add_argument("--max-batch-age", type=float, default=MAX_BATCH_AGE / 3600,
+                        help="Hours after which an unfinished batch is given up on")
+    parser.add_argument("--no-publish", action="store_true", help="Don't publish chapters as they finish")
+    parser.add_argument("--verbose", action="store_true", help="With --simulate: log every batch and throttle")
+    sim = parser.add_argument_group("simulation")
+    sim.add_argument("--simulate", action="store_true", help="Run against the local fake API on a virtual clock")
+    sim.add_argument("--copies", type=int, default=5, help="Copies of the book's chapters to convert")
+    sim.add_argument("--true-rpm", type=float, default=REQUESTS_PER_MINUTE / 2,
+                     help="The fake API's real request quota (default: half the modelled one)")
+    sim.add_argument("--true-pages-per-day", type=float, default=PAGES_PER_DAY, help="The fake API's page quota")
+    sim.add_argument("--pages-per-minute", type=float, default=60.0, help="The fake API's conversion speed")
+    sim.add_argument("--max-batches", type=int, default=5, help="Unfinished batches the fake API accepts")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
+
+    if args.simulate:
+        simulate(args)
+        return
+
+    chapters, rejected = split_oversized(chapter_workload())
+    for chapter, reason in rejected:
+        print(f"Skipping {chapter.name}: {reason} (split it first)")
+    if not chapters:
+        print("No files found.")
+        return
+    scheduler = Scheduler(MinerUClient(publish=not args.no_publish), requests_per_minute=args.rpm,
+                          pages_per_day=args.pages_per_day, batch_pages=args.batch_pages, max_files=args.max_files,
+                          in_flight=args.in_flight, poll_interval=args.poll_interval,
+                          max_batch_age=args.max_batch_age * 3600)
+    with span("api_schedule") as s:
+        stats = scheduler.run(chapters)
+        s.items = stats["files"]
+        s.fields.update(batches=stats["batches"], requests=stats["requests"], **{
+            f"throttled_{k}": v for k, v in stats["throttled"].items()})
+    hours = stats["seconds"] / 3600
+    print(f"✅ {stats['files']} files ({stats['pages']} pages) in {stats['batches']} batches, "
+          f"{stats['failed']} failed, {stats['network_errors']} network retries, {hours:.2f}h ({stats['pages'] / hours if hours else 0:,.0f} pages/h)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Figure Image Optimizer
+
+MinerU writes full-resolution JPEGs named by content hash into
+output/<uuid>/<Chapter>/auto/images/. For each chapter's current run
+(scripts/asset_store.py), this stage transcodes each one to WebP (and
+AVIF where Pillow supports it) at the WIDTHS not wider than the original,
+drops EXIF and other metadata, and writes public/data/images/:
+
+    images/<stem>-<width>.webp / .avif     — variants
+    images/<stem>.jpg                      — metadata-free fallback at full width
+    images/manifest.json                   — {"version": 1, "widths": [...], "images": {
+        "<stem>": {"chapter": 15, "sourceHash": "...", "width": 1654, "height": 980,
+                   "bytes": 201344, "src": "/data/images/<stem>.jpg",
+                   "sources": [{"type": "image/avif", "srcSet": "... 480w, ..."}, ...],
+                   "variantBytes": 48210}}}
+
+ReaderBlock renders the sources as a <picture> srcset with intrinsic
+width/height (no layout shift) and loading="lazy".
+
+Images whose source hash matches the manifest entry, and whose outputs
+all exist, are skipped. The rest are transcoded in parallel.
+
+Pillow is optional. Without it, each image's dimensions are read from the
+JPEG/PNG header and the original is published unchanged as the fallback.
+The variants are produced by the next build that has Pillow.
+
+Usage:
+    python scripts/optimize_images.py
+    python scripts/optimize_images.py --jobs 8 --force
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_json_atomic
+from asset_store import current_run_dirs
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+IMAGES_DIR = os.path.join(PUBLIC_DATA_DIR, "images")
+MANIFEST_NAME = "manifest.json"
+IMAGE_GLOB = os.path.join("output", "*", "*", "auto", "images", "*")
+URL_PREFIX = "/data/images"
+MANIFEST_VERSION = 1
+
+WIDTHS = [480, 960, 1440]
+# (format, Pillow encoder, MIME type, encoder options), smallest first so the browser tries it first
+FORMATS = [
+    ("avif", "AVIF", "image/avif", {"quality": 50}),
+    ("webp", "WEBP", "image/webp", {"quality": 80, "method": 6}),
+]
+FALLBACK_QUALITY = 85
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def header_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG SOF or PNG IHDR header, without decoding the image."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', data[16:24])
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def pillow():
+    """The PIL.Image module, or None if Pillow is not installed."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def supported_formats(Image) -> List[tuple]:
+    return [f for f in FORMATS if f[1] in Image.SAVE]
+
+
+def find_images() -> Dict[str, dict]:
+    """Stem -> {"path", "chapter"} for every figure in each chapter's current MinerU run."""
+    images = {}
+    for chapter, run_dir in sorted(current_run_dirs().items()):
+        for path in sorted(glob.glob(os.path.join(run_dir, "auto", "images", "*"))):
+            stem, ext = os.path.splitext(os.path.basename(path))
+            if ext.lower() in SOURCE_EXTENSIONS:
+                images[stem] = {"path": path, "chapter": chapter}
+    return images
+
+
+def variant_widths(width: int) -> List[int]:
+    """WIDTHS that downscale the image, plus its own width when narrower than the widest."""
+    widths = [w for w in WIDTHS if w < width]
+    if width <= WIDTHS[-1]:
+        widths.append(width)
+    return widths or [WIDTHS[-1]]
+
+
+# ============================================================================
+# TRANSCODING
+# ============================================================================
+
+def optimize_image(stem: str, source: dict, source_hash: str, out_dir: str) -> dict:
+    """Write one image's variants and fallback; returns its manifest entry."""
+    path = source["path"]
+    ext = os.path.splitext(path)[1].lower()
+    entry = {"chapter": source["chapter"], "sourceHash": source_hash, "bytes": os.path.getsize(path),
+             "sources": [], "variantBytes": 0}
+    Image = pillow()
+
+    if Image is None:
+        width, height = header_dimensions(path) or (0, 0)
+        fallback = f"{stem}{ext}"
+        shutil.copyfile(path, os.path.join(out_dir, fallback))
+        entry.update(width=width, height=height, src=f"{URL_PREFIX}/{fallback}", files=[fallback])
+        return entry
+
+    with Image.open(path) as opened:
+        opened.load()
+        # Converting drops EXIF/XMP/ICC; the figures are scanned page art in sRGB already
+        image = opened.convert("RGBA" if opened.mode in ("RGBA", "LA", "P") and ext == ".png" else "RGB")
+    width, height = image.size
+    files = []
+
+    for name, encoder, mime, options in supported_formats(Image):
+        srcset = []
+        for w in variant_widths(width):
+            resized = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+            filename = f"{stem}-{w}.{name}"
+            target = os.path.join(out_dir, filename)
+            resized.save(target + ".tmp", encoder, **options)
+            os.replace(target + ".tmp", target)
+            entry["variantBytes"] += os.path.getsize(target)
+            files.append(filename)
+            srcset.append(f"{URL_PREFIX}/{filename} {w}w")
+        entry["sources"].append({"type": mime, "srcSet": ", ".join(srcset)})
+
+    fallback = f"{stem}.png" if image.mode == "RGBA" else f"{stem}.jpg"
+    target = os.path.join(out_dir, fallback)
+    if image.mode == "RGBA":
+        image.save(target + ".tmp", "PNG", optimize=True)
+    else:
+        image.save(target + ".tmp", "JPEG", quality=FALLBACK_QUALITY, optimize=True, progressive=True)
+    os.replace(target + ".tmp", target)
+    files.append(fallback)
+    entry.update(width=width, height=height, src=f"{URL_PREFIX}/{fallback}", files=files)
+    return entry
+
+
+def is_current(entry: Optional[dict], source_hash: str, out_dir: str, with_variants: bool) -> bool:
+    """The manifest entry was built from this source and its files are all still there."""
+    if not entry or entry.get("sourceHash") != source_hash:
+        return False
+    if with_variants and not entry.get("sources"):
+        # Built without Pillow last time; now it can produce the variants
+        return False
+    return all(os.path.exists(os.path.join(out_dir, f)) for f in entry.get("files", []))
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def optimize_images(out_dir: str = IMAGES_DIR, jobs: int = 4, force: bool = False) -> dict:
+    start = time.time()
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("version") == MANIFEST_VERSION and cached.get("widths") == WIDTHS:
+            previous = cached.get("images", {})
+
+    os.makedirs(out_dir, exist_ok=True)
+    Image = pillow()
+    sources = find_images()
+    images, todo = {}, []
+    with span("optimize_images") as s:
+        for stem, source in sorted(sources.items()):
+            source_hash = file_hash(source["path"])
+            s.bytes_read += os.path.getsize(source["path"])
+            if is_current(previous.get(stem), source_hash, out_dir, Image is not None):
+                images[stem] = previous[stem]
+            else:
+                todo.append((stem, source, source_hash))
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            # Pillow releases the GIL while encoding, so threads keep the cores busy
+            futures = {stem: pool.submit(optimize_image, stem, source, h, out_dir) for stem, source, h in todo}
+            for stem, future in futures.items():
+                images[stem] = future.result()
+
+        # Outputs of images that are no longer extracted
+        keep = {f for entry in images.values() for f in entry.get("files", [])} | {MANIFEST_NAME}
+        for filename in os.listdir(out_dir):
+            if filename not in keep and not filename.endswith(".tmp"):
+                os.remove(os.path.join(out_dir, filename))
+
+        write_json_atomic(manifest_path, {"version": MANIFEST_VERSION, "widths": WIDTHS,
+                                          "images": dict(sorted(images.items()))})
+        s.items = len(todo)
+        s.fields["skipped"] = len(images) - len(todo)
+
+    original = sum(e["bytes"] for e in images.values())
+    variants = sum(e["variantBytes"] for e in images.values())
+    print(f"✅ Images: {len(todo)} optimized, {len(images) - len(todo)} unchanged "
+          f"({time.time() - start:.2f}s) → {out_dir}")
+    if Image is None:
+        print("   Pillow not installed: published originals with header dimensions (pip install Pillow)")
+    elif original:
+        print(f"   Originals {original / 1024:.0f} KB → {variants / 1024:.0f} KB for all variants of "
+              f"{len(supported_formats(Image))} formats")
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode MinerU figures to responsive WebP/AVIF variants")
+    parser.add_argument("--out", default=IMAGES_DIR, help="Output directory")
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel workers (default 4)")
+    parser.add_argument("--force", action="store_true", help="Re-encode even if sources are unchanged")
+    args = parser.parse_args()
+    optimize_images(args.out, args.jobs, args.force)
+
+
+if __name__ == "__main__":
+    main()
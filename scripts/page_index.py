@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Page Index for content_list.json
+
+Builds a sidecar <file>.pages.json mapping each page_idx to the byte ranges
+of its blocks in the (indent=4) content list, plus the page_footnote
+markers the footnote fixers need for their footer map. PageReader then
+memory-maps the content list and json-decodes only the requested pages,
+so inspecting or repairing a page costs the same on a 40-page chapter and
+a 4,000-page one.
+
+write_pages() splices repaired blocks back in place, formatted exactly as
+json.dump(..., indent=4) would, and shifts the index instead of rebuilding
+it.
+
+The index remembers the file's size and mtime; if the file changed behind
+its back it is rebuilt (one full parse) on next use. .blocks files are
+columnar already and are read whole.
+
+Usage:
+    python scripts/page_index.py build Ch3_content_list.json
+    python scripts/page_index.py show Ch3_content_list.json --pages 10-12
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+from atomic_io import write_atomic, write_json_atomic
+from block_store import EXTENSION as BLOCKS_EXTENSION, load_content_list
+
+INDEX_SUFFIX = ".pages.json"
+INDEX_VERSION = 1
+# Same marker rule as build_footer_map() in the footnote fixers
+FOOTNOTE_MARKER = re.compile(r'^\[?(\d+)\]?\.?\s')
+
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def parse_pages(spec: str) -> Tuple[int, int]:
+    """'10-12' -> (10, 12); '7' -> (7, 7); 'all' -> (0, 99999)."""
+    if spec == 'all':
+        return 0, 99999
+    if '-' in spec:
+        start, end = spec.split('-')
+        return int(start), int(end)
+    return int(spec), int(spec)
+
+
+def footnote_marker(block: dict):
+    if block.get('type') != 'page_footnote':
+        return None
+    match = FOOTNOTE_MARKER.match(block.get('text', '').strip())
+    if match and int(match.group(1)) <= 300:
+        return [int(match.group(1)), block.get('page_idx')]
+    return None
+
+
+def build_index(path: str) -> dict:
+    """One full pass over the JSON array, recording each block's byte span."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    text = raw.decode('utf-8')
+    decoder = json.JSONDecoder()
+
+    pages: Dict[str, List[List[int]]] = {}
+    counts: Dict[str, int] = {}
+    markers = []
+    last_page = None
+    pos = text.index('[') + 1
+    byte_pos, char_pos = 0, 0
+    while True:
+        while text[pos] in ' \t\r\n,':
+            pos += 1
+        if text[pos] == ']':
+            break
+        block, end = decoder.raw_decode(text, pos)
+        # Char -> byte offsets, advancing incrementally
+        byte_pos += len(text[char_pos:pos].encode('utf-8'))
+        start_byte = byte_pos
+        byte_pos += len(text[pos:end].encode('utf-8'))
+        char_pos = pos = end
+
+        # Consecutive blocks of a page share one range (separators included)
+        page = str(block.get('page_idx', -1))
+        ranges = pages.setdefault(page, [])
+        if page == last_page:
+            ranges[-1][1] = byte_pos
+        else:
+            ranges.append([start_byte, byte_pos])
+        counts[page] = counts.get(page, 0) + 1
+        last_page = page
+        marker = footnote_marker(block)
+        if marker:
+            markers.append(marker)
+
+    st = os.stat(path)
+    index = {
+        "version": INDEX_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "pages": pages,
+        "blocks": counts,
+        "footnote_markers": markers,
+    }
+    write_json_atomic(index_path(path), index)
+    return index
+
+
+def load_index(path: str) -> dict:
+    """The sidecar index, rebuilt if missing or stale."""
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        st = os.stat(path)
+        if (index.get("version") == INDEX_VERSION and index["size"] == st.st_size
+                and index["mtime_ns"] == st.st_mtime_ns):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_index(path)
+
+
+# ============================================================================
+# READER
+# ============================================================================
+
+class PageReader:
+    """Decode only the blocks of the requested pages from a memory-mapped content list."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.columnar = path.endswith(BLOCKS_EXTENSION)
+        self._all = None
+        if self.columnar:
+            self._all = load_content_list(path)
+            self.index = {"pages": {}, "footnote_markers": [m for m in map(footnote_marker, self._all) if m]}
+            for block in self._all:
+                self.index["pages"].setdefault(str(block.get('page_idx', -1)), [])
+            return
+        self.index = load_index(path)
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.index["size"] else b""
+
+    def page_numbers(self) -> List[int]:
+        return sorted(int(p) for p in self.index["pages"])
+
+    def footnote_markers(self) -> List[Tuple[int, int]]:
+        """(footnote number, page_idx) of every page_footnote block, without reading the file."""
+        return [tuple(m) for m in self.index["footnote_markers"]]
+
+    def read_page(self, page_idx: int) -> List[dict]:
+        if self.columnar:
+            return [b for b in self._all if b.get('page_idx', -1) == page_idx]
+        blocks = []
+        for start, end in self.index["pages"].get(str(page_idx), []):
+            # A range may hold several consecutive blocks: wrap it back into an array
+            blocks.extend(json.loads(b"[" + self._mm[start:end] + b"]"))
+        return blocks
+
+    def read_pages(self, first: int, last: int) -> Dict[int, List[dict]]:
+        return {p: self.read_page(p) for p in self.page_numbers() if first <= p <= last}
+
+    def close(self):
+        if not self.columnar:
+            if self.index["size"]:
+                self._mm.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _render_blocks(blocks: List[dict]) -> bytes:
+    """Blocks as they appear inside json.dump(list, indent=4): 4-space nested, comma-joined."""
+    parts = [json.dumps(b, indent=4, ensure_ascii=False).replace("\n", "\n    ") for b in blocks]
+    return ",\n    ".join(parts).encode('utf-8')
+
+
+def write_pages(path: str, pages: Dict[int, List[dict]]):
+    """
+    Replace the blocks of the given pages in place and shift the sidecar index.
+    Falls back to a full rewrite for .blocks files and for pages whose blocks
+    are not contiguous in the file.
+    """
+    from block_store import save_content_list
+
+    index = None if path.endswith(BLOCKS_EXTENSION) else load_index(path)
+    if index is None or any(len(index["pages"].get(str(p), [])) != 1 or not blocks for p, blocks in pages.items()):
+        data, replaced = [], set()
+        for block in load_content_list(path):
+            page = block.get('page_idx')
+            if page not in pages:
+                data.append(block)
+            elif page not in replaced:
+                # The page's new blocks take the place of its first old one; the rest are dropped
+                data.extend(pages[page])
+                replaced.add(page)
+        save_content_list(data, path)
+        if index is not None:
+            build_index(path)
+        return
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    edits = sorted((index["pages"][str(p)][0], p, _render_blocks(blocks)) for p, blocks in pages.items())
+    out, cursor, deltas = [], 0, []
+    for (start, end), _, new_bytes in edits:
+        out.append(raw[cursor:start])
+        out.append(new_bytes)
+        cursor = end
+        deltas.append((end, len(new_bytes) - (end - start)))
+    out.append(raw[cursor:])
+    write_atomic(path, b"".join(out))
+
+    def shifted(offset):
+        return offset + sum(delta for end, delta in deltas if end <= offset)
+
+    new_sizes = {str(p): len(new_bytes) for _, p, new_bytes in edits}
+    for page, ranges in index["pages"].items():
+        if page in new_sizes:
+            start = shifted(ranges[0][0])
+            index["pages"][page] = [[start, start + new_sizes[page]]]
+        else:
+            index["pages"][page] = [[shifted(a), shifted(b)] for a, b in ranges]
+    for page, blocks in pages.items():
+        index["blocks"][str(page)] = len(blocks)
+        index["footnote_markers"] = [m for m in index["footnote_markers"] if m[1] != page] + \
+            [m for m in map(footnote_marker, blocks) if m]
+    index["footnote_markers"].sort(key=lambda m: m[1])
+    st = os.stat(path)
+    index["size"], index["mtime_ns"] = st.st_size, st.st_mtime_ns
+    write_json_atomic(index_path(path), index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random-access page index for content_list.json")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="(Re)build the sidecar index")
+    p.add_argument("files", nargs="+")
+    p = sub.add_parser("show", help="Print the blocks of some pages")
+    p.add_argument("file")
+    p.add_argument("--pages", default="0")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for path in args.files:
+            start = time.time()
+            index = build_index(path)
+            print(f"✅ {index_path(path)}: {len(index['pages'])} pages, "
+                  f"{len(index['footnote_markers'])} footnote markers ({time.time() - start:.2f}s)")
+        return
+
+    first, last = parse_pages(args.pages)
+    with PageReader(args.file) as reader:
+        for page, blocks in reader.read_pages(first, last).items():
+            print(f"--- page_idx {page} ({len(blocks)} blocks)")
+            for block in blocks:
+                text = block.get('text') or block.get('img_path') or ''
+                print(f"  [{block.get('type')}] {text[:100]}")
+
+
+if __name__ == "__main__":
+    main()
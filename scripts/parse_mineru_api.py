@@ -1,24 +1,33 @@
 import os
 import json
 import time
-import requests
 import glob
-from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from pipeline_telemetry import span, add_profile_argument, setup_from_args
 
-load_dotenv()
+# requests and python-dotenv are imported where they are used, so importing
+# this module (e.g. from scripts/taxprep.py) costs nothing until the API is called
 
-API_KEY = os.getenv("MINERU_API_KEY")
-if not API_KEY:
-    print("Error: MINERU_API_KEY not found in .env")
-    exit(1)
+BASE_URL = "https://mineru.net/api/v4"
+OUT_DIR = "parsed-chapters"
 
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json"
-}
+_headers = None
 
-BASE_URL = "https://mineru.net/api/v4"
+def api_headers():
+    """Auth headers for the MinerU API; exits if MINERU_API_KEY is not set."""
+    global _headers
+    if _headers is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv("MINERU_API_KEY")
+        if not api_key:
+            print("Error: MINERU_API_KEY not found in .env")
+            exit(1)
+        _headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+    return _headers
 
 def get_chapter_files():
     all_pdfs = glob.glob("pdf-processing/chapters/Ch*.pdf")
@@ -33,6 +42,7 @@ def get_chapter_files():
     return targets
 
 def create_batch(files):
+    import requests
     url = f"{BASE_URL}/file-urls/batch"
     
     file_objs = []
@@ -51,7 +61,9 @@ def create_batch(files):
     }
     
     print(f"Creating batch for {len(files)} files...")
-    resp = requests.post(url, headers=HEADERS, json=payload, timeout=30)
+    with span("api_create_batch") as s:
+        s.items = len(files)
+        resp = requests.post(url, headers=api_headers(), json=payload, timeout=30)
     if resp.status_code != 200:
         print(f"Error creating batch: {resp.status_code} - {resp.text}")
         exit(1)
@@ -64,12 +76,15 @@ def create_batch(files):
     return data["data"]
 
 def upload_single(args):
+    import requests
     filepath, upload_url, idx, total = args
     fname = os.path.basename(filepath)
     print(f"[{idx}/{total}] Uploading {fname}...")
     
     try:
-        with open(filepath, "rb") as f:
+        with span("api_upload", chapter=os.path.splitext(fname)[0]) as s, open(filepath, "rb") as f:
+            s.items = 1
+            s.bytes_read = os.path.getsize(filepath)
             resp = requests.put(upload_url, data=f, timeout=600)
             if resp.status_code != 200:
                  print(f"Failed to upload {fname}: {resp.status_code}")
@@ -97,7 +112,8 @@ def upload_files_parallel(files, file_urls):
             pass # We print inside upload_single
 
 def download_and_extract(item):
-    out_dir = "parsed-chapters"
+    import requests
+    out_dir = OUT_DIR
     os.makedirs(out_dir, exist_ok=True)
     
     fname = item.get("file_name", "unknown")
@@ -116,15 +132,19 @@ def download_and_extract(item):
          
     print(f"Downloading result for {fname}...")
     try:
-        r = requests.get(full_zip, stream=True, timeout=120)
-        zip_path = os.path.join(out_dir, dir_name + ".zip")
-        with open(zip_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        import zipfile
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(target_dir)
+        with span("api_download", chapter=dir_name) as s:
+            r = requests.get(full_zip, stream=True, timeout=120)
+            zip_path = os.path.join(out_dir, dir_name + ".zip")
+            with open(zip_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            s.bytes_read = os.path.getsize(zip_path)
+                    
+            import zipfile
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(target_dir)
+                s.items = len(zip_ref.namelist())
+                s.bytes_written = sum(i.file_size for i in zip_ref.infolist())
         
         os.remove(zip_path)
         print(f"SUCCESS: Extracted to {target_dir}")
@@ -133,7 +153,17 @@ def download_and_extract(item):
         print(f"Failed to download {fname}: {e}")
         return False
 
+def publish_downloaded(fname) -> bool:
+    """Publish an extracted chapter; a failure is logged so the rest of the batch keeps going."""
+    from publish_chapter import publish_chapter
+    try:
+        return bool(publish_chapter(os.path.join(OUT_DIR, os.path.splitext(fname)[0]), backend="vlm"))
+    except Exception as e:
+        print(f"Failed to publish {fname}: {e} (extracted output kept in {OUT_DIR})")
+        return False
+
 def poll_and_download(batch_id):
+    import requests
     url = f"{BASE_URL}/extract-results/batch/{batch_id}"
     print(f"Polling batch {batch_id}...")
     
@@ -141,7 +171,7 @@ def poll_and_download(batch_id):
     
     while True:
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=30)
+            resp = requests.get(url, headers=api_headers(), timeout=30)
         except Exception as e:
             print(f"Poll connect error: {e}")
             time.sleep(15)
@@ -177,6 +207,8 @@ def poll_and_download(batch_id):
                 if fname not in processed_ids:
                     if download_and_extract(item):
                         processed_ids.add(fname)
+                        # Publish now rather than after the whole batch
+                        publish_downloaded(fname)
             elif status == "failed":
                 failed_count += 1
                 if fname not in processed_ids:
@@ -193,6 +225,12 @@ def poll_and_download(batch_id):
         time.sleep(30)
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert chapters with the MinerU.net batch API")
+    add_profile_argument(parser)
+    setup_from_args(parser.parse_args())
+    api_headers()
+
     files = get_chapter_files()
     if not files:
         print("No files found.")
@@ -209,7 +247,9 @@ def main():
     upload_files_parallel(files, file_urls)
     
     print("Uploads complete. Starting polling loop...")
-    poll_and_download(batch_id)
+    with span("api_poll", batch_id=batch_id) as s:
+        s.items = len(files)
+        poll_and_download(batch_id)
 
 if __name__ == "__main__":
     main()
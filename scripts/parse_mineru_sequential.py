@@ -1,44 +1,19 @@
 import os
-import json
 import time
-import requests
-import glob
-from dotenv import load_dotenv
 
-load_dotenv()
-
-API_KEY = os.getenv("MINERU_API_KEY")
-if not API_KEY:
-    print("Error: MINERU_API_KEY not found in .env")
-    exit(1)
-
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json"
-}
-
-BASE_URL = "https://mineru.net/api/v4"
+from parse_mineru_api import BASE_URL, OUT_DIR, api_headers, download_and_extract, get_chapter_files
 
 def get_next_chapter():
-    # pdf-processing/chapters/Ch*.pdf
-    all_pdfs = glob.glob("pdf-processing/chapters/Ch*.pdf")
-    all_pdfs.sort()
-    
-    # Filter processed
-    for pdf in all_pdfs:
-        filename = os.path.basename(pdf)
-        if filename.startswith("Ch1_") or "_part_" in filename: continue
-        
-        name_no_ext = os.path.splitext(filename)[0]
-        out_dir = os.path.join("parsed-chapters", name_no_ext)
-        if os.path.exists(out_dir):
-            if os.path.exists(os.path.join(out_dir, "full.md")):
-                continue # Skip done
-                
+    # Same selection as the batch script, minus chapters already extracted
+    for pdf in get_chapter_files():
+        name_no_ext = os.path.splitext(os.path.basename(pdf))[0]
+        if os.path.exists(os.path.join(OUT_DIR, name_no_ext, "full.md")):
+            continue # Skip done
         return pdf
     return None
 
 def process_file(filepath):
+    import requests
     fname = os.path.basename(filepath)
     print(f"Processing {fname}...")
     
@@ -50,7 +25,7 @@ def process_file(filepath):
     }
     
     try:
-        r = requests.post(url, headers=HEADERS, json=payload, timeout=30)
+        r = requests.post(url, headers=api_headers(), json=payload, timeout=30)
         if r.status_code != 200:
             print(f"Error getting URL: {r.text}")
             return False
@@ -80,7 +55,7 @@ def process_file(filepath):
         
         start_time = time.time()
         while time.time() - start_time < 3600: # 1 hour max
-            pr = requests.get(poll_url, headers=HEADERS, timeout=30)
+            pr = requests.get(poll_url, headers=api_headers(), timeout=30)
             if pr.status_code != 200:
                 print("Poll error")
                 time.sleep(10)
@@ -100,8 +75,7 @@ def process_file(filepath):
                  # Download
                  full_zip = item.get("full_zip_url")
                  print("Extraction done. Downloading...")
-                 download_zip(full_zip, fname)
-                 return True
+                 return download_and_extract({"file_name": fname, "full_zip_url": full_zip})
                  
             if state == "failed":
                  print(f"Failed: {item.get('err_msg')}")
@@ -114,29 +88,15 @@ def process_file(filepath):
         print(f"Exception: {e}")
         return False
 
-def download_zip(url, fname):
-    out_dir = "parsed-chapters"
-    name_no_ext = os.path.splitext(fname)[0]
-    target_dir = os.path.join(out_dir, name_no_ext)
-    os.makedirs(target_dir, exist_ok=True)
-    
-    r = requests.get(url, stream=True, timeout=120)
-    zip_path = os.path.join(out_dir, name_no_ext + ".zip")
-    with open(zip_path, "wb") as f:
-        for chunk in r.iter_content(chunk_size=8192):
-            f.write(chunk)
-            
-    import zipfile
-    with zipfile.ZipFile(zip_path, 'r') as z:
-        z.extractall(target_dir)
-    os.remove(zip_path)
-    print(f"Saved to {target_dir}")
-
-if __name__ == "__main__":
+def main():
     next_file = get_next_chapter()
     if not next_file:
         print("All chapters processed.")
     else:
+        api_headers()
         success = process_file(next_file)
         if success:
             print(f"COMPLETED {next_file}")
+
+if __name__ == "__main__":
+    main()
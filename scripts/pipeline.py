@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Incremental Pipeline Runner
+
+Runs split → convert → fix → render → export → index as a DAG instead of
+chaining the scripts by hand. Every node declares its input and output files; a node
+is rerun only when the content hash of its inputs (including the script that
+implements it) changed or an output is missing / was edited. Independent
+chapter branches run in parallel.
+
+State lives in .pipeline-cache.json. File hashes are cached against
+(size, mtime), so a no-op rebuild only stats files.
+
+Usage:
+    python scripts/pipeline.py                      # Build everything that is stale
+    python scripts/pipeline.py --chapters 2,3       # Only these chapter branches
+    python scripts/pipeline.py --stages fix,export  # Only these stages
+    python scripts/pipeline.py --dry-run            # Show what would run
+    python scripts/pipeline.py --force              # Ignore the cache
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_DIR = os.path.join(SCRIPTS_DIR, "..", "pdf-processing")
+sys.path.insert(0, PDF_DIR)
+
+CACHE_FILE = ".pipeline-cache.json"
+MINERU_DIR = "public/data/mineru"
+PUBLIC_DATA_DIR = "public/data"
+STAGES = ["split", "convert", "fix", "render", "export", "index"]
+
+
+class Node:
+    """One pipeline step: a callable plus the files it reads and writes."""
+
+    def __init__(self, name: str, stage: str, inputs: List[str], outputs: List[str],
+                 action: Callable[[], bool], allow_missing: bool = False):
+        self.name = name
+        self.stage = stage
+        self.inputs = inputs
+        self.outputs = outputs
+        self.action = action
+        # Aggregate nodes run on whatever inputs exist (missing ones hash as "missing")
+        self.allow_missing = allow_missing
+        self.deps: List["Node"] = []
+        self.status = "pending"
+        self.duration = 0.0
+
+
+# ============================================================================
+# CONTENT HASHING
+# ============================================================================
+
+class HashCache:
+    """sha256 of files, memoized on (size, mtime_ns) across runs."""
+
+    def __init__(self, entries: dict):
+        self.entries = entries
+        self.lock = threading.Lock()
+
+    def file_hash(self, path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = [st.st_size, st.st_mtime_ns]
+        with self.lock:
+            cached = self.entries.get(path)
+        if cached and cached[:2] == key:
+            return cached[2]
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self.lock:
+            self.entries[path] = key + [digest]
+        return digest
+
+    def fingerprint(self, paths: List[str]) -> str:
+        h = hashlib.sha256()
+        for path in paths:
+            h.update(path.encode('utf-8'))
+            h.update((self.file_hash(path) or "missing").encode('ascii'))
+        return h.hexdigest()
+
+
+def load_cache() -> dict:
+    if os.path.exists(CACHE_FILE):
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"files": {}, "nodes": {}}
+
+
+def save_cache(cache: dict):
+    from atomic_io import write_json_atomic
+    write_json_atomic(CACHE_FILE, cache)
+
+
+# ============================================================================
+# STAGE ACTIONS
+# ============================================================================
+
+def run_split() -> bool:
+    result = subprocess.run([sys.executable, "splitter.py"], cwd=PDF_DIR)
+    return result.returncode == 0
+
+
+def make_convert(chapter_num: int) -> Callable[[], bool]:
+    def action():
+        script = os.path.join(PDF_DIR, "convert_chapter_mineru.py")
+        result = subprocess.run([sys.executable, script, str(chapter_num)])
+        return result.returncode == 0
+    return action
+
+
+def make_fix(source: str, target: str) -> Callable[[], bool]:
+    def action():
+        from fix_chapter_footnotes import process_file
+        # Repair into a separate file so the MinerU output stays an untouched
+        # input; pages unchanged since the last run are reused from the target
+        return process_file(target, source=source)
+    return action
+
+
+def make_render(source: str, target: str) -> Callable[[], bool]:
+    def action():
+        from fix_mineru_content import process_mineru_json
+        process_mineru_json(source, target)
+        return True
+    return action
+
+
+def make_export(chapter_num: int, md_path: str, content_list: str, name: str, source: str) -> Callable[[], bool]:
+    def action():
+        from publish_chapter import export_chapter
+        # The markdown gets the footnote repairs that turned source into content_list
+        return export_chapter(chapter_num, md_path, content_list, name, source_content_list=source)
+    return action
+
+
+def run_index() -> bool:
+    from build_search_index import build_index
+    build_index()
+    return True
+
+
+def run_citation_index() -> bool:
+    from build_citation_index import build_citation_index
+    build_citation_index()
+    return True
+
+
+def run_footnote_index() -> bool:
+    from build_footnote_index import build_footnote_index
+    build_footnote_index()
+    return True
+
+
+def run_section_tree() -> bool:
+    from build_section_tree import build_section_tree
+    build_section_tree()
+    return True
+
+
+def run_clean_text() -> bool:
+    from clean_text import build_cleaned_pages
+    build_cleaned_pages()
+    return True
+
+
+def run_content_blocks() -> bool:
+    from build_content_blocks import build_content_blocks
+    build_content_blocks()
+    return True
+
+
+def run_prerender_math() -> bool:
+    from prerender_math import prerender_chapters
+    prerender_chapters()
+    return True
+
+
+def run_optimize_images() -> bool:
+    from optimize_images import optimize_images
+    optimize_images()
+    return True
+
+
+def run_bundle_data() -> bool:
+    from bundle_data import bundle_data
+    bundle_data()
+    return True
+
+
+def run_record_deltas() -> bool:
+    from build_record_deltas import build_record_deltas
+    build_record_deltas()
+    return True
+
+
+def run_textbook_db() -> bool:
+    from build_textbook_db import build_db
+    build_db()
+    return True
+
+
+def run_script(script: str) -> Callable[[], bool]:
+    def action():
+        return subprocess.run([sys.executable, script]).returncode == 0
+    return action
+
+
+# ============================================================================
+# GRAPH
+# ============================================================================
+
+def script(*parts) -> str:
+    return os.path.relpath(os.path.join(SCRIPTS_DIR, *parts))
+
+
+def build_graph(chapters=None) -> List[Node]:
+    from splitter import CHAPTERS, INPUT_PDF, OUTPUT_DIR as SPLIT_DIR
+
+    pdf_dir = os.path.relpath(PDF_DIR)
+    nodes = []
+
+    chapter_pdfs = {}
+    for _, _, label in CHAPTERS:
+        num = int(re.match(r'Ch(\d+)', label).group(1))
+        chapter_pdfs[num] = (label, os.path.join(pdf_dir, SPLIT_DIR, f"{label}.pdf"))
+
+    nodes.append(Node("split", "split",
+                      [os.path.join(pdf_dir, INPUT_PDF), os.path.join(pdf_dir, "splitter.py")],
+                      [pdf for _, pdf in chapter_pdfs.values()],
+                      run_split))
+
+    for num, (label, pdf) in sorted(chapter_pdfs.items()):
+        if chapters and num not in chapters:
+            continue
+        out_dir = os.path.join(MINERU_DIR, f"Ch{num}")
+        content_list = os.path.join(out_dir, "content_list.json")
+        md_path = os.path.join(out_dir, f"{label}.md")
+        # Intermediate content lists use the columnar block store; export writes JSON
+        fixed = os.path.join(out_dir, "content_list.fixed.blocks")
+        rendered = os.path.join(out_dir, f"{label}.fixed.md")
+
+        nodes.append(Node(f"convert:Ch{num}", "convert",
+                          [pdf, os.path.join(pdf_dir, "convert_chapter_mineru.py")],
+                          [content_list, md_path],
+                          make_convert(num)))
+        nodes.append(Node(f"fix:Ch{num}", "fix",
+                          [content_list, script("fix_chapter_footnotes.py")],
+                          [fixed],
+                          make_fix(content_list, fixed)))
+        nodes.append(Node(f"render:Ch{num}", "render",
+                          [fixed, os.path.join(pdf_dir, "fix_mineru_content.py")],
+                          [rendered],
+                          make_render(fixed, rendered)))
+        nodes.append(Node(f"export:Ch{num}", "export",
+                          [md_path, content_list, fixed, script("publish_chapter.py"),
+                           script("fix_chapter_footnotes.py")],
+                          [os.path.join(PUBLIC_DATA_DIR, f"Ch{num}{ext}")
+                           for ext in (".json", ".md", "_content_list.json")],
+                          make_export(num, md_path, fixed, label, content_list)))
+
+    if not chapters or 1 in chapters:
+        # Chapter 1 still goes through its dedicated HTML renderer
+        import process_ch1_v3
+        nodes.append(Node("render:Ch1-html", "render",
+                          [process_ch1_v3.HTML_PATH, process_ch1_v3.JSON_PATH, script("process_ch1_v3.py")],
+                          [process_ch1_v3.OUTPUT_PATH],
+                          run_script(script("process_ch1_v3.py"))))
+
+    # The search index re-tokenizes only the chapters whose export changed
+    exported = [out for node in nodes if node.stage == "export" for out in node.outputs if out.endswith(".json")]
+    # Book pages come from CHAPTER_DEFINITIONS (build_search_index.chapter_page_range)
+    chapter_defs = os.path.join("src", "lib", "import-textbook.ts")
+    nodes.append(Node("index:search", "index",
+                      exported + [script("build_search_index.py"), chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "search", "meta.json")],
+                      run_index, allow_missing=True))
+    nodes.append(Node("index:citations", "index",
+                      exported + [script("build_citation_index.py"), script("build_search_index.py"),
+                                  script("build_section_tree.py"), script("heading_classifier.py"), chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "citations", "where-cited.json")],
+                      run_citation_index, allow_missing=True))
+    nodes.append(Node("index:footnotes", "index",
+                      exported + [script("build_footnote_index.py"), script("build_search_index.py"), chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "footnotes", "index.json")],
+                      run_footnote_index, allow_missing=True))
+    nodes.append(Node("index:sections", "index",
+                      exported + [script("build_section_tree.py"), script("heading_classifier.py"),
+                                  chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "section-tree.json")],
+                      run_section_tree, allow_missing=True))
+    nodes.append(Node("index:cleaned", "index",
+                      exported + [script("clean_text.py"), script("build_search_index.py"), chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "cleaned", "index.json")],
+                      run_clean_text, allow_missing=True))
+    nodes.append(Node("index:blocks", "index",
+                      exported + [script("build_content_blocks.py"), script("clean_text.py"),
+                                  script("heading_classifier.py"), chapter_defs],
+                      [os.path.join(PUBLIC_DATA_DIR, "blocks", "index.json")],
+                      run_content_blocks, allow_missing=True))
+    nodes.append(Node("index:rendered", "index",
+                      exported + [script("prerender_math.py")],
+                      [os.path.join(PUBLIC_DATA_DIR, "rendered", "index.json")],
+                      run_prerender_math, allow_missing=True))
+    from optimize_images import IMAGE_GLOB
+    nodes.append(Node("index:images", "index",
+                      sorted(glob.glob(IMAGE_GLOB)) + [script("optimize_images.py")],
+                      [os.path.join(PUBLIC_DATA_DIR, "images", "manifest.json")],
+                      run_optimize_images, allow_missing=True))
+    nodes.append(Node("index:records", "index",
+                      exported + [os.path.join(PUBLIC_DATA_DIR, "section-tree.json"),
+                                  script("build_record_deltas.py")],
+                      [os.path.join(PUBLIC_DATA_DIR, "records", "manifest.json")],
+                      run_record_deltas, allow_missing=True))
+    nodes.append(Node("index:db", "index",
+                      exported + ["corporate-tax-textbook.json", script("build_textbook_db.py"), chapter_defs],
+                      ["textbook.db"],
+                      run_textbook_db, allow_missing=True))
+    # Runs last: it hashes whatever every other stage published
+    published = [out for node in nodes for out in node.outputs if out.startswith(PUBLIC_DATA_DIR)]
+    nodes.append(Node("index:bundle", "index",
+                      published + [script("bundle_data.py")],
+                      [os.path.join(PUBLIC_DATA_DIR, "data-manifest.json")],
+                      run_bundle_data, allow_missing=True))
+
+    link_dependencies(nodes)
+    return nodes
+
+
+def link_dependencies(nodes: List[Node]):
+    producers = {}
+    for node in nodes:
+        for out in node.outputs:
+            producers[out] = node
+    for node in nodes:
+        node.deps = sorted({producers[i] for i in node.inputs if i in producers and producers[i] is not node},
+                           key=lambda n: n.name)
+
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+def decide(node: Node, hashes: HashCache, cache: dict, force: bool):
+    """Return (should_run, reason, fingerprint)."""
+    missing_inputs = [] if node.allow_missing else [i for i in node.inputs if not os.path.exists(i)]
+    outputs_exist = all(os.path.exists(o) for o in node.outputs)
+
+    if missing_inputs:
+        if outputs_exist:
+            return False, "inputs missing, keeping outputs", None
+        return False, f"blocked: missing {missing_inputs[0]}", None
+
+    fingerprint = hashes.fingerprint(node.inputs)
+    record = cache["nodes"].get(node.name)
+
+    if force:
+        return True, "forced", fingerprint
+    if not record:
+        return True, "never built", fingerprint
+    if record["fingerprint"] != fingerprint:
+        return True, "inputs changed", fingerprint
+    for out in node.outputs:
+        if hashes.file_hash(out) != record["outputs"].get(out):
+            return True, f"output changed: {out}", fingerprint
+    return False, "up to date", fingerprint
+
+
+def execute(nodes: List[Node], cache: dict, jobs: int = 4, force: bool = False, dry_run: bool = False) -> bool:
+    hashes = HashCache(cache.setdefault("files", {}))
+    cache.setdefault("nodes", {})
+    remaining = {n.name: n for n in nodes}
+    done = set()
+    # node name -> the failed node upstream of it; dependents of these never run
+    failed: Dict[str, str] = {}
+    running = {}
+
+    def run_node(node: Node, fingerprint: str):
+        start = time.time()
+        try:
+            ok = node.action()
+        except Exception as e:
+            print(f"ERROR in {node.name}: {e}")
+            ok = False
+        node.duration = time.time() - start
+        return ok, fingerprint
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while remaining or running:
+            ready = [n for n in remaining.values() if all(d.name in done for d in n.deps)]
+            for node in ready:
+                del remaining[node.name]
+                # Aggregate nodes still run: they read only what earlier exports published,
+                # and a chapter whose branch failed keeps its last published files
+                upstream = None if node.allow_missing else next(
+                    (failed[d.name] for d in node.deps if d.name in failed), None)
+                if upstream:
+                    # Its inputs may be stale outputs of an earlier build
+                    node.status = "blocked"
+                    failed[node.name] = upstream
+                    print(f"  {node.status:<9} {node.name:<18} blocked: upstream {upstream} failed")
+                    done.add(node.name)
+                    continue
+                should_run, reason, fingerprint = decide(node, hashes, cache, force)
+                if not should_run or dry_run:
+                    node.status = ("would run" if should_run else
+                                   "blocked" if reason.startswith("blocked") else "skipped")
+                    print(f"  {node.status:<9} {node.name:<18} {reason}")
+                    done.add(node.name)
+                    continue
+                print(f"  running   {node.name:<18} {reason}")
+                running[pool.submit(run_node, node, fingerprint)] = node
+
+            if not running:
+                if remaining and not ready:
+                    raise RuntimeError("Dependency cycle in pipeline graph")
+                continue
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                ok, fingerprint = future.result()
+                if ok and all(os.path.exists(o) for o in node.outputs):
+                    node.status = "built"
+                    cache["nodes"][node.name] = {
+                        "fingerprint": fingerprint,
+                        "outputs": {o: hashes.file_hash(o) for o in node.outputs},
+                    }
+                else:
+                    node.status = "failed"
+                    failed[node.name] = node.name
+                    cache["nodes"].pop(node.name, None)
+                print(f"  {node.status:<9} {node.name:<18} {node.duration:.2f}s")
+                done.add(node.name)
+
+    return not failed
+
+
+def critical_path(nodes: List[Node]):
+    """Longest chain of node durations through the DAG (nodes are in dependency order)."""
+    finish = {}
+    prev = {}
+    for node in topological(nodes):
+        best = max(node.deps, key=lambda d: finish[d.name], default=None)
+        finish[node.name] = node.duration + (finish[best.name] if best else 0.0)
+        prev[node.name] = best
+    if not finish:
+        return [], 0.0
+    end = max(nodes, key=lambda n: finish[n.name])
+    total = finish[end.name]
+    path = []
+    while end:
+        path.append(end)
+        end = prev[end.name]
+    return path[::-1], total
+
+
+def topological(nodes: List[Node]) -> List[Node]:
+    ordered, seen = [], set()
+
+    def visit(node):
+        if node.name in seen:
+            return
+        seen.add(node.name)
+        for dep in node.deps:
+            visit(dep)
+        ordered.append(node)
+
+    for node in nodes:
+        visit(node)
+    return ordered
+
+
+def print_report(nodes: List[Node], wall: float):
+    counts: Dict[str, int] = {}
+    for node in nodes:
+        counts[node.status] = counts.get(node.status, 0) + 1
+
+    path, total = critical_path(nodes)
+    print(f"\n{'='*60}")
+    print("PIPELINE SUMMARY")
+    print(f"{'='*60}")
+    print("  " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+    print(f"  Wall time: {wall:.2f}s   Critical path: {total:.2f}s")
+    for node in path:
+        if node.duration > 0:
+            print(f"    {node.duration:8.2f}s  {node.name}")
+
+    by_stage = {}
+    for node in nodes:
+        by_stage[node.stage] = by_stage.get(node.stage, 0.0) + node.duration
+    print("  Time per stage: " + ", ".join(f"{s} {by_stage.get(s, 0.0):.2f}s" for s in STAGES if s in by_stage))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental split → convert → fix → render → export → index runner")
+    parser.add_argument("--chapters", help="Comma-separated chapter numbers (default: all)")
+    parser.add_argument("--stages", help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel nodes (default 4)")
+    parser.add_argument("--force", action="store_true", help="Rerun nodes even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would run")
+    args = parser.parse_args()
+
+    start = time.time()
+    chapters = {int(c) for c in args.chapters.split(",")} if args.chapters else None
+    nodes = build_graph(chapters)
+
+    if args.stages:
+        wanted = set(args.stages.split(","))
+        kept = [n for n in nodes if n.stage in wanted]
+        # Dependencies on deselected stages are satisfied by their existing outputs
+        for node in kept:
+            node.deps = [d for d in node.deps if d.stage in wanted]
+        nodes = kept
+
+    cache = load_cache()
+    ok = execute(nodes, cache, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    if not args.dry_run:
+        save_cache(cache)
+
+    print_report(nodes, time.time() - start)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
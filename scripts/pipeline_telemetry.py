@@ -0,0 +1,231 @@
+"""
+Pipeline Telemetry
+
+Structured timing/memory spans shared by the pipeline scripts. Each span is
+one JSON line:
+
+    {"ts": "...", "stage": "fix_footnotes", "chapter": "Ch3", "status": "ok",
+     "wall_s": 0.41, "cpu_s": 0.39, "process_peak_rss_mb": 61.2, "peak_growth_mb": 8.4,
+     "items": 412, "bytes_read": 180233, "bytes_written": 201877, "pid": 4242}
+
+Memory comes from getrusage's ru_maxrss, the process-lifetime high-water mark:
+- process_peak_rss_mb is that mark when the span ends. It includes every
+  earlier span, so it is not the stage's own peak.
+- peak_growth_mb is how far the span raised the mark. A stage that
+  allocates less than some earlier stage shows 0 even if it used a lot, so
+  for a per-stage peak, profile it alone (--profile tracemalloc or
+  bench_pipeline.py).
+
+Spans go to $PIPELINE_TELEMETRY (default: pipeline-telemetry.jsonl at the
+repository root, wherever a script runs from; "-" for stderr, "off" to
+disable).
+
+With --profile, every top-level span runs under cProfile (or tracemalloc
+with --profile tracemalloc) and the slowest one is written out when the
+process exits: profile-<stage>.prof / profile-<stage>.tracemalloc.txt.
+
+Summarize a spans file per stage:
+    python scripts/pipeline_telemetry.py [pipeline-telemetry.jsonl]
+
+Usage:
+    from pipeline_telemetry import span
+
+    with span("fix_footnotes", chapter="Ch3") as s:
+        ...
+        s.items = len(blocks)
+        s.bytes_read = os.path.getsize(path)
+"""
+
+import atexit
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+TELEMETRY_PATH = os.getenv("PIPELINE_TELEMETRY", os.path.join(REPO_ROOT, "pipeline-telemetry.jsonl"))
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+_write_lock = threading.Lock()
+_local = threading.local()
+_profile = {"mode": None, "slowest": None}
+
+
+class Span:
+    """Counters a stage fills in while it runs."""
+
+    def __init__(self, stage: str, chapter=None, **fields):
+        self.stage = stage
+        self.chapter = chapter
+        self.fields = fields
+        self.items = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def emit(record: dict):
+    if TELEMETRY_PATH in ("", "off"):
+        return
+    line = json.dumps(record, ensure_ascii=False)
+    with _write_lock:
+        if TELEMETRY_PATH == "-":
+            print(line, file=sys.stderr)
+        else:
+            with open(TELEMETRY_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def span(stage: str, chapter=None, **fields):
+    """Time a stage and emit one JSON line when it ends (also on error)."""
+    s = Span(stage, chapter, **fields)
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    profiler = _start_profiler() if depth == 0 else None
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    peak_start = peak_rss_mb()
+    status = "ok"
+    try:
+        yield s
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        _local.depth = depth
+        peak = peak_rss_mb()
+        record = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+            "stage": stage,
+            "chapter": chapter,
+            "status": status,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(time.process_time() - cpu_start, 4),
+            "process_peak_rss_mb": peak,
+            "peak_growth_mb": round(max(0.0, peak - peak_start), 1),
+            "items": s.items,
+            "bytes_read": s.bytes_read,
+            "bytes_written": s.bytes_written,
+            "pid": os.getpid(),
+        }
+        if s.fields:
+            record.update(s.fields)
+        emit(record)
+        if profiler is not None:
+            _stop_profiler(profiler, stage, wall)
+
+
+# ============================================================================
+# PROFILING (--profile)
+# ============================================================================
+
+def enable_profiling(mode: str = "cprofile"):
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+    if _profile["mode"] is None:
+        atexit.register(_dump_slowest)
+    _profile["mode"] = mode
+
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                        help="Profile the slowest stage (cprofile or tracemalloc)")
+
+
+def setup_from_args(args):
+    if getattr(args, "profile", None):
+        enable_profiling(args.profile)
+
+
+def _start_profiler():
+    mode = _profile["mode"]
+    # Profilers are process-global; only profile spans on the main thread
+    if mode is None or threading.current_thread() is not threading.main_thread():
+        return None
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    import tracemalloc
+    tracemalloc.start(10)
+    return tracemalloc
+
+
+def _stop_profiler(profiler, stage: str, wall: float):
+    if _profile["mode"] == "cprofile":
+        profiler.disable()
+        result = profiler
+    else:
+        result = profiler.take_snapshot()
+        profiler.stop()
+    slowest = _profile["slowest"]
+    if slowest is None or wall > slowest[1]:
+        _profile["slowest"] = (stage, wall, result)
+
+
+def _dump_slowest():
+    if not _profile["slowest"]:
+        return
+    stage, wall, result = _profile["slowest"]
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in stage)
+
+    if _profile["mode"] == "cprofile":
+        import pstats
+        path = f"profile-{safe}.prof"
+        result.dump_stats(path)
+        print(f"\n[profile] Slowest stage: {stage} ({wall:.2f}s) -> {path}", file=sys.stderr)
+        pstats.Stats(result, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+    else:
+        path = f"profile-{safe}.tracemalloc.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            for stat in result.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        print(f"\n[profile] Slowest stage: {stage} ({wall:.2f}s) -> {path}", file=sys.stderr)
+
+
+# ============================================================================
+# SUMMARY
+# ============================================================================
+
+def summarize(path: str):
+    stages = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            agg = stages.setdefault(rec["stage"], {"n": 0, "wall": 0.0, "cpu": 0.0, "rss": 0.0, "growth": 0.0,
+                                                   "items": 0, "read": 0, "written": 0, "errors": 0})
+            agg["n"] += 1
+            agg["wall"] += rec.get("wall_s", 0)
+            agg["cpu"] += rec.get("cpu_s", 0)
+            # peak_rss_mb: spans written before it was renamed process_peak_rss_mb
+            agg["rss"] = max(agg["rss"], rec.get("process_peak_rss_mb", rec.get("peak_rss_mb", 0)))
+            agg["growth"] = max(agg["growth"], rec.get("peak_growth_mb", 0))
+            agg["items"] += rec.get("items", 0)
+            agg["read"] += rec.get("bytes_read", 0)
+            agg["written"] += rec.get("bytes_written", 0)
+            agg["errors"] += rec.get("status") != "ok"
+
+    print(f"{'stage':<20}{'spans':>6}{'wall s':>10}{'cpu s':>10}{'proc MB':>9}{'+peak MB':>9}{'items':>10}"
+          f"{'read MB':>9}{'write MB':>9}{'errors':>7}")
+    for stage, a in sorted(stages.items(), key=lambda kv: -kv[1]["wall"]):
+        print(f"{stage:<20}{a['n']:>6}{a['wall']:>10.2f}{a['cpu']:>10.2f}{a['rss']:>9.1f}{a['growth']:>9.1f}{a['items']:>10,}"
+              f"{a['read'] / 1e6:>9.1f}{a['written'] / 1e6:>9.1f}{a['errors']:>7}")
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else TELEMETRY_PATH)
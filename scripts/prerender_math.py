@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Math Pre-renderer
+
+The footnote fixers rewrite references as $^{12}$, and MinerU writes
+amounts and OCR'd symbols as inline math ($\\$ 5,000$, $\\ S \\ 3 5 1$),
+so CourseReader runs remark-math and KaTeX over every paragraph. This
+stage typesets those expressions once per build and writes
+public/data/rendered/:
+
+    rendered/Ch{N}.json  — {"chapter": 2, "md_content": "...", "math": {"html": n,
+                            "mathml": n, "client": n, "footnote_refs": n}}
+    rendered/index.json  — {"chapters": {"Ch2": {"html": n, ...}, ...}}
+
+md_content is the chapter markdown with each $...$ / $$...$$ replaced by
+a render-ready fragment:
+
+- $^{12}$ becomes <sup class="footnote-ref" data-footnote="12">12</sup>
+- expressions in the TeX subset the book uses (symbols, Greek, \\mathrm,
+  \\mathbf, \\text*, sub/superscripts, accents, \\frac) become HTML in
+  <span class="math">, with letters italic as KaTeX sets them
+- anything else becomes MathML when the optional latex2mathml package is
+  installed, and otherwise stays as TeX for the client to typeset
+
+Markdown-special characters inside fragments are written as entities, so
+no $ is left for remark-math to pair up. ChapterReader loads
+rendered/Ch{N}.json through loadRenderedChapter() and hands md_content to
+CourseReader, which skips the math plugins entirely for content without one.
+
+Fragments are cached in .math-cache.json keyed by expression. An
+expression is typeset once across chapters and builds.
+
+Usage:
+    python scripts/prerender_math.py
+    python scripts/prerender_math.py --expr '\\ S \\ 3 5 1'
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import write_json_atomic
+from bench_fixtures import load_shipped_chapters
+from pipeline_telemetry import span
+from publish_chapter import PUBLIC_DATA_DIR
+
+RENDERED_DIR = os.path.join(PUBLIC_DATA_DIR, "rendered")
+INDEX_NAME = "index.json"
+MATH_CACHE_PATH = ".math-cache.json"
+RENDERER_VERSION = 1
+
+FOOTNOTE_REF = re.compile(r'^\s*\^\s*(?:\{\s*([\d\s]+?)\s*\}|(\d))\s*$')
+PARAGRAPH_SPLIT = re.compile(r'(\n\s*\n)')
+# Characters markdown (or remark-math) would act on, written as entities inside fragments
+ENTITIES = {c: f"&#{ord(c)};" for c in "$*_\\`[]~|#"}
+ENTITIES.update({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+SYMBOLS = {
+    "$": "$", "%": "%", "&": "&", "#": "#", "_": "_", "{": "{", "}": "}",
+    "ast": "∗", "star": "⋆", "cdot": "⋅", "times": "×", "div": "÷", "pm": "±", "mp": "∓",
+    "le": "≤", "leq": "≤", "ge": "≥", "geq": "≥", "ne": "≠", "neq": "≠", "approx": "≈", "equiv": "≡",
+    "sim": "∼", "gg": "≫", "ll": "≪", "to": "→", "rightarrow": "→", "leftarrow": "←", "gets": "←",
+    "Rightarrow": "⇒", "Leftarrow": "⇐", "uparrow": "↑", "downarrow": "↓", "infty": "∞",
+    "partial": "∂", "prime": "′", "circ": "∘", "bullet": "∙", "dag": "†", "ddag": "‡", "S": "§",
+    "mathsection": "§", "P": "¶", "angle": "∠", "therefore": "∴", "because": "∵", "varnothing": "∅",
+    "emptyset": "∅", "ldots": "…", "dots": "…", "cdots": "⋯", "cap": "∩", "cup": "∪", "in": "∈",
+    "notin": "∉", "subset": "⊂", "forall": "∀", "exists": "∃", "neg": "¬", "wedge": "∧", "vee": "∨",
+    "Delta": "Δ", "Gamma": "Γ", "Lambda": "Λ", "Omega": "Ω", "Phi": "Φ", "Pi": "Π", "Psi": "Ψ",
+    "Sigma": "Σ", "Theta": "Θ", "Xi": "Ξ",
+}
+GREEK = dict(zip(
+    "alpha beta gamma delta epsilon varepsilon zeta eta theta vartheta iota kappa lambda mu nu xi pi "
+    "rho sigma tau upsilon phi varphi chi psi omega".split(),
+    "αβγδϵεζηθϑικλμνξπρστυϕφχψω"))
+SPACES = {" ": " ", ",": "\u2009", ":": "\u205f", ";": "\u2004", "quad": "\u2003", "qquad": "\u2003\u2003",
+          "!": ""}
+FUNCTIONS = {"sin", "cos", "tan", "log", "ln", "exp", "min", "max", "lim", "det", "deg"}
+ACCENTS = {"dot": "\u0307", "ddot": "\u0308", "hat": "\u0302", "bar": "\u0305", "overline": "\u0305",
+           "tilde": "\u0303", "vec": "\u20d7"}
+BINARY = set("+−×±∓⋅÷")
+RELATIONS = set("=<>≤≥≠≈≡∼→←⇒⇐")
+# command -> (tag, mode) for one-argument font commands
+FONTS = {"mathrm": (None, "upright"), "operatorname": (None, "upright"), "mathbf": ("b", "upright"),
+         "mathit": ("i", "upright"), "text": (None, "text"), "textrm": (None, "text"), "mbox": (None, "text"),
+         "textup": (None, "text"), "textbf": ("b", "text"), "textit": ("i", "text")}
+MATH_CHARS = {"-": "−", "*": "∗", "'": "′"}
+
+
+class Unsupported(Exception):
+    """The expression uses TeX outside the subset render_html() handles."""
+
+
+def escape(text: str) -> str:
+    return "".join(ENTITIES.get(c, c) for c in text)
+
+
+def tokenize(expr: str) -> List[Tuple[str, str]]:
+    """("cmd", name) for control sequences, ("space", " ") for whitespace runs, else ("char", c)."""
+    tokens = []
+    for m in re.finditer(r'\\([A-Za-z]+|.)|(\s+)|(.)', expr, re.S):
+        if m.group(1) is not None:
+            tokens.append(("cmd", m.group(1)))
+        elif m.group(2) is not None:
+            tokens.append(("space", " "))
+        else:
+            tokens.append(("char", m.group(3)))
+    return tokens
+
+
+class _HtmlRenderer:
+    def __init__(self, expr: str):
+        self.tokens = tokenize(expr)
+        self.pos = 0
+        self.operand = False
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def render(self) -> str:
+        html = self.group("italic", closing=False)
+        if self.pos < len(self.tokens):
+            raise Unsupported("unbalanced }")
+        return html.replace("</i><i>", "")
+
+    def group(self, mode: str, closing: bool = True) -> str:
+        out = []
+        while True:
+            token = self.peek()
+            if token is None:
+                if closing:
+                    raise Unsupported("unclosed {")
+                return "".join(out)
+            if token == ("char", "}"):
+                if not closing:
+                    return "".join(out)
+                self.pos += 1
+                return "".join(out)
+            out.append(self.atom(mode))
+
+    def arg(self, mode: str) -> str:
+        while self.peek() == ("space", " "):
+            self.pos += 1
+        if self.peek() is None:
+            raise Unsupported("missing argument")
+        return self.atom(mode)
+
+    def plain_arg(self) -> str:
+        """An argument that renders to bare characters, for accents."""
+        html = re.sub(r'</?i>', '', self.arg("upright"))
+        if "<" in html or "&" in html:
+            raise Unsupported("accent over markup")
+        return html
+
+    def emit(self, text: str, mode: str) -> str:
+        text = MATH_CHARS.get(text, text) if mode != "text" else text
+        if mode != "text" and (text in BINARY or text in RELATIONS):
+            # Binary operators and relations are spaced only between operands, as TeX does
+            spaced = self.operand
+            self.operand = False
+            return f" {escape(text)} " if spaced else escape(text)
+        self.operand = True
+        if mode == "italic" and text.isalpha():
+            return f"<i>{escape(text)}</i>"
+        return escape(text)
+
+    def atom(self, mode: str) -> str:
+        kind, value = self.tokens[self.pos]
+        self.pos += 1
+        if kind == "space":
+            return " " if mode == "text" else ""
+        if kind == "char":
+            if value == "{":
+                return self.group(mode)
+            if value in "^_":
+                tag = "sup" if value == "^" else "sub"
+                operand = self.operand
+                inner = self.arg(mode if mode != "text" else "italic")
+                self.operand = operand
+                return f"<{tag}>{inner}</{tag}>"
+            if value == "~":
+                return "\u00a0"
+            if value in "&#%$\\":
+                raise Unsupported(f"special character {value}")
+            return self.emit(value, mode)
+        return self.command(value, mode)
+
+    def command(self, name: str, mode: str) -> str:
+        if name in SPACES:
+            return SPACES[name]
+        if name in SYMBOLS:
+            return self.emit(SYMBOLS[name], mode)
+        if name in GREEK:
+            return self.emit(GREEK[name], mode)
+        if name in FUNCTIONS:
+            self.operand = True
+            return escape(name) + "\u2009"
+        if name in FONTS:
+            tag, inner_mode = FONTS[name]
+            inner = self.arg(inner_mode)
+            return f"<{tag}>{inner}</{tag}>" if tag else inner
+        if name == "normalfont":
+            return ""
+        if name == "bf":
+            return f"<b>{self.group('upright', closing=False)}</b>"
+        if name in ("left", "right"):
+            delimiter = self.arg(mode)
+            return "" if delimiter == "." else delimiter
+        if name in ACCENTS:
+            accent = ACCENTS[name]
+            return self.emit("".join(c + accent for c in self.plain_arg()), "upright")
+        if name == "frac":
+            numerator, denominator = self.arg(mode), self.arg(mode)
+            self.operand = True
+            return f"<sup>{numerator}</sup>\u2044<sub>{denominator}</sub>"
+        if name == "not":
+            negated = self.arg(mode)
+            return " ≠ " if negated.strip() == "=" else negated + "\u0338"
+        raise Unsupported(f"\\{name}")
+
+
+def render_html(expr: str) -> Optional[str]:
+    """HTML for an inline TeX expression in the supported subset, else None."""
+    match = FOOTNOTE_REF.match(expr)
+    if match:
+        number = re.sub(r'\s+', '', match.group(1) or match.group(2))
+        return f'<sup class="footnote-ref" data-footnote="{number}">{number}</sup>'
+    try:
+        html = _HtmlRenderer(expr).render().strip()
+    except Unsupported:
+        return None
+    return f'<span class="math">{html}</span>' if html else None
+
+
+def render_mathml(expr: str, display: bool = False) -> Optional[str]:
+    """MathML from the optional latex2mathml package, or None without it or on a parse error."""
+    try:
+        from latex2mathml.converter import convert
+    except ImportError:
+        return None
+    try:
+        mathml = convert(expr, display="block" if display else "inline")
+    except Exception:
+        return None
+    # Keep the fragment on one line and free of markdown-special characters
+    return re.sub(r'\s*\n\s*', '', mathml).replace("$", "&#36;").replace("*", "&#42;").replace("_", "&#95;")
+
+
+def mathml_available() -> bool:
+    try:
+        import latex2mathml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ============================================================================
+# MARKDOWN
+# ============================================================================
+
+def find_math(text: str) -> List[Tuple[int, int, str, bool]]:
+    """(start, end, expression, display) of each $...$ / $$...$$ in one paragraph; \\$ and `code` are skipped."""
+    spans = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            close = text.find('`', i + 1)
+            i = n if close < 0 else close + 1
+        elif c == '$':
+            width = 2 if text.startswith('$$', i) else 1
+            j = i + width
+            while j < n and not text.startswith('$' * width, j):
+                j += 2 if text[j] == '\\' else 1
+            if j >= n:
+                # No closing delimiter in this paragraph: a literal dollar sign
+                i += width
+                continue
+            spans.append((i, j + width, text[i + width:j], width == 2))
+            i = j + width
+        else:
+            i += 1
+    return spans
+
+
+class MathCache:
+    """Rendered fragments keyed by expression, persisted across builds."""
+
+    def __init__(self, path: str = MATH_CACHE_PATH):
+        self.path = path
+        self.version = f"{RENDERER_VERSION}:{'mathml' if mathml_available() else 'html'}"
+        self.fragments: Dict[str, Optional[str]] = {}
+        self.hits = self.misses = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("version") == self.version:
+                self.fragments = cached["fragments"]
+
+    def render(self, expr: str, display: bool) -> Optional[str]:
+        key = f"{'d' if display else 'i'}:{expr}"
+        if key in self.fragments:
+            self.hits += 1
+            return self.fragments[key]
+        self.misses += 1
+        fragment = (None if display else render_html(expr)) or render_mathml(expr, display)
+        self.fragments[key] = fragment
+        return fragment
+
+    def save(self):
+        if self.misses:
+            write_json_atomic(self.path, {"version": self.version, "fragments": self.fragments})
+
+
+def prerender_markdown(md: str, cache: MathCache) -> Tuple[str, Dict[str, int]]:
+    """The markdown with its math replaced by fragments, and counts per outcome."""
+    stats = {"html": 0, "mathml": 0, "client": 0, "footnote_refs": 0}
+    out = []
+    for part in PARAGRAPH_SPLIT.split(md):
+        # Separators, and raw HTML blocks where remark-math does not run either
+        if not part.strip() or part.lstrip().startswith('<'):
+            out.append(part)
+            continue
+        cursor = 0
+        for start, end, expr, display in find_math(part):
+            fragment = cache.render(expr, display)
+            if fragment is None:
+                stats["client"] += 1
+                continue
+            out.append(part[cursor:start])
+            out.append(fragment)
+            cursor = end
+            if fragment.startswith('<sup class="footnote-ref"'):
+                stats["footnote_refs"] += 1
+            stats["mathml" if fragment.startswith('<math') else "html"] += 1
+        out.append(part[cursor:])
+    return "".join(out), stats
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def prerender_chapters(out_dir: str = RENDERED_DIR) -> Dict[int, dict]:
+    start = time.time()
+    cache = MathCache()
+    chapters = {}
+    with span("prerender_math") as s:
+        for num, chapter in sorted(load_shipped_chapters().items()):
+            s.bytes_read += len(chapter["md_content"].encode('utf-8'))
+            md, stats = prerender_markdown(chapter["md_content"], cache)
+            chapters[num] = {"chapter": num, "md_content": md, "math": stats}
+            write_json_atomic(os.path.join(out_dir, f"Ch{num}.json"), chapters[num])
+        write_json_atomic(os.path.join(out_dir, INDEX_NAME),
+                          {"chapters": {f"Ch{num}": chapter["math"] for num, chapter in chapters.items()}})
+        cache.save()
+        s.items = sum(c["math"]["html"] + c["math"]["mathml"] for c in chapters.values())
+        s.fields["cache_hits"] = cache.hits
+
+    left = sum(c["math"]["client"] for c in chapters.values())
+    refs = sum(c["math"]["footnote_refs"] for c in chapters.values())
+    print(f"✅ Pre-rendered math: {s.items:,} expressions ({refs:,} footnote refs), {left} left for the client, "
+          f"{cache.hits:,} cache hits, {len(chapters)} chapters in {time.time() - start:.2f}s")
+    return chapters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render inline math and footnote superscripts")
+    parser.add_argument("--out", default=RENDERED_DIR, help="Output directory")
+    parser.add_argument("--expr", help="Render one TeX expression and print the fragment")
+    args = parser.parse_args()
+
+    if args.expr is not None:
+        print(render_html(args.expr) or render_mathml(args.expr) or "(left for the client)")
+        return
+    prerender_chapters(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-import json
 import re
 import os
 
+from block_store import load_content_list
+from build_footnote_index import resolve_footnotes
+from heading_classifier import LEVEL_CLASSES, HeadingClassifier
+
+ENUMERATED = re.compile(r'^[A-Za-z0-9]+\.\s')
+
 JSON_FILE = 'parsed-chapters/b9d4ca4f-b3c1-46c5-b03c-6c50cd2f3ea7_content_list.json'
 OUTPUT_FILE = 'public/Ch1_complete.html'
 
@@ -127,8 +132,7 @@ CSS_STYLES = """
 """
 
 def generate_html_from_json():
-    with open(JSON_FILE, 'r') as f:
-        data = json.load(f)
+    data = load_content_list(JSON_FILE)
         
     html_parts = []
     
@@ -141,7 +145,10 @@ def generate_html_from_json():
     html_parts.append('</head>')
     html_parts.append('<body>')
     
+    classifier = HeadingClassifier.fit(data)
     footnotes = {} # id -> text
+    for fn in resolve_footnotes(data)[0]:
+        footnotes.setdefault(str(fn['number']), fn['text'])
     
     # Track hierarchy for correct slug generation
     # Just simple regex matching for now based on text content
@@ -163,22 +170,7 @@ def generate_html_from_json():
             continue
             
         if item_type == 'page_footnote':
-            # Need to extract footnote number. Usually starts with multiple digits or just [1] or 1
-            # Text often "3 See, e.g..."
-            # Let's try to match leading number
-            match = re.match(r'^(\d+)\s+(.*)', text)
-            if match:
-                fn_num = match.group(1)
-                fn_text = match.group(2)
-                footnotes[fn_num] = fn_text
-                # Don't output footnotes inline, we'll dump them at the end.
-                continue
-            else:
-                # Might be continuation or unnumbered?
-                # Sometimes footnote text in JSON is just the text if it was linked to a superscript in main text
-                # We'll just collect them. If we can't find a number, we might lose it or append to prev?
-                # Let's assume most start with number.
-                pass
+            # Collected up front by resolve_footnotes; dumped at the end
             continue
             
         if item_type == 'header':
@@ -205,33 +197,16 @@ def generate_html_from_json():
                  html_parts.append(f'<h1 class="chapter-title">{title_case(text)}</h1>')
                  continue
 
-            # H2: A. Introduction...
-            match_h2 = re.match(r'^([A-H])\.\s+(.*)', text)
-            if match_h2 and len(text) < 100: # Heuristic: headers are short
-                letter = match_h2.group(1)
-                title = match_h2.group(2)
+            # H2/H3/H4: "A. Introduction...", "1. Tax Considerations...", "a. Tax Rates..."
+            level = classifier.level(item, text, promote_enumerated=True)
+            if level in LEVEL_CLASSES:
+                parts = text.split(None, 1) if ENUMERATED.match(text) else ['', text]
+                prefix, title = parts[0], parts[-1]
                 # Slugify title for ID
                 slug = title.lower().replace(' ', '-').replace(',', '').replace("'", "")
-                html_parts.append(f'<h2 class="main-section" id="{slug}">{letter}. {title_case(title)}</h2>')
+                heading = f'{prefix} {title_case(title)}'.strip()
+                html_parts.append(f'<h{level} class="{LEVEL_CLASSES[level]}" id="{slug}">{heading}</h{level}>')
                 continue
-                
-            # H3: 1. Tax Considerations...
-            match_h3 = re.match(r'^(\d+)\.\s+(.*)', text)
-            if match_h3 and len(text) < 100:
-                num = match_h3.group(1)
-                title = match_h3.group(2)
-                slug = title.lower().replace(' ', '-').replace(',', '').replace("'", "")
-                html_parts.append(f'<h3 class="subsection" id="{slug}">{num}. {title_case(title)}</h3>')
-                continue
-                
-            # H4: a. Tax Rates...
-            match_h4 = re.match(r'^([a-z])\.\s+(.*)', text)
-            if match_h4 and len(text) < 100 and not text.startswith('v.'): # Avoid v. case name if starts with line
-                 letter = match_h4.group(1)
-                 title = match_h4.group(2)
-                 slug = title.lower().replace(' ', '-').replace(',', '').replace("'", "")
-                 html_parts.append(f'<h4 class="sub-subsection" id="{slug}">{letter}. {title_case(title)}</h4>')
-                 continue
             
             # Detect Case Names if they are separate blocks? 
             # JSON usually has paragraph text.
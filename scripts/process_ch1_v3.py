@@ -1,21 +1,15 @@
 
-import json
 import re
 import sys
 
+from block_store import load_content_list
+from heading_classifier import LEVEL_CLASSES, HeadingClassifier
+
 # Paths
 HTML_PATH = 'parsed-chapters/Ch1_complete_fixed.html'
 JSON_PATH = 'parsed-chapters/b9d4ca4f-b3c1-46c5-b03c-6c50cd2f3ea7_content_list.json'
 OUTPUT_PATH = 'public/Ch1_complete.html'
 
-# Rules
-HIERARCHY_RULES = [
-    # (Regex pattern, Tag name, Class name)
-    (r'^[A-H]\.\s', 'h2', 'main-section'),
-    (r'^\d+\.\s', 'h3', 'subsection'),
-    (r'^[a-z]\.\s', 'h4', 'sub-subsection')
-]
-
 CSS = """
     <style>
         body {
@@ -145,8 +139,7 @@ def get_page_starts(json_path):
     # Logic: Page 3 starts at page_idx 0. Page 4 at page_idx 1.
     # The first 'text' block of page_idx 1 is the start of Page 4.
     
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    data = load_content_list(json_path)
         
     page_starts = {} # page_num(int) -> text_snippet
     
@@ -233,6 +226,9 @@ def process_html():
     # Add Page 3 marker at start (approximate)
     output_lines.append('<span class="page-marker" id="page-3">[Page 3]</span>')
     
+    # Heading levels from the shared classifier (numbering rules; no geometry in HTML)
+    classifier = HeadingClassifier()
+
     # Regex to clean tags for matching
     def strip_tags(s):
         return re.sub(r'<[^>]+>', '', s)
@@ -272,39 +268,39 @@ def process_html():
              matched_header = True
              
         if not matched_header:
-            for pattern, tag_name, class_name in HIERARCHY_RULES:
-                if re.match(pattern, text_content):
-                    # It's a header.
-                    # Slugify ID
-                    # Remove the prefix for the slug?
-                    # User sample: "B. Influential Policies" -> id="section-b"
-                    # "1. Tax Considerations"
+            level = classifier.classify_text(text_content, promote_enumerated=True)
+            if level in LEVEL_CLASSES:
+                tag_name, class_name = f'h{level}', LEVEL_CLASSES[level]
+                # It's a header.
+                # Slugify ID
+                # Remove the prefix for the slug?
+                # User sample: "B. Influential Policies" -> id="section-b"
+                # "1. Tax Considerations"
+                
+                # My previous logic used simplified slug "introduction".
+                # Let's try to match that logic so I don't break Chapter1.tsx again.
+                # ID creation:
+                parts = text_content.split(' ', 1)
+                if len(parts) > 1:
+                    title_text = parts[1]
+                    slug = title_text.lower().replace(' ', '-').replace("'", "").replace(',', '').replace('.', '')
+                else:
+                    slug = text_content.lower().replace('.', '')
                     
-                    # My previous logic used simplified slug "introduction".
-                    # Let's try to match that logic so I don't break Chapter1.tsx again.
-                    # ID creation:
-                    parts = text_content.split(' ', 1)
-                    if len(parts) > 1:
-                        title_text = parts[1]
-                        slug = title_text.lower().replace(' ', '-').replace("'", "").replace(',', '').replace('.', '')
-                    else:
-                        slug = text_content.lower().replace('.', '')
-                        
-                    # Title Case the content
-                    # We might need to split numbering 'A.' and title
-                    match_res = re.match(r'^([A-Z0-9a-z]+\.)\s+(.*)', text_content)
-                    if match_res:
-                        prefix = match_res.group(1)
-                        rest = match_res.group(2)
-                        # Fix casing
-                        rest = title_case(rest)
-                        new_content = f"{prefix} {rest}"
-                    else:
-                        new_content = title_case(text_content)
+                # Title Case the content
+                # We might need to split numbering 'A.' and title
+                match_res = re.match(r'^([A-Z0-9a-z]+\.)\s+(.*)', text_content)
+                if match_res:
+                    prefix = match_res.group(1)
+                    rest = match_res.group(2)
+                    # Fix casing
+                    rest = title_case(rest)
+                    new_content = f"{prefix} {rest}"
+                else:
+                    new_content = title_case(text_content)
 
-                    new_line = f'<{tag_name} class="{class_name}" id="{slug}">{new_content}</{tag_name}>'
-                    matched_header = True
-                    break
+                new_line = f'<{tag_name} class="{class_name}" id="{slug}">{new_content}</{tag_name}>'
+                matched_header = True
         
         # Normalize footnotes
         # Pandoc uses <a href="#fn-1" id="fn-ref-1">[1]</a> or similar.
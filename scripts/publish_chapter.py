@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Progressive Chapter Publisher
+
+Takes one freshly converted chapter (local MinerU CLI or MinerU.net API
+output), runs footnote repair on its content_list.json and publishes it to
+public/data straight away:
+
+- public/data/Ch{N}.json               — {"backend", "version", "results": {name: {"md_content"}}}
+- public/data/Ch{N}.md                 — Rendered markdown, with the same footnote repairs
+- public/data/Ch{N}_content_list.json  — Footnote-repaired content blocks
+- public/data/manifest.json            — Which chapters are published, with hashes
+
+The repaired content list is kept next to MinerU's as
+content_list.fixed.blocks; MinerU's own output is never modified, so the
+markdown repair (fix_chapter_footnotes.repair_markdown) can diff the two on
+every run.
+
+Every file is written to a temp file and os.replace()d into place, so the
+app never sees a half-written chapter or manifest.
+
+Usage:
+    python scripts/publish_chapter.py <chapter_output_dir> [--chapter N]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from atomic_io import write_atomic, write_json_atomic
+from block_store import load_content_list, to_json_bytes
+from fix_chapter_footnotes import process_file as fix_footnotes, repair_markdown
+
+PUBLIC_DATA_DIR = "public/data"
+MANIFEST_NAME = "manifest.json"
+# Footnote-repaired content list, next to the MinerU one it is repaired from
+FIXED_NAME = "content_list.fixed.blocks"
+
+_manifest_lock = threading.Lock()
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_chapter_files(chapter_dir: str):
+    """
+    Locate the markdown and content list inside a conversion output dir.
+
+    Handles both layouts: CLI output ({pdf_name}.md + content_list.json) and
+    API zips (full.md + {uuid}_content_list.json).
+    """
+    content_lists = sorted(glob.glob(os.path.join(chapter_dir, "**", "*content_list.json"), recursive=True))
+    # Prefer the standard name written by convert_chapter()
+    content_list = next((p for p in content_lists if os.path.basename(p) == "content_list.json"),
+                        content_lists[0] if content_lists else None)
+
+    md_files = [p for p in glob.glob(os.path.join(chapter_dir, "**", "*.md"), recursive=True)]
+    md_path = next((p for p in md_files if os.path.basename(p) == "full.md"), None)
+    if md_path is None and md_files:
+        md_path = max(md_files, key=os.path.getsize)
+
+    return md_path, content_list
+
+
+def chapter_number_from_name(name: str):
+    match = re.search(r'Ch(\d+)', name)
+    return int(match.group(1)) if match else None
+
+
+def update_manifest(chapter_num: int, entry: dict, out_dir: str = PUBLIC_DATA_DIR):
+    """Merge one chapter entry into manifest.json (read-modify-replace under a lock)."""
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with _manifest_lock:
+        manifest = {"chapters": {}}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        manifest.setdefault("chapters", {})[f"Ch{chapter_num}"] = entry
+        manifest["updated_at"] = entry["published_at"]
+        write_json_atomic(manifest_path, manifest, indent=2)
+
+
+def publish_chapter(chapter_dir: str, chapter_num: int = None, name: str = None,
+                    backend: str = "pipeline", version: str = "",
+                    out_dir: str = PUBLIC_DATA_DIR) -> bool:
+    """
+    Footnote-repair and publish a single converted chapter.
+
+    Args:
+        chapter_dir: Directory holding one chapter's MinerU output
+        chapter_num: Chapter number (derived from the dir name if omitted)
+        name: Result key for Ch{N}.json (defaults to the chapter dir name)
+        backend / version: Recorded in Ch{N}.json like the MinerU API response
+
+    Returns:
+        True if the chapter was published
+    """
+    name = name or os.path.basename(os.path.normpath(chapter_dir))
+    if chapter_num is None:
+        chapter_num = chapter_number_from_name(name)
+    if chapter_num is None:
+        print(f"ERROR: Cannot tell chapter number for {chapter_dir}")
+        return False
+
+    md_path, content_list_path = find_chapter_files(chapter_dir)
+    if not md_path:
+        print(f"ERROR: No markdown found in {chapter_dir}")
+        return False
+
+    print(f"Publishing Ch{chapter_num} from {chapter_dir}...")
+
+    fixed_path = None
+    if content_list_path:
+        # Repair into a sibling file, as pipeline.py does: the MinerU content list
+        # stays untouched, so the markdown can be repaired against it on every run
+        fixed_path = os.path.join(os.path.dirname(content_list_path), FIXED_NAME)
+        if not fix_footnotes(fixed_path, source=content_list_path):
+            return False
+
+    return export_chapter(chapter_num, md_path, fixed_path, name, backend, version, out_dir,
+                          source_content_list=content_list_path)
+
+
+def export_chapter(chapter_num: int, md_path: str, content_list_path: str, name: str,
+                   backend: str = "pipeline", version: str = "",
+                   out_dir: str = PUBLIC_DATA_DIR, source_content_list: str = None) -> bool:
+    """
+    Write an already footnote-repaired chapter to out_dir and update the manifest.
+    With source_content_list, the unrepaired content list content_list_path was
+    repaired from, the markdown gets the same repairs before it is published.
+    """
+    start = time.time()
+    entry = {"name": name, "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+    if content_list_path:
+        # The app reads JSON, whatever format the pipeline kept it in
+        content_list_bytes = to_json_bytes(content_list_path)
+        cl_name = f"Ch{chapter_num}_content_list.json"
+        write_atomic(os.path.join(out_dir, cl_name), content_list_bytes)
+        entry["content_list"] = {"path": cl_name, "sha256": sha256_bytes(content_list_bytes)}
+
+    with open(md_path, 'r', encoding='utf-8') as f:
+        md_content = f.read()
+    if content_list_path and source_content_list:
+        md_content, replaced, missing = repair_markdown(md_content, load_content_list(source_content_list),
+                                                        json.loads(content_list_bytes))
+        print(f"   Markdown footnotes: {replaced} blocks repaired"
+              + (f", {missing} not found in {os.path.basename(md_path)}" if missing else ""))
+
+    md_name = f"Ch{chapter_num}.md"
+    write_atomic(os.path.join(out_dir, md_name), md_content)
+    entry["md"] = {"path": md_name, "sha256": sha256_bytes(md_content.encode('utf-8'))}
+
+    result = {"backend": backend, "version": version, "results": {name: {"md_content": md_content}}}
+    json_bytes = json.dumps(result, ensure_ascii=False).encode('utf-8')
+    json_name = f"Ch{chapter_num}.json"
+    write_atomic(os.path.join(out_dir, json_name), json_bytes)
+    entry["json"] = {"path": json_name, "sha256": sha256_bytes(json_bytes)}
+
+    update_manifest(chapter_num, entry, out_dir)
+
+    print(f"✅ Published Ch{chapter_num} to {out_dir} ({time.time() - start:.1f}s)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Footnote-repair and publish one converted chapter")
+    parser.add_argument("chapter_dir", help="Chapter output directory (CLI or API layout)")
+    parser.add_argument("--chapter", type=int, help="Chapter number (default: from dir name)")
+    parser.add_argument("--out", default=PUBLIC_DATA_DIR, help="Publish directory")
+    args = parser.parse_args()
+
+    publish_chapter(args.chapter_dir, args.chapter, out_dir=args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,15 @@ Restructure Chapter 1 HTML with proper hierarchical sections.
 import re
 import sys
 
+from heading_classifier import LEVEL_CLASSES, HeadingClassifier
+
 def restructure_html(input_file, output_file):
     with open(input_file, 'r', encoding='utf-8') as f:
         html = f.read()
     
-    # Section header mapping with proper hierarchy
-    # Main sections (A-H) -> h2
-    main_sections = {
+    # Section headers: old pandoc id -> (editorial title, new id)
+    # The level (h2/h3/h4) comes from the shared heading classifier
+    headings = {
         'a.-introduction-to-taxation-of-business-entities': ('A. INTRODUCTION TO TAXATION OF BUSINESS ENTITIES', 'section-a'),
         'b.-influential-policies': ('B. INFLUENTIAL POLICIES', 'section-b'),
         'c.-introduction-to-choice-of-business-entity': ('C. CHOICE OF BUSINESS ENTITY', 'section-c'),
@@ -21,10 +23,6 @@ def restructure_html(input_file, output_file):
         'f.-the-common-law-of-corporate-taxation': ('F. ANTI-AVOIDANCE DOCTRINES', 'section-f'),
         'g.-recognition-of-the-corporate-entity': ('G. RECOGNITION OF THE CORPORATE ENTITY', 'section-g'),
         'h.-tax-policy-issues': ('H. TAX POLICY ISSUES', 'section-h'),
-    }
-    
-    # Subsections (1, 2, 3) -> h3
-    subsections = {
         'the-corporate-income-tax': ('1. THE CORPORATE INCOME TAX', 'section-d-1'),
         'multiple-and-affiliated-corporations': ('2. MULTIPLE AND AFFILIATED CORPORATIONS', 'section-d-2'),
         'in-general': ('1. IN GENERAL', 'section-e-1'),
@@ -33,10 +31,6 @@ def restructure_html(input_file, output_file):
         'introduction': ('1. INTRODUCTION', 'section-h-1'),
         'corporate-integration': ('2. CORPORATE INTEGRATION', 'section-h-2'),
         'other-corporate-tax-reform-options': ('3. OTHER CORPORATE TAX REFORM OPTIONS', 'section-h-3'),
-    }
-    
-    # Sub-subsections (a, b, c) -> h4
-    sub_subsections = {
         'a.-check-the-box-regulations': ('a. "Check-the-Box" Regulations', 'section-e-2-a'),
         'b.-publicly-traded-partnerships': ('b. Publicly Traded Partnerships', 'section-e-2-b'),
         'a.-background-and-issues': ('A. Background and Issues', 'section-jct-a'),
@@ -157,22 +151,16 @@ def restructure_html(input_file, output_file):
     # Insert CSS before </style>
     html = html.replace('</style>', css_addition + '\n</style>')
     
-    # Convert main sections h1 -> h2
-    for old_id, (title, new_id) in main_sections.items():
-        pattern = rf'<h1 id="{re.escape(old_id)}">[^<]*(?:</h1>|(?:\n[^<]*)+</h1>)'
-        replacement = f'<h2 class="main-section" id="{new_id}">{title}</h2>'
-        html = re.sub(pattern, replacement, html, flags=re.IGNORECASE)
-    
-    # Convert subsections h1 -> h3
-    for old_id, (title, new_id) in subsections.items():
-        pattern = rf'<h1 id="{re.escape(old_id)}">[^<]*(?:</h1>|(?:\n[^<]*)+</h1>)'
-        replacement = f'<h3 class="subsection" id="{new_id}">{title}</h3>'
-        html = re.sub(pattern, replacement, html, flags=re.IGNORECASE)
-    
-    # Convert sub-subsections h1 -> h4
-    for old_id, (title, new_id) in sub_subsections.items():
+    # Convert section h1s to h2/h3/h4, classifying in document order
+    classifier = HeadingClassifier()
+    for old_id in [m.group(1).lower() for m in re.finditer(r'<h1 id="([^"]+)">', html)]:
+        if old_id not in headings:
+            continue
+        title, new_id = headings[old_id]
+        level = classifier.classify_text(title, is_heading=True)
+        tag = f'h{level}'
         pattern = rf'<h1 id="{re.escape(old_id)}">[^<]*(?:</h1>|(?:\n[^<]*)+</h1>)'
-        replacement = f'<h4 class="sub-subsection" id="{new_id}">{title}</h4>'
+        replacement = f'<{tag} class="{LEVEL_CLASSES[level]}" id="{new_id}">{title}</{tag}>'
         html = re.sub(pattern, replacement, html, flags=re.IGNORECASE)
     
     # Fix Chapter 1 headers
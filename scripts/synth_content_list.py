@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Synthetic MinerU Document Generator
+
+Generates seeded, realistic MinerU content_list.json and middle.json
+documents at any scale (10 pages to 100k+), for finding super-linear
+behavior that the ~15 real chapters are too small to show.
+
+Each page gets a running header, body paragraphs with in-text footnote
+references in the forms MinerU produces ("word.12", "[12]", "<sup>12</sup>",
+"$^{12}$"), occasional A./1./a. headings, tables and images, the matching
+page_footnote blocks and a page_number. Footnote numbering restarts every
+--chapter-pages pages like the real book, and --outlier-rate of the footnote
+markers are OCR-misnumbered so the LIS outlier filter has work to do.
+
+Body text is sampled from the shipped chapters when available.
+
+Usage:
+    python scripts/synth_content_list.py --pages 10000 --seed 1 --out /tmp/synth
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+from typing import List, Tuple
+
+from bench_fixtures import content_list_to_middle, load_shipped_chapters
+
+FALLBACK_SENTENCES = [
+    "Section 351 provides that no gain or loss is recognized if property is transferred to a corporation.",
+    "The transferors must be in control of the corporation immediately after the exchange.",
+    "A shareholder's basis in the stock received is determined under Section 358.",
+    "The Service ruled that the transaction qualified as a reorganization under Section 368(a)(1)(B).",
+    "Boot received in the exchange is taxable to the extent of the gain realized.",
+    "The corporation takes a transferred basis in the property under Section 362(a).",
+    "Courts have applied the step transaction doctrine to collapse the steps of an integrated plan.",
+    "See Rev. Rul. 2003-51, 2003-1 C.B. 938.",
+]
+
+HEADERS = ["CORPORATE TAXATION", "PART TWO", "TAXATION OF C CORPORATIONS", "CHAPTER {ch}"]
+REF_FORMS = ["{w}.{n}", "{w}[{n}]", "{w}<sup>{n}</sup>", "{w}$^{{{n}}}$", "{w},{n}"]
+
+
+def load_sentences() -> List[str]:
+    sentences = []
+    for chapter in load_shipped_chapters().values():
+        for para in re.split(r'\n\s*\n', chapter["md_content"]):
+            para = para.strip()
+            if para.startswith(("#", "<", "!")) or len(para) < 80:
+                continue
+            sentences.extend(s for s in re.split(r'(?<=[a-z]\.)\s+(?=[A-Z])', para) if 40 < len(s) < 400)
+    return sentences or FALLBACK_SENTENCES
+
+
+def generate(pages: int, seed: int = 0, chapter_pages: int = 60, footnote_rate: float = 0.35,
+             outlier_rate: float = 0.01, first_page: int = 1) -> List[dict]:
+    """Return a content_list for `pages` pages. Same arguments -> same document."""
+    rng = random.Random(seed)
+    sentences = load_sentences()
+    blocks = []
+    fn_counter = 0
+    section = sub = subsub = 0
+
+    def add(block_type, page_idx, y0, y1, **fields):
+        block = {"type": block_type}
+        block.update(fields)
+        block["bbox"] = [72, round(y0), 540, round(y1)]
+        block["page_idx"] = page_idx
+        blocks.append(block)
+
+    for page_idx in range(pages):
+        chapter = page_idx // chapter_pages + 1 if chapter_pages else 1
+        if chapter_pages and page_idx % chapter_pages == 0:
+            fn_counter = section = sub = subsub = 0
+
+        add("header", page_idx, 30, 42, text=rng.choice(HEADERS).format(ch=chapter))
+        y = 72.0
+        page_refs: List[Tuple[int, str]] = []
+
+        for _ in range(rng.randint(4, 9)):
+            roll = rng.random()
+            if roll < 0.06:
+                level = rng.choices([0, 1, 2], weights=[1, 3, 2])[0]
+                if level == 0 or section == 0:
+                    section, sub, subsub = min(section + 1, 8), 0, 0
+                    title = f"{'ABCDEFGH'[section - 1]}. {rng.choice(sentences)[:50].upper()}"
+                    height = 22
+                elif level == 1:
+                    sub, subsub = sub + 1, 0
+                    title = f"{sub}. {rng.choice(sentences)[:40].upper()}"
+                    height = 18
+                else:
+                    subsub += 1
+                    title = f"{'abcdefghijklmnopqrstuvwxyz'[(subsub - 1) % 26]}. {rng.choice(sentences)[:40]}"
+                    height = 14
+                add("text", page_idx, y, y + height, text=title.strip(), text_level=1)
+                y += height + 10
+                continue
+            if roll < 0.08:
+                rows = "".join(f"<tr><td>Item {r}</td><td>$ {rng.randint(1, 500)}</td></tr>" for r in range(rng.randint(2, 6)))
+                add("table", page_idx, y, y + 80, table_body=f"<table>{rows}</table>",
+                    table_caption=[], table_footnote=[], img_path="")
+                y += 90
+                continue
+            if roll < 0.09:
+                add("image", page_idx, y, y + 120, img_path=f"images/{rng.getrandbits(128):032x}.jpg",
+                    image_caption=[], image_footnote=[])
+                y += 130
+                continue
+
+            words = " ".join(rng.choice(sentences) for _ in range(rng.randint(1, 4))).split(" ")
+            if rng.random() < footnote_rate:
+                fn_counter += 1
+                pos = rng.randrange(len(words))
+                words[pos] = rng.choice(REF_FORMS).format(w=words[pos].rstrip(".,"), n=fn_counter)
+                page_refs.append((fn_counter, rng.choice(sentences)))
+            text = " ".join(words)
+            height = 12 * (1 + len(text) // 90)
+            add("text", page_idx, y, y + height, text=text)
+            y = min(y + height + 6, 660)
+
+        fy = 680.0
+        for num, note in page_refs:
+            if rng.random() < outlier_rate:
+                num = rng.randint(1, 300)
+            add("page_footnote", page_idx, fy, fy + 10, text=f"{num} {note}")
+            fy = min(fy + 12, 740)
+        add("page_number", page_idx, 750, 760, text=str(first_page + page_idx))
+
+    return blocks
+
+
+def to_pandoc_html(blocks: List[dict]) -> str:
+    """Pandoc-style HTML of the body text, as process_ch1_v3.py expects."""
+    parts = ["<html><body>"]
+    for block in blocks:
+        if block["type"] != "text":
+            continue
+        tag = "h2" if block.get("text_level") else "p"
+        parts.append(f"<{tag}>{block['text']}</{tag}>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic MinerU content_list/middle JSON")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chapter-pages", type=int, default=60, help="Footnote numbering restarts every N pages (0 = never)")
+    parser.add_argument("--footnote-rate", type=float, default=0.35, help="Chance a paragraph carries a footnote ref")
+    parser.add_argument("--outlier-rate", type=float, default=0.01, help="Chance a footnote marker is misnumbered")
+    parser.add_argument("--out", default="synthetic", help="Output directory")
+    parser.add_argument("--no-middle", action="store_true", help="Skip middle.json")
+    args = parser.parse_args()
+
+    blocks = generate(args.pages, args.seed, args.chapter_pages, args.footnote_rate, args.outlier_rate)
+    os.makedirs(args.out, exist_ok=True)
+    stem = f"synthetic_{args.pages}p_s{args.seed}"
+
+    cl_path = os.path.join(args.out, f"{stem}_content_list.json")
+    with open(cl_path, 'w', encoding='utf-8') as f:
+        json.dump(blocks, f, indent=4, ensure_ascii=False)
+    print(f"✅ {cl_path} ({len(blocks):,} blocks, {args.pages:,} pages)")
+
+    if not args.no_middle:
+        middle_path = os.path.join(args.out, f"{stem}_middle.json")
+        with open(middle_path, 'w', encoding='utf-8') as f:
+            json.dump(content_list_to_middle(blocks), f, ensure_ascii=False)
+        print(f"✅ {middle_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Pipeline CLI
+
+One entry point for the pipeline scripts:
+
+    split           pdf-processing/splitter.py              source PDF → chapter PDFs (pypdf)
+    convert         pdf-processing/convert_chapter_mineru.py  chapter PDFs → MinerU output (mineru CLI)
+    api             scripts/parse_mineru_api.py             MinerU.net batch API (requests, dotenv)
+                      --sequential: scripts/parse_mineru_sequential.py, one chapter at a time
+                      --scheduled: scripts/mineru_scheduler.py, quota-aware batches (--simulate for the fake API)
+    fix-footnotes   scripts/fix_chapter_footnotes.py        --file/--root content list repair
+                      with a positional file: scripts/fix_ch1_footnotes.py (--pages, --dry-run)
+    render          pdf-processing/fix_mineru_content.py    middle.json → markdown
+    export          scripts/publish_chapter.py              footnote-repair + publish one chapter
+    pipeline        scripts/pipeline.py                     the incremental DAG over all of the above
+    startup         cold start of each subcommand, measured with python -X importtime
+
+Arguments after the subcommand go to the script unchanged, so each script
+keeps its own flags and still runs on its own. This file imports nothing
+beyond the standard library. A subcommand's module, and the heavy
+dependencies behind it, are imported only when that subcommand runs.
+`fix-footnotes` therefore never loads requests, pypdf or torch.
+
+`startup` runs every subcommand in a fresh interpreter with -X importtime
+and PIPELINE_CLI_IMPORT_ONLY=1. That imports the subcommand's module and
+stops before running it. The report shows the total import time, the
+slowest top-level imports and any missing dependency.
+
+Usage:
+    python scripts/taxprep.py fix-footnotes --file public/data/mineru/Ch2/content_list.json
+    python scripts/taxprep.py fix-footnotes output/ch1/Ch1_content_list.json --pages 3-9 --dry-run
+    python scripts/taxprep.py convert 2 --chunk-pages 8
+    python scripts/taxprep.py api --sequential
+    python scripts/taxprep.py api --scheduled --simulate
+    python scripts/taxprep.py startup
+    python scripts/taxprep.py startup fix-footnotes --max-ms 50
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_DIR = os.path.normpath(os.path.join(SCRIPTS_DIR, "..", "pdf-processing"))
+IMPORT_ONLY_ENV = "PIPELINE_CLI_IMPORT_ONLY"
+
+
+class Command:
+    """A script behind a subcommand: its module, the directory it lives in and how to run it."""
+
+    def __init__(self, module: str, directory: str, entry="main", cwd=None):
+        self.module = module
+        self.directory = directory
+        # Name of the module's main function; None runs the file as __main__
+        self.entry = entry
+        self.cwd = cwd
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.module}.py")
+
+
+COMMANDS = {
+    # splitter.py reads its PDF relative to pdf-processing/, as pipeline.py runs it
+    "split": Command("splitter", PDF_DIR, "split_pdf", cwd=PDF_DIR),
+    "convert": Command("convert_chapter_mineru", PDF_DIR, None),
+    "api": Command("parse_mineru_api", SCRIPTS_DIR),
+    "fix-footnotes": Command("fix_chapter_footnotes", SCRIPTS_DIR),
+    "render": Command("fix_mineru_content", PDF_DIR),
+    "export": Command("publish_chapter", SCRIPTS_DIR),
+    "pipeline": Command("pipeline", SCRIPTS_DIR),
+}
+SEQUENTIAL_API = Command("parse_mineru_sequential", SCRIPTS_DIR)
+SCHEDULED_API = Command("mineru_scheduler", SCRIPTS_DIR)
+PAGE_FOOTNOTES = Command("fix_ch1_footnotes", SCRIPTS_DIR)
+
+
+def resolve(name: str, args: list):
+    """(Command, args for it), picking the variant scripts behind api and fix-footnotes."""
+    command = COMMANDS[name]
+    if name == "api" and "--sequential" in args:
+        return SEQUENTIAL_API, [a for a in args if a != "--sequential"]
+    if name == "api" and "--scheduled" in args:
+        return SCHEDULED_API, [a for a in args if a != "--scheduled"]
+    if name == "fix-footnotes" and not {"--file", "--root"} & set(args) \
+            and any(not a.startswith("-") for a in args):
+        return PAGE_FOOTNOTES, args
+    return command, args
+
+
+def run(command: Command, args: list) -> int:
+    for directory in (SCRIPTS_DIR, PDF_DIR):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    if command.cwd:
+        os.chdir(command.cwd)
+    sys.argv = [command.path] + args
+
+    if os.environ.get(IMPORT_ONLY_ENV):
+        __import__(command.module)
+        return 0
+    if command.entry is None:
+        import runpy
+        runpy.run_path(command.path, run_name="__main__")
+        return 0
+    result = getattr(__import__(command.module), command.entry)()
+    return result if isinstance(result, int) else 0
+
+
+# ============================================================================
+# STARTUP MEASUREMENT
+# ============================================================================
+
+def parse_importtime(stderr: str, module: str):
+    """(total self time in us, [(cumulative us, name)] of what module imported directly) from -X importtime."""
+    total, children, direct = 0, [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        total += int(self_us)
+        # The name is indented two spaces per nesting level, and a module is
+        # reported after everything it imported
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative_us), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                direct = children
+            children = []
+    return total, sorted(direct, reverse=True)
+
+
+def measure(name: str, args: list) -> dict:
+    import subprocess
+    import time
+    env = dict(os.environ, **{IMPORT_ONLY_ENV: "1"})
+    if name == "python":
+        cmd, module = ["-c", "pass"], None
+    else:
+        cmd, module = [os.path.abspath(__file__), name] + args, resolve(name, args)[0].module
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + cmd, capture_output=True, text=True, env=env)
+    wall = time.perf_counter() - start
+    total, direct = parse_importtime(result.stderr, module)
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["failed"])[-1]
+    return {"imports_ms": total / 1000, "wall_ms": wall * 1000, "top": direct[:3], "error": error}
+
+
+def startup(argv: list) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="taxprep.py startup",
+                                     description="Measure each subcommand's cold start with -X importtime")
+    parser.add_argument("commands", nargs="*", help=f"Subcommands (default: all of {', '.join(COMMANDS)})")
+    parser.add_argument("--max-ms", type=float, help="Exit 1 if a measured subcommand imports for longer than this")
+    args = parser.parse_args(argv)
+
+    names = args.commands or list(COMMANDS)
+    unknown = [n for n in names if n not in COMMANDS]
+    if unknown:
+        parser.error(f"unknown subcommand: {', '.join(unknown)}")
+
+    baseline = measure("python", [])
+    print(f"  {'(interpreter)':<22} {baseline['imports_ms']:>7.1f} ms imports {baseline['wall_ms']:>7.1f} ms wall")
+    runs = [(n, []) for n in names] + [("api", [v]) for n in names if n == "api"
+                                       for v in ("--sequential", "--scheduled")]
+    rows = []
+    for name, extra in runs:
+        row = measure(name, extra)
+        row["name"] = " ".join([name] + extra)
+        rows.append(row)
+        heaviest = ", ".join(f"{m} {us / 1000:.1f}" for us, m in row["top"])
+        status = f"  ✗ {row['error']}" if row["error"] else ""
+        print(f"  {row['name']:<22} {row['imports_ms']:>7.1f} ms imports {row['wall_ms']:>7.1f} ms wall  "
+              f"[{heaviest}]{status}")
+
+    over = [r["name"] for r in rows if args.max_ms is not None and r["imports_ms"] > args.max_ms]
+    if over:
+        print(f"❌ Over {args.max_ms:.0f} ms: {', '.join(over)}")
+        return 1
+    print(f"✅ Measured {len(rows)} subcommands")
+    return 0
+
+
+def usage():
+    print("\n\n".join(__doc__.split("\n\n")[1:3]).strip("\n"))
+    print("\nUsage: python scripts/taxprep.py <subcommand> [args...]   (<subcommand> --help for its flags)")
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        usage()
+        return 0 if argv else 2
+    name, args = argv[0], argv[1:]
+    if name == "startup":
+        return startup(args)
+    if name not in COMMANDS:
+        print(f"❌ Unknown subcommand: {name}")
+        usage()
+        return 2
+    return run(*resolve(name, args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
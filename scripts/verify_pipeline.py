@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Verify Pipeline
+
+Replays known inputs through the Python pipeline stages and checks the
+results, like verify_parser.ts and verify_text_cleaner.ts do for the
+TypeScript side.
+
+check_postgres_load runs only when VERIFY_POSTGRES_DSN names a Postgres
+it may create a scratch database on (psycopg 3 needed); otherwise it is
+skipped with a note.
+
+Usage:
+    python scripts/verify_pipeline.py
+    VERIFY_POSTGRES_DSN=postgresql://postgres@localhost/postgres python scripts/verify_pipeline.py
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from typing import List
+
+import bench_fixtures
+import block_store
+import build_search_index
+import load_postgres
+from block_store import EXTENSION as BLOCKS_EXTENSION, load_content_list, save_content_list, to_json_bytes
+from build_search_index import tokenize
+from build_section_tree import build_section_tree
+from build_textbook_db import build_db
+from fix_chapter_footnotes import process_file, state_path
+from page_index import PageReader, build_index, index_path, load_index, write_pages
+from publish_chapter import publish_chapter
+from synth_content_list import generate
+
+# ============================================================================
+# CITATIONS
+# ============================================================================
+
+# Dollar amounts as MinerU writes them in the shipped chapters; none of these is a section
+MONEY_TEXT = [
+    r"the Monitor shares for \$133,333.33. She",
+    r"sum of $\$ 76,007.88$ , based on",
+    r"an adjusted basis of $\$ 57,325,45$ Further",
+    r"each share was worth \$81.60, and",
+    r"235 shares at \$100.00 par value",
+    r"paid $\$ 23,400$ for the stock",
+    r"about 100 employees and \$50 million in sales",
+    r"worth \$15 'million",
+    r"revenues of $\$ 1.38$ billion",
+    r"for $\$ 465$ million in cash",
+    r"(fair market value, \$20,00o) and X took",
+    r"used in its business $( \$ 10 ,000$ fair market value",
+    r"liabiities of \$2,00,000.Proft Co.",
+    r"the \$1, 00 capital contribution",
+    r"a value of \$100 and a basis of \$10 in exchange",
+    r"(\$3 on Asset II, plus \$5 on Asset III = \$8)",
+    r"a promissory note for \$1m that was modified",
+    r"the \$10 (A's basis) is allocated",
+]
+
+# MinerU's § → \$ confusion, which should still be read as a cite
+OCR_CITES = [
+    (r"required by \$ 355(b)(2)(B).", "§355(b)(2)(b)"),
+    (r"Skim \$\$ 301; 302; 355", "§302"),
+    (r"a business under \$ 1.355– 3(b)(3)", "reg§1.355"),
+    (r"Under § 351(a) and 368", "§368"),
+]
+
+
+def check_citations(failures: List[str]):
+    for text in MONEY_TEXT:
+        cites = [t for t in tokenize(text) if "§" in t]
+        if cites:
+            failures.append(f"money read as a cite: {text!r} → {cites}")
+    for text, expected in OCR_CITES:
+        if expected not in tokenize(text):
+            failures.append(f"missing {expected} in {text!r} → {tokenize(text)}")
+
+
+# ============================================================================
+# BLOCK STORE
+# ============================================================================
+
+# Blocks that take every encoding path of block_store._encode_column()
+EDGE_BLOCKS = [
+    {"type": "text", "text": "NUL \x00 inside § 351", "page_idx": 0, "bbox": [0, 1, 2, 3]},
+    {"page_idx": 0, "type": "text", "text": "", "bbox": [0.5, 1.25, -2.0, 3.0]},
+    {"type": "image", "img_path": "images/a.jpg", "page_idx": 1 << 40, "bbox": [1, 2, 3],
+     "image_caption": [], "image_footnote": ["note"]},
+    {"type": "table", "table_body": "<table>§ 351 — café 𝔸</table>", "page_idx": -1, "bbox": None,
+     "text_level": True, "score": 0.5},
+    {"type": "equation", "text": "$x^2$", "text_format": "latex", "page_idx": 2, "bbox": [1, 2, 3, 4],
+     "score": 1, "nested": {"a": [1, {"b": None}]}},
+]
+
+
+def check_block_store_roundtrip(failures: List[str]):
+    """
+    A content list packed into .blocks (raw and zlib columns) unpacks to the
+    exact indent=4 JSON bytes it came from, and read_column() returns each
+    key's values.
+    """
+    documents = {"edge cases": EDGE_BLOCKS, "empty": [],
+                 "conflicting key orders": [{"a": 1, "b": 2}, {"b": 3, "a": 4}]}
+    for seed in range(3):
+        documents[f"synthetic seed {seed}"] = generate(30, seed=seed)
+    for fixture in bench_fixtures.build_fixtures():
+        documents[fixture["name"]] = fixture["content_list"]
+
+    for name, blocks in documents.items():
+        want = json.dumps(blocks, indent=4, ensure_ascii=False).encode('utf-8')
+        for level in (0, 6):
+            label = f"{name}, level {level}"
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "Ch2_content_list" + BLOCKS_EXTENSION)
+                with open(path, 'wb') as f:
+                    f.write(block_store.dumps(blocks, level))
+                if to_json_bytes(path) != want:
+                    failures.append(f"block store ({label}): unpacked JSON differs from the input bytes")
+                for key in {k for b in blocks for k in b}:
+                    if block_store.read_column(path, key) != [b[key] for b in blocks if key in b]:
+                        failures.append(f"block store ({label}): read_column({key!r}) differs")
+
+
+# ============================================================================
+# PAGE WRITES
+# ============================================================================
+
+def check_write_pages(failures: List[str]):
+    """Replacing pages of several blocks keeps every other block and drops all of the old ones."""
+    blocks = [{"type": "text", "text": f"t{i}", "page_idx": page} for i, page in enumerate([0, 0, 1, 1, 1, 2, 2])]
+    new = {1: [{"type": "text", "text": "t2!", "page_idx": 1}, {"type": "text", "text": "t3!", "page_idx": 1}],
+           2: [{"type": "text", "text": "t5!", "page_idx": 2}]}
+    expected = ["t0", "t1", "t2!", "t3!", "t5!"]
+    for extension in (BLOCKS_EXTENSION, ".json"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "Ch2_content_list" + extension)
+            save_content_list(blocks, path)
+            write_pages(path, {p: list(b) for p, b in new.items()})
+            texts = [b["text"] for b in load_content_list(path)]
+        if texts != expected:
+            failures.append(f"write_pages {extension}: {texts} != {expected}")
+
+
+def _replaced(blocks: List[dict], pages: dict) -> List[dict]:
+    """What write_pages() should leave: each page's new blocks where its first old one was."""
+    out, done = [], set()
+    for block in blocks:
+        page = block.get("page_idx")
+        if page not in pages:
+            out.append(block)
+        elif page not in done:
+            out.extend(pages[page])
+            done.add(page)
+    return out
+
+
+def _page_edits(blocks: List[dict], rng: random.Random, count: int) -> dict:
+    """New blocks for count pages: longer, shorter, non-ASCII text and a changed footnote marker."""
+    edits = {}
+    for page in rng.sample(sorted({b["page_idx"] for b in blocks}), count):
+        new = copy.deepcopy([b for b in blocks if b["page_idx"] == page])
+        for block in new:
+            if block["type"] == "text":
+                block["text"] = rng.choice([block["text"] * 2, block["text"][:20], block["text"] + " § 351 — café 𝔸"])
+            elif block["type"] == "page_footnote":
+                block["text"] = re.sub(r'^\d+', str(rng.randint(1, 40)), block["text"])
+        edits[page] = new[:rng.randint(1, len(new))]
+    return edits
+
+
+def check_write_pages_bytes(failures: List[str]):
+    """
+    write_pages() leaves the bytes json.dump(indent=4) would write, and a
+    sidecar index equal to a fresh build_index(), whether it splices in
+    place (twice, the second on the shifted index) or rewrites the file.
+    """
+    for seed in range(3):
+        rng = random.Random(seed)
+        blocks = generate(12, seed=seed)
+        first, second = _page_edits(blocks, rng, 3), _page_edits(blocks, rng, 2)
+        # Page 0's blocks split in two runs, and an emptied page: both take the full rewrite
+        scattered = blocks[1:] + blocks[:1]
+        rewrites = {"in place": (blocks, [first, second]),
+                    "non-contiguous page": (scattered, [{0: first.get(0) or blocks[:1]}]),
+                    "emptied page": (blocks, [{blocks[-1]["page_idx"]: []}])}
+        for name, (start, writes) in rewrites.items():
+            for extension in (".json", BLOCKS_EXTENSION):
+                label = f"seed {seed}, {name}, {extension}"
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, "Ch2_content_list" + extension)
+                    save_content_list(start, path)
+                    expected = start
+                    try:
+                        for pages in writes:
+                            if extension == ".json":
+                                load_index(path)
+                            write_pages(path, copy.deepcopy(pages))
+                            expected = _replaced(expected, pages)
+                        problems = _write_pages_problems(path, expected)
+                    except ValueError as e:
+                        problems = [f"unreadable after the write ({e})"]
+                    failures.extend(f"write_pages ({label}): {problem}" for problem in problems)
+
+
+def _write_pages_problems(path: str, expected: List[dict]) -> List[str]:
+    problems = []
+    if to_json_bytes(path) != json.dumps(expected, indent=4, ensure_ascii=False).encode('utf-8'):
+        problems.append("bytes differ from json.dump(indent=4)")
+    if path.endswith(BLOCKS_EXTENSION):
+        return problems
+    with open(index_path(path), 'r', encoding='utf-8') as f:
+        kept = json.load(f)
+    with PageReader(path) as reader:
+        pages_read = [b for p in reader.page_numbers() for b in reader.read_page(p)]
+    if pages_read != sorted(expected, key=lambda b: b["page_idx"]):
+        problems.append("PageReader returns other blocks")
+    if kept != build_index(path):
+        problems.append("shifted index differs from a rebuilt one")
+    return problems
+
+
+# ============================================================================
+# PAGE-KEYED CACHES
+# ============================================================================
+
+def check_page_range_rebuild(failures: List[str]):
+    """Moving a chapter's startPage re-tokenizes it in the search index and reloads it in textbook.db."""
+    sources = build_search_index.chapter_sources()
+    if not sources:
+        return
+    num = min(sources)
+    start = build_search_index.chapter_page_range(num)[0]
+    chapter_def = build_search_index._chapter_defs[num]
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        search_dir, db_path = os.path.join(tmp, "search"), os.path.join(tmp, "textbook.db")
+        cache_dir, build_search_index.CACHE_DIR = build_search_index.CACHE_DIR, os.path.join(tmp, "cache")
+        try:
+            build_search_index.build_index(search_dir)
+            build_db(db_path)
+            chapter_def["startPage"] = start + 10
+            build_search_index.build_index(search_dir)
+            loaded = build_db(db_path)
+        finally:
+            chapter_def["startPage"] = start
+            build_search_index.CACHE_DIR = cache_dir
+        with open(os.path.join(search_dir, "docs", f"Ch{num}.json"), 'r', encoding='utf-8') as f:
+            search_page = json.load(f)["sections"][0]["page"]
+        conn = sqlite3.connect(db_path)
+        db_page = conn.execute("SELECT first_page FROM chapters WHERE num = ?", (num,)).fetchone()[0]
+        conn.close()
+    if search_page != start + 10:
+        failures.append(f"search index kept Ch{num} at page {search_page} after startPage moved to {start + 10}")
+    if loaded != [f"Ch{num}"] or db_page != start + 10:
+        failures.append(f"textbook.db reloaded {loaded}, Ch{num} at page {db_page}, after startPage moved")
+
+
+# ============================================================================
+# INCREMENTAL FOOTNOTE REPAIR
+# ============================================================================
+
+SKIPPED = re.compile(r'Pages skipped: (\d+)/')
+
+
+def edit_pages(blocks: List[dict], rng: random.Random, count: int):
+    """Change the body text of count blocks, each gaining an inline footnote reference."""
+    texts = [b for b in blocks if b["type"] == "text" and not b.get("text_level")]
+    for block in rng.sample(texts, count):
+        block["text"] += f" and revised{rng.randint(1, 40)} Then"
+
+
+def edit_footnotes(blocks: List[dict], rng: random.Random, count: int):
+    """Drop, renumber or add count page_footnote markers, which moves the footer map and page windows."""
+    notes = [i for i, b in enumerate(blocks) if b["type"] == "page_footnote"]
+    for i in sorted(rng.sample(notes, count), reverse=True):
+        action = rng.choice(("drop", "renumber", "add"))
+        if action == "drop":
+            del blocks[i]
+        elif action == "renumber":
+            blocks[i]["text"] = re.sub(r'^\d+', str(rng.randint(1, 40)), blocks[i]["text"])
+        else:
+            blocks.insert(i + 1, dict(blocks[i], text=f"{rng.randint(1, 40)} See note."))
+
+
+EDITS = {"pages": [edit_pages], "footnotes": [edit_footnotes], "pages+footnotes": [edit_pages, edit_footnotes]}
+
+
+def _repair(path: str, source: str = None) -> int:
+    """process_file() quietly; the number of pages it skipped."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        ok = process_file(path, source)
+    if not ok:
+        raise RuntimeError(out.getvalue().strip().splitlines()[-1])
+    match = SKIPPED.search(out.getvalue())
+    return int(match.group(1)) if match else 0
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _edited(blocks: List[dict], edits, seed: int) -> List[dict]:
+    blocks = copy.deepcopy(blocks)
+    rng = random.Random(seed)
+    for edit in edits:
+        edit(blocks, rng, 3)
+    return blocks
+
+
+def check_footnote_incremental(failures: List[str]):
+    """
+    A rerun that reuses .footnotes-state.json writes the same bytes as a cold
+    run on the edited input, from a source (as publish_chapter runs it) and
+    in place, after page text or footnote markers change.
+    """
+    for seed in range(3):
+        original = generate(40, seed=seed, chapter_pages=20)
+        for name, edits in EDITS.items():
+            label = f"seed {seed}, {name}"
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = {d: os.path.join(tmp, d, "Ch2_content_list.json") for d in ("warm", "cold", "inplace", "raw")}
+                for path in paths.values():
+                    os.makedirs(os.path.dirname(path))
+
+                # From a source
+                save_content_list(original, paths["raw"])
+                _repair(paths["warm"], paths["raw"])
+                save_content_list(_edited(original, edits, seed), paths["raw"])
+                skipped = _repair(paths["warm"], paths["raw"])
+                _repair(paths["cold"], paths["raw"])
+                if _read(paths["warm"]) != _read(paths["cold"]):
+                    failures.append(f"footnotes from a source ({label}): incremental output differs from cold")
+                if not skipped:
+                    failures.append(f"footnotes from a source ({label}): no page was skipped")
+
+                # In place, editing the repaired file
+                save_content_list(original, paths["inplace"])
+                _repair(paths["inplace"])
+                save_content_list(_edited(load_content_list(paths["inplace"]), edits, seed), paths["inplace"])
+                shutil.copyfile(paths["inplace"], paths["cold"])
+                os.remove(state_path(paths["cold"]))
+                skipped = _repair(paths["inplace"])
+                _repair(paths["cold"])
+                if _read(paths["inplace"]) != _read(paths["cold"]):
+                    failures.append(f"footnotes in place ({label}): incremental output differs from cold")
+                if not skipped:
+                    failures.append(f"footnotes in place ({label}): no page was skipped")
+
+
+def _markdown(blocks: List[dict]) -> str:
+    """Markdown as MinerU renders a content list: one paragraph or heading per text block."""
+    return "\n\n".join(("#" * b["text_level"] + " " if b.get("text_level") else "") + b["text"]
+                        for b in blocks if b.get("text"))
+
+
+def check_publish_markdown(failures: List[str]):
+    """publish_chapter publishes the markdown with the content list's footnote repairs, run after run."""
+    with tempfile.TemporaryDirectory() as tmp:
+        chapter_dir, out_dir = os.path.join(tmp, "Ch2"), os.path.join(tmp, "out")
+        os.makedirs(chapter_dir)
+        blocks = generate(30, seed=1, chapter_pages=15)
+        save_content_list(blocks, os.path.join(chapter_dir, "content_list.json"))
+        with open(os.path.join(chapter_dir, "full.md"), 'w', encoding='utf-8') as f:
+            f.write(_markdown(blocks))
+        for run in ("first", "second"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                publish_chapter(chapter_dir, out_dir=out_dir)
+            with open(os.path.join(out_dir, "Ch2.md"), 'r', encoding='utf-8') as f:
+                md = f.read()
+            published = load_content_list(os.path.join(out_dir, "Ch2_content_list.json"))
+            if md != _markdown(published) or md == _markdown(blocks):
+                failures.append(f"publish ({run} run): Ch2.md does not carry the content list's footnote repairs")
+        if load_content_list(os.path.join(chapter_dir, "content_list.json")) != blocks:
+            failures.append("publish: MinerU's content list was modified")
+
+
+# ============================================================================
+# POSTGRES LOAD
+# ============================================================================
+
+POSTGRES_DSN_ENV = "VERIFY_POSTGRES_DSN"
+
+
+def _load(tree_path: str, full: bool = False) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return load_postgres.load(_load.dsn, full=full, schema=True, tree_path=tree_path)
+
+
+def _counts(report: dict, key: str) -> dict:
+    return {table: r[key] for table, r in report.items() if r[key]}
+
+
+def check_postgres_load(failures: List[str]):
+    """
+    load_postgres.py against a scratch database: a first load inserts every
+    row, a rerun sends nothing, --full rewrites nothing, and a stray or stale
+    row is deleted or updated.
+    """
+    dsn = os.environ.get(POSTGRES_DSN_ENV)
+    if not dsn:
+        print(f"   Postgres load: skipped (set {POSTGRES_DSN_ENV} to run it)")
+        return
+    try:
+        import psycopg
+        from psycopg.conninfo import make_conninfo
+    except ImportError:
+        failures.append(f"postgres: {POSTGRES_DSN_ENV} is set but psycopg is not installed")
+        return
+
+    name = f"verify_load_{os.getpid()}"
+    admin = psycopg.connect(dsn, autocommit=True)
+    admin.execute(f"CREATE DATABASE {name}")
+    _load.dsn = make_conninfo(dsn, dbname=name)
+    data_dir, parsed_dir = build_search_index.PUBLIC_DATA_DIR, build_search_index.PARSED_CHAPTERS_DIR
+    state = load_postgres.STATE_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            build_search_index.PUBLIC_DATA_DIR = tmp
+            build_search_index.PARSED_CHAPTERS_DIR = os.path.join(tmp, "parsed-chapters")
+            load_postgres.STATE_PATH = os.path.join(tmp, "state.json")
+            tree_path, content_list = os.path.join(tmp, "section-tree.json"), os.path.join(tmp, "Ch2_content_list.json")
+            blocks = generate(98, seed=0)
+            save_content_list(blocks, content_list)
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_section_tree(tree_path)
+
+            report = _load(tree_path)
+            if not report["textbook_pages"]["rows"] or not report["page_footnotes"]["rows"]:
+                failures.append("postgres: the synthetic Ch2 built no pages or footnotes")
+            if _counts(report, "inserted") != _counts(report, "rows"):
+                failures.append(f"postgres first load inserted {_counts(report, 'inserted')}")
+            if _counts(_load(tree_path), "sent"):
+                failures.append("postgres rerun sent rows that did not change")
+            report = _load(tree_path, full=True)
+            if _counts(report, "inserted") or _counts(report, "updated") or _counts(report, "deleted"):
+                failures.append("postgres --full rewrote unchanged rows")
+
+            with psycopg.connect(_load.dsn) as conn:
+                conn.execute("INSERT INTO textbook_pages (id, page_number, chapter_id, section_id, section_title, "
+                             "content) VALUES ('ch-2-stray', 1, 'ch-2', 'x', 'x', 'x')")
+                conn.execute("UPDATE textbook_pages SET content = 'stale' "
+                             "WHERE id = (SELECT min(id) FROM textbook_pages WHERE chapter_id = 'ch-2')")
+            report = _load(tree_path, full=True)
+            if _counts(report, "updated") != {"textbook_pages": 1} or _counts(report, "deleted") != {"textbook_pages": 1}:
+                failures.append(f"postgres --full after a stray and a stale page: updated "
+                                f"{_counts(report, 'updated')}, deleted {_counts(report, 'deleted')}")
+
+            edit_pages(blocks, random.Random(0), 1)
+            save_content_list(blocks, content_list)
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_section_tree(tree_path)
+            report = _load(tree_path)
+            if _counts(report, "updated") != {"textbook_pages": 1} or _counts(report, "inserted"):
+                failures.append(f"postgres rerun after a page edit: sent {_counts(report, 'sent')}, "
+                                f"updated {_counts(report, 'updated')}")
+            with psycopg.connect(_load.dsn) as conn:
+                db_rows = conn.execute("SELECT count(*) FROM textbook_pages").fetchone()[0]
+            if db_rows != report["textbook_pages"]["rows"]:
+                failures.append(f"postgres holds {db_rows} pages, {report['textbook_pages']['rows']} built")
+    finally:
+        build_search_index.PUBLIC_DATA_DIR, build_search_index.PARSED_CHAPTERS_DIR = data_dir, parsed_dir
+        load_postgres.STATE_PATH = state
+        admin.execute(f"DROP DATABASE IF EXISTS {name}")
+        admin.close()
+
+
+def main() -> int:
+    failures: List[str] = []
+    checks = [check_citations, check_block_store_roundtrip, check_write_pages, check_write_pages_bytes, check_page_range_rebuild,
+              check_footnote_incremental, check_publish_markdown, check_postgres_load]
+    for check in checks:
+        check(failures)
+
+    for failure in failures[:10]:
+        print(f"  MISMATCH {failure}")
+    if failures:
+        print(f"❌ {len(failures)} mismatches")
+        return 1
+    print(f"✅ {len(checks)} checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+
+import { cleanExtractedText, splitIntoPages, detectPageBoundaries, textFingerprint } from '../src/services/text-cleaner.ts';
+import * as fs from 'fs';
+import { isDeepStrictEqual } from 'util';
+
+// Cases written by: python scripts/clean_text.py --cases text-cleaner-cases.json [--fuzz 9000]
+const casesPath = process.argv[2] || 'text-cleaner-cases.json';
+
+try {
+    const cases = JSON.parse(fs.readFileSync(casesPath, 'utf-8'));
+    console.log(`Reading cases from ${casesPath}`);
+
+    let checked = 0;
+    let mismatches = 0;
+    const check = (label: string, actual: unknown, expected: unknown) => {
+        checked++;
+        // Round-trip so undefined fields compare like the JSON the Python stage wrote
+        if (isDeepStrictEqual(JSON.parse(JSON.stringify(actual)), expected)) return;
+        mismatches++;
+        if (mismatches <= 5) {
+            console.log(`\n  MISMATCH ${label}`);
+            console.log(`    TypeScript: ${JSON.stringify(actual).slice(0, 200)}`);
+            console.log(`    Python:     ${JSON.stringify(expected).slice(0, 200)}`);
+        }
+    };
+
+    for (const c of cases.clean) {
+        check(`cleanExtractedText page ${c.pageNumber}`, cleanExtractedText(c.input, c.pageNumber), c.expected);
+    }
+    for (const c of cases.fingerprint ?? []) {
+        check('textFingerprint', textFingerprint(c.input), c.expected);
+    }
+    for (const c of cases.split) {
+        check(`splitIntoPages ${c.chapterId}`, splitIntoPages(c.input, c.chapterId, c.sectionId, c.sectionTitle), c.expected);
+    }
+    for (const c of cases.boundaries) {
+        check('detectPageBoundaries', detectPageBoundaries(c.input), c.expected);
+    }
+
+    console.log(`\n=== ${checked} cases, ${mismatches} mismatches ===`);
+    if (mismatches > 0) process.exit(1);
+
+} catch (error) {
+    console.error("Error reading or replaying cases:", error);
+    process.exit(1);
+}
@@ -1,5 +1,6 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { CourseReader } from './reader/CourseReader';
+import { loadRenderedChapter } from '@/services/content-parser';
 
 export interface ChapterPageData {
   pageNumber: number;
@@ -10,12 +11,25 @@ interface ChapterReaderProps {
   pages: ChapterPageData[];
   chapterTitle: string;
   onClose: () => void;
+  /** Show this chapter's build-time rendered markdown (no math left for KaTeX) when it was shipped */
+  chapterNumber?: number;
 }
 
-export const ChapterReader: React.FC<ChapterReaderProps> = ({ pages, chapterTitle, onClose }) => {
+export const ChapterReader: React.FC<ChapterReaderProps> = ({ pages, chapterTitle, onClose, chapterNumber }) => {
   const [currentPageIndex, setCurrentPageIndex] = useState(0);
+  const [renderedMarkdown, setRenderedMarkdown] = useState<string | null>(null);
 
-  if (pages.length === 0) {
+  useEffect(() => {
+    setRenderedMarkdown(null);
+    if (chapterNumber === undefined) return;
+    let cancelled = false;
+    loadRenderedChapter(chapterNumber).then(markdown => {
+      if (!cancelled) setRenderedMarkdown(markdown);
+    });
+    return () => { cancelled = true; };
+  }, [chapterNumber]);
+
+  if (pages.length === 0 && !renderedMarkdown) {
     return (
       <div className="chapter-reader-empty">
         No content available for this chapter.
@@ -25,6 +39,8 @@ export const ChapterReader: React.FC<ChapterReaderProps> = ({ pages, chapterTitl
 
   const currentPage = pages[currentPageIndex];
   const totalPages = pages.length;
+  // The rendered markdown is the whole chapter, so there are no pages to step through
+  const paged = !renderedMarkdown;
 
   const goToPrevPage = () => {
     if (currentPageIndex > 0) {
@@ -54,7 +70,7 @@ export const ChapterReader: React.FC<ChapterReaderProps> = ({ pages, chapterTitl
       </div>
 
       {/* Navigation Bar */}
-      <div className="chapter-reader-nav">
+      {paged && <div className="chapter-reader-nav">
         <button
           onClick={goToPrevPage}
           disabled={currentPageIndex === 0}
@@ -85,26 +101,26 @@ export const ChapterReader: React.FC<ChapterReaderProps> = ({ pages, chapterTitl
         >
           Next →
         </button>
-      </div>
+      </div>}
 
       {/* Page Content - Using CourseReader for Markdown */}
       <div className="chapter-reader-content">
-        <div className="page-number-header">
+        {paged && <div className="page-number-header">
           — Page {currentPage.pageNumber} —
-        </div>
+        </div>}
         <CourseReader
-          markdownContent={currentPage.content}
+          markdownContent={renderedMarkdown ?? currentPage.content}
           size="base"
           className="px-2"
         />
       </div>
 
       {/* Bottom Navigation */}
-      <div className="chapter-reader-footer">
+      {paged && <div className="chapter-reader-footer">
         <span>
           Page {currentPageIndex + 1} of {totalPages} pages in this chapter
         </span>
-      </div>
+      </div>}
 
       <style>{`
         .chapter-reader {
@@ -18,6 +18,9 @@ import rehypeKatex from 'rehype-katex';
 import 'katex/dist/katex.min.css';
 import type { Components } from 'react-markdown';
 
+// An unescaped $ left for remark-math; pre-rendered content (scripts/prerender_math.py) has none
+const UNRENDERED_MATH = /(^|[^\\])\$/;
+
 interface CourseReaderProps {
     /** The markdown content to render */
     markdownContent: string;
@@ -36,6 +39,8 @@ interface CourseReaderProps {
  * - # Title → Massive H1 (text-5xl)
  * - ## Section → Bold H2 (text-2xl)
  * - ### Subsection → Semibold H3 (text-xl)
+ *
+ * Math and KaTeX only run when the content still has TeX in it.
  */
 export function CourseReader({
     markdownContent,
@@ -50,6 +55,8 @@ export function CourseReader({
         xl: 'prose-xl',
     };
 
+    const hasMath = UNRENDERED_MATH.test(markdownContent);
+
     // Custom component renderers
     const components: Components = {
         // H1: Massive title (the REAL title like "AN OVERVIEW OF...")
@@ -193,8 +200,8 @@ export function CourseReader({
             `}
         >
             <ReactMarkdown
-                remarkPlugins={[remarkGfm, remarkMath]}
-                rehypePlugins={[rehypeRaw, rehypeKatex]}
+                remarkPlugins={hasMath ? [remarkGfm, remarkMath] : [remarkGfm]}
+                rehypePlugins={hasMath ? [rehypeRaw, rehypeKatex] : [rehypeRaw]}
                 components={components}
             >
                 {markdownContent}
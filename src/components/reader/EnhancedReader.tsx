@@ -14,7 +14,14 @@ import { MinerUBlockRenderer, MinerUBlock } from './MinerUBlockRenderer';
 import { CheckPromptCard } from './CheckPromptCard';
 import { SectionOutline } from './SectionOutline';
 import { ContentBlock, FormattedContent, CheckPrompt, Reference } from '@/types/reader';
-import { formatSectionContent, getCheckPromptsForSection } from '@/services/content-parser';
+import {
+    CleanedChapter,
+    formatSectionContent,
+    getCheckPromptsForSection,
+    getPrebuiltSection,
+    loadCleanedChapter,
+    resolveImageBlocks
+} from '@/services/content-parser';
 import { Chunk, Section, db } from '@/lib/db';
 import {
     ChevronLeft,
@@ -59,7 +66,31 @@ export const EnhancedReader = ({
         db.bookmarks.where({ userId, sectionId: section.id }).first()
         , [userId, section.id]);
 
-    // Parse content into blocks - try JSON first, fall back to text parsing
+    // Blocks parsed at build time, when this section was shipped with them
+    const [prebuiltContent, setPrebuiltContent] = useState<Awaited<ReturnType<typeof getPrebuiltSection>>>(null);
+    useEffect(() => {
+        let cancelled = false;
+        setPrebuiltContent(null);
+        getPrebuiltSection(chapterNumber, section.id).then(content => {
+            if (!cancelled) setPrebuiltContent(content);
+        });
+        return () => { cancelled = true; };
+    }, [chapterNumber, section.id]);
+
+    // Pages cleaned at build time, for chunks that hold text rather than MinerU JSON
+    const hasTextChunks = chunks.some(chunk => !chunk.content.trimStart().startsWith('['));
+    const [cleanedChapter, setCleanedChapter] = useState<CleanedChapter | null>(null);
+    useEffect(() => {
+        let cancelled = false;
+        setCleanedChapter(null);
+        if (!hasTextChunks) return;
+        loadCleanedChapter(chapterNumber).then(chapter => {
+            if (!cancelled) setCleanedChapter(chapter);
+        });
+        return () => { cancelled = true; };
+    }, [chapterNumber, hasTextChunks]);
+
+    // Parse content into blocks - try JSON first, then prebuilt blocks, then text parsing
     const { mineruBlocks, formattedContent, isJsonContent } = useMemo(() => {
         // Try to parse first chunk as JSON (raw MinerU blocks)
         let allMineruBlocks: MinerUBlock[] = [];
@@ -78,20 +109,34 @@ export const EnhancedReader = ({
         }
 
         // Always compute formatted content for legacy support
-        const formatted = formatSectionContent(
-            chunks,
-            section.id,
-            section.chapterId,
-            section.title,
-            sectionLetter
-        );
+        const formatted = !hasJsonContent && prebuiltContent
+            ? prebuiltContent
+            : formatSectionContent(
+                chunks,
+                section.id,
+                section.chapterId,
+                section.title,
+                sectionLetter,
+                cleanedChapter
+            );
 
         return {
             mineruBlocks: allMineruBlocks,
             formattedContent: formatted,
             isJsonContent: hasJsonContent
         };
-    }, [chunks, section, sectionLetter]);
+    }, [chunks, section, sectionLetter, prebuiltContent, cleanedChapter]);
+
+    // Figures parsed from the text carry MinerU paths until resolved against the image manifest
+    const [resolvedBlocks, setResolvedBlocks] = useState<ContentBlock[] | null>(null);
+    useEffect(() => {
+        let cancelled = false;
+        setResolvedBlocks(null);
+        resolveImageBlocks(formattedContent.blocks).then(blocks => {
+            if (!cancelled) setResolvedBlocks(blocks);
+        });
+        return () => { cancelled = true; };
+    }, [formattedContent]);
 
     // Get check prompts for this section
     const checkPrompts = useMemo(() => {
@@ -212,7 +257,7 @@ export const EnhancedReader = ({
             });
         } else {
             // Fallback: use old ReaderBlock for non-JSON content
-            formattedContent.blocks.forEach((block, i) => {
+            (resolvedBlocks ?? formattedContent.blocks).forEach((block, i) => {
                 elements.push(<ReaderBlock key={`block-${i}`} block={block} />);
 
                 if (block.type === 'paragraph' && checkPrompts[promptIndex]?.afterParagraph === i) {
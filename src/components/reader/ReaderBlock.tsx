@@ -7,6 +7,9 @@
 import { ContentBlock } from '@/types/reader';
 import { Scale, AlertTriangle, BookOpen, FileText } from 'lucide-react';
 
+// Figures fill the reading column, which tops out around 768px
+const FIGURE_SIZES = '(max-width: 768px) 100vw, 768px';
+
 interface ReaderBlockProps {
     block: ContentBlock;
     onClick?: (block: ContentBlock) => void;
@@ -198,12 +201,20 @@ export const ReaderBlock = ({ block, onClick }: ReaderBlockProps) => {
         case 'image':
             return (
                 <figure className="my-6 flex flex-col items-center">
-                    <img
-                        src={block.src}
-                        alt={block.alt || block.caption || 'Figure'}
-                        className="max-w-full h-auto rounded-lg shadow-sm"
-                        loading="lazy"
-                    />
+                    <picture>
+                        {block.sources?.map(source => (
+                            <source key={source.type} type={source.type} srcSet={source.srcSet} sizes={FIGURE_SIZES} />
+                        ))}
+                        <img
+                            src={block.src}
+                            alt={block.alt || block.caption || 'Figure'}
+                            width={block.width}
+                            height={block.height}
+                            className="max-w-full h-auto rounded-lg shadow-sm"
+                            loading="lazy"
+                            decoding="async"
+                        />
+                    </picture>
                     {block.caption && (
                         <figcaption className="mt-2 text-sm text-muted-foreground italic text-center">
                             {block.caption}
@@ -0,0 +1,55 @@
+/**
+ * Data Manifest
+ *
+ * scripts/bundle_data.py copies every file under public/data to a
+ * content-hashed name in /data/hashed/ (served as immutable) and lists
+ * them in /data/data-manifest.json. Resolving a logical name through the
+ * manifest lets the browser cache unchanged chapters across deploys.
+ * gzip, br and zstd are the file's compressed sizes, for reporting: the
+ * CDN compresses responses itself.
+ */
+
+export interface DataManifestEntry {
+    path: string;
+    hash: string;
+    bytes: number;
+    gzip: number;
+    br?: number;
+    zstd?: number;
+}
+
+export interface DataManifest {
+    version: number;
+    files: Record<string, DataManifestEntry>;
+}
+
+const DATA_MANIFEST_PATH = '/data/data-manifest.json';
+
+let manifest: Promise<DataManifest | null> | null = null;
+
+/**
+ * The data manifest (fetched once per session), or null when the build did not bundle
+ */
+export function loadDataManifest(): Promise<DataManifest | null> {
+    if (!manifest) {
+        manifest = fetch(DATA_MANIFEST_PATH, { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() as Promise<DataManifest> : null)
+            .catch(() => null);
+    }
+    return manifest;
+}
+
+/**
+ * URL for a file under public/data, e.g. 'blocks/Ch2.json': its hashed copy, else the plain path
+ */
+export async function resolveDataUrl(name: string): Promise<string> {
+    const entry = (await loadDataManifest())?.files[name];
+    return entry ? entry.path : `/data/${name}`;
+}
+
+/**
+ * fetch() a file under public/data by its logical name
+ */
+export async function fetchData(name: string): Promise<Response> {
+    return fetch(await resolveDataUrl(name));
+}
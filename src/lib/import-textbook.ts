@@ -11,7 +11,8 @@
  *   - images/ (extracted images)
  */
 
-import { db, TextbookPage, PageFootnote, Section, Subsection } from './db';
+import { db, TextbookPage, PageFootnote, Chapter, Part, Section, Subsection, SubSubsection } from './db';
+import { fetchData } from './data-manifest';
 import { v4 as uuidv4 } from 'uuid';
 import { loadMinerUChapter, chapterBlocksToMarkdown, ParsedChapter, MinerUBlock } from './mineru-loader';
 import { initializeFromSupabase, syncSupabaseToLocal, ensureTextbookForUser } from './supabase-loader';
@@ -99,11 +100,118 @@ export async function clearImportedTextbook(): Promise<void> {
     await db.chapters.clear();
     await db.sections.clear();
     await db.subsections.clear();
+    await db.subsubsections.clear();
     localStorage.removeItem('textbookImported');
     localStorage.removeItem('mineruImportVersion');
     console.log('[MinerU Import] All data cleared');
 }
 
+// ============================================================================
+// RECORD DELTAS - Patch an imported textbook instead of re-importing it
+// ============================================================================
+
+interface RecordsManifest {
+    schema: number;
+    version: number;
+    deltas: { from: number; to: number; path: string; put: number; delete: number }[];
+}
+
+interface RecordsDelta {
+    from: number;
+    to: number;
+    put: Record<string, { id: string }[]>;
+    delete: Record<string, string[]>;
+}
+
+const RECORDS_MANIFEST_PATH = 'records/manifest.json';
+const RECORDS_VERSION_KEY = 'mineruImportVersion';
+// An import that parsed some chapter on the device matches no records build, so it is never
+// patched: it is stored as parsed@<version> and re-imported once the records change
+const DEVICE_PARSED_PREFIX = 'parsed@';
+const RECORDS_SCHEMA = 1;
+// Tables a delta may touch (Dexie table names)
+const DELTA_TABLES = ['parts', 'chapters', 'sections', 'subsections', 'subsubsections', 'textbookPages', 'pageFootnotes'];
+
+async function loadRecordsManifest(): Promise<RecordsManifest | null> {
+    try {
+        const response = await fetchData(RECORDS_MANIFEST_PATH);
+        if (!response.ok) return null;
+        const manifest = await response.json() as RecordsManifest;
+        return manifest.schema === RECORDS_SCHEMA ? manifest : null;
+    } catch {
+        return null;
+    }
+}
+
+/**
+ * Remember which records build the local import matches, or that it matches none
+ */
+async function recordImportedVersion(matchesRecords: boolean): Promise<void> {
+    const manifest = await loadRecordsManifest();
+    if (manifest) {
+        const version = String(manifest.version);
+        localStorage.setItem(RECORDS_VERSION_KEY, matchesRecords ? version : DEVICE_PARSED_PREFIX + version);
+    }
+}
+
+/**
+ * Bring an imported textbook up to the current build by applying record deltas.
+ * 'reimport' means the local data is too old to patch and has been cleared.
+ */
+export async function updateImportedTextbook(): Promise<'current' | 'patched' | 'reimport'> {
+    const manifest = await loadRecordsManifest();
+    const stored = localStorage.getItem(RECORDS_VERSION_KEY) || '';
+    if (manifest && stored.startsWith(DEVICE_PARSED_PREFIX)) {
+        if (stored === DEVICE_PARSED_PREFIX + manifest.version) return 'current';
+        console.log(`[MinerU Import] Sections were parsed on the device, re-importing for v${manifest.version}`);
+        await clearImportedTextbook();
+        return 'reimport';
+    }
+    const local = Number(stored);
+    // Unversioned imports (Supabase, older builds) are left as they are
+    if (!manifest || !local || local === manifest.version) return 'current';
+    // Ahead of the server (a rolled-back deploy, or the records built again from v0): no delta leads back
+    if (local > manifest.version) {
+        console.log(`[MinerU Import] Local v${local} is ahead of v${manifest.version}, re-importing`);
+        await clearImportedTextbook();
+        return 'reimport';
+    }
+
+    const chain: RecordsManifest['deltas'] = [];
+    let version = local;
+    while (version < manifest.version) {
+        const next = manifest.deltas.find(d => d.from === version);
+        if (!next) {
+            console.log(`[MinerU Import] No delta from v${version}, re-importing`);
+            await clearImportedTextbook();
+            return 'reimport';
+        }
+        chain.push(next);
+        version = next.to;
+    }
+
+    for (const step of chain) {
+        const response = await fetchData(step.path);
+        if (!response.ok) {
+            await clearImportedTextbook();
+            return 'reimport';
+        }
+        const delta = await response.json() as RecordsDelta;
+        const tables = DELTA_TABLES.map(name => db.table(name));
+        await db.transaction('rw', tables, async () => {
+            for (const [table, ids] of Object.entries(delta.delete)) {
+                if (DELTA_TABLES.includes(table)) await db.table(table).bulkDelete(ids);
+            }
+            for (const [table, records] of Object.entries(delta.put)) {
+                if (DELTA_TABLES.includes(table)) await db.table(table).bulkPut(records);
+            }
+        });
+        localStorage.setItem(RECORDS_VERSION_KEY, String(delta.to));
+        console.log(`[MinerU Import] Applied delta v${delta.from} → v${delta.to}: ${step.put} put, ${step.delete} deleted`);
+    }
+    return 'patched';
+}
+
 // ============================================================================
 // SECTION PARSING - Extract sections from MinerU text_level=1 blocks
 // ============================================================================
@@ -202,6 +310,45 @@ function findSectionForPage(pageIdx: number, sections: ParsedSection[]): ParsedS
     return sections[0] || null; // Default to first section if not found
 }
 
+// ============================================================================
+// PRECOMPUTED SECTION TREE - built by scripts/build_section_tree.py
+// ============================================================================
+
+/**
+ * Ready-to-insert records for the whole hierarchy. pages[chapterId][pageOffset]
+ * is [sectionId, startsNewSection]; blockCounts guards against a tree built
+ * from a different content list than the one just loaded.
+ */
+interface SectionTree {
+    version: number;
+    parts: Part[];
+    chapters: Chapter[];
+    sections: Section[];
+    subsections: Subsection[];
+    subSubsections: SubSubsection[];
+    pages: Record<string, [string, boolean][]>;
+    blockCounts: Record<string, number>;
+    // Chapter id -> URL of the content list the tree (and the record deltas) were built from
+    sources?: Record<string, string>;
+}
+
+const SECTION_TREE_PATH = 'section-tree.json';
+
+/**
+ * Load the precomputed section tree, or null to parse sections on the device
+ */
+async function loadSectionTree(): Promise<SectionTree | null> {
+    try {
+        const response = await fetchData(SECTION_TREE_PATH);
+        if (!response.ok) return null;
+        const tree = await response.json() as SectionTree;
+        console.log(`[MinerU Import] Section tree: ${tree.sections.length} sections, ${tree.subsections.length} subsections`);
+        return tree;
+    } catch {
+        return null;
+    }
+}
+
 // ============================================================================
 // MAIN IMPORT FUNCTION
 // ============================================================================
@@ -211,8 +358,11 @@ function findSectionForPage(pageIdx: number, sections: ParsedSection[]): ParsedS
  */
 export async function importTextbookFromJSON(): Promise<ImportResult> {
     try {
-        // Check if data already exists
-        const existingPages = await db.textbookPages.count();
+        // Check if data already exists, and patch it up to the current build
+        let existingPages = await db.textbookPages.count();
+        if (existingPages > 0 && await updateImportedTextbook() === 'reimport') {
+            existingPages = 0;
+        }
 
         if (existingPages > 0) {
             console.log('[Import] Data already exists, skipping import');
@@ -274,6 +424,13 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
         let totalFootnotes = 0;
         let chaptersLoaded = 0;
 
+        const sectionTree = await loadSectionTree();
+        if (sectionTree) {
+            await db.parts.bulkPut(sectionTree.parts);
+        }
+        // Record deltas can patch this import only if every chapter came from the tree
+        let matchesRecords = !!sectionTree;
+
         // Process each chapter
         for (const chapterDef of CHAPTER_DEFINITIONS) {
             // SKIP Chapter 1 as requested
@@ -285,28 +442,49 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
             // Skip if no JSON path defined (shouldn't happen for 2-15)
             if (!chapterDef.jsonPath) {
                 console.warn(`[MinerU Import] No JSON path for Ch${chapterDef.number}`);
+                matchesRecords = false;
                 continue;
             }
 
             const chapterId = `ch-${chapterDef.number}`;
+            // The content list the section tree was built from, when it has one
+            const contentPath = sectionTree?.sources?.[chapterId] || chapterDef.jsonPath;
 
             // Load MinerU content from specific path
             const mineruChapter = await loadMinerUChapter(
                 chapterDef.number,
                 undefined,
-                chapterDef.jsonPath
+                contentPath
             );
 
             if (mineruChapter && mineruChapter.rawBlocks && mineruChapter.rawBlocks.length > 0) {
                 // Success! Use MinerU structured content
-                console.log(`[MinerU Import] Ch${chapterDef.number}: Loaded ${mineruChapter.rawBlocks.length} blocks from ${chapterDef.jsonPath}`);
+                console.log(`[MinerU Import] Ch${chapterDef.number}: Loaded ${mineruChapter.rawBlocks.length} blocks from ${contentPath}`);
+
+                // Use the precomputed tree when it was built from this same content list
+                const treePages = sectionTree?.pages[chapterId];
+                const useTree = !!treePages && treePages.length > 0
+                    && sectionTree!.sources?.[chapterId] === contentPath
+                    && sectionTree!.blockCounts[chapterId] === mineruChapter.rawBlocks.length;
+                if (!useTree) matchesRecords = false;
 
                 // Parse sections from raw MinerU blocks
-                const parsedSections = parseChapterSections(mineruChapter.rawBlocks, chapterDef.startPage);
+                const parsedSections = useTree ? [] : parseChapterSections(mineruChapter.rawBlocks, chapterDef.startPage);
 
                 // Create Section records in database
-                const sectionRecords: Section[] = [];
+                const sectionRecords: Section[] = useTree
+                    ? sectionTree!.sections.filter(s => s.chapterId === chapterId)
+                    : [];
                 const subsectionRecords: Subsection[] = [];
+                let subSubsectionRecords: SubSubsection[] = [];
+
+                if (useTree) {
+                    const sectionIds = new Set(sectionRecords.map(s => s.id));
+                    subsectionRecords.push(...sectionTree!.subsections.filter(s => sectionIds.has(s.sectionId)));
+                    const subsectionIds = new Set(subsectionRecords.map(s => s.id));
+                    subSubsectionRecords = sectionTree!.subSubsections.filter(s => subsectionIds.has(s.subsectionId));
+                }
+                const sectionTitles = new Map(sectionRecords.map(s => [s.id, s.title]));
 
                 for (const ps of parsedSections) {
                     const sectionId = `${chapterId}-${ps.letter}`;
@@ -354,6 +532,9 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
                 if (subsectionRecords.length > 0) {
                     await db.subsections.bulkPut(subsectionRecords);
                 }
+                if (subSubsectionRecords.length > 0) {
+                    await db.subsubsections.bulkPut(subSubsectionRecords);
+                }
 
                 // -----------------------------------------------------------
                 // EXTRACT FOOTNOTES
@@ -404,17 +585,27 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
 
                 for (let pageOffset = 0; pageOffset < pagesInChapter; pageOffset++) {
                     const bookPageNum = chapterDef.startPage + pageOffset;
-                    const pageId = uuidv4();
-
-                    // Find which section this page belongs to
-                    const matchingSection = findSectionForPage(pageOffset, parsedSections);
-                    const sectionId = matchingSection
-                        ? `${chapterId}-${matchingSection.letter}`
-                        : `${chapterId}-A`;
-                    const sectionTitle = matchingSection?.title || chapterDef.title;
-
-                    // Check if this page starts a new section
-                    const startsSection = parsedSections.some(s => s.startPageIdx === pageOffset);
+                    // Deterministic, so record deltas (scripts/build_record_deltas.py) can address the page
+                    const pageId = `${chapterId}-p${bookPageNum}`;
+
+                    let sectionId: string;
+                    let sectionTitle: string;
+                    let startsSection: boolean;
+
+                    if (useTree) {
+                        [sectionId, startsSection] = treePages![pageOffset] || treePages![treePages!.length - 1];
+                        sectionTitle = sectionTitles.get(sectionId) || chapterDef.title;
+                    } else {
+                        // Find which section this page belongs to
+                        const matchingSection = findSectionForPage(pageOffset, parsedSections);
+                        sectionId = matchingSection
+                            ? `${chapterId}-${matchingSection.letter}`
+                            : `${chapterId}-A`;
+                        sectionTitle = matchingSection?.title || chapterDef.title;
+
+                        // Check if this page starts a new section
+                        startsSection = parsedSections.some(s => s.startPageIdx === pageOffset);
+                    }
 
                     // Get RAW MinerU blocks for this page
                     const rawPageBlocks = mineruChapter.rawBlocksByPage.get(pageOffset) || [];
@@ -436,14 +627,14 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
 
                     // Link footnotes for this page
                     const footnotesForThisPage = pageFootnotes.filter((f: any) => f._pageIdx === pageOffset);
-                    for (const fn of footnotesForThisPage) {
+                    footnotesForThisPage.forEach((fn, index) => {
                         chapterFootnotesToInsert.push({
-                            id: fn.id,
-                            pageId: pageId, // Link to actual page UUID
+                            id: `${pageId}-fn${index}`,
+                            pageId: pageId, // Link to the page record
                             footnoteNumber: fn.footnoteNumber,
                             text: fn.text
                         });
-                    }
+                    });
                 }
 
                 // Bulk insert pages and footnotes
@@ -457,11 +648,13 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
                 chaptersLoaded++;
 
             } else {
-                console.warn(`[MinerU Import] Ch${chapterDef.number}: No content found at ${chapterDef.jsonPath}`);
+                console.warn(`[MinerU Import] Ch${chapterDef.number}: No content found at ${contentPath}`);
+                matchesRecords = false;
             }
 
             // Create chapter entry
-            await db.chapters.put({
+            const treeChapter = sectionTree?.chapters.find(c => c.id === chapterId);
+            await db.chapters.put(treeChapter || {
                 id: chapterId,
                 textbookId: 'corporate-tax',
                 partId: chapterDef.number <= 1 ? 'part-1' : 'part-2',
@@ -476,6 +669,7 @@ export async function importTextbookFromJSON(): Promise<ImportResult> {
         // Mark import as complete
         localStorage.setItem('mineruImportComplete', 'true');
         localStorage.setItem('textbookImported', 'true');
+        await recordImportedVersion(matchesRecords);
 
         console.log(`[MinerU Import] Complete! ${totalPages} pages, ${totalSections} sections, ${totalFootnotes} footnotes from ${chaptersLoaded}/15 chapters`);
 
@@ -531,3 +725,42 @@ export async function getFootnotesForPages(pageIds: string[]): Promise<PageFootn
     }
     return footnotes;
 }
+
+interface FootnoteTable {
+    chapter: number;
+    first_page: number;
+    pages: Record<string, { number: number; text: string; page: number; block: number }[]>;
+}
+
+const footnoteTables = new Map<number, Promise<FootnoteTable | null>>();
+
+/**
+ * A chapter's page-keyed footnote table from scripts/build_footnote_index.py (fetched once per session)
+ */
+function loadFootnoteTable(chapterNumber: number): Promise<FootnoteTable | null> {
+    let pending = footnoteTables.get(chapterNumber);
+    if (!pending) {
+        pending = fetchData(`footnotes/Ch${chapterNumber}.json`)
+            .then(response => response.ok ? response.json() as Promise<FootnoteTable> : null)
+            .catch(() => null);
+        footnoteTables.set(chapterNumber, pending);
+    }
+    return pending;
+}
+
+/**
+ * Footnotes for a chapter's pages, read from its footnote table by book page. Falls back to
+ * getFootnotesForPages() when the chapter has no table or it was built on another page basis
+ */
+export async function getChapterFootnotes(chapter: Chapter, pages: TextbookPage[]): Promise<PageFootnote[]> {
+    const table = await loadFootnoteTable(chapter.number);
+    if (!table || table.first_page !== chapter.startPage) {
+        return getFootnotesForPages(pages.map(p => p.id));
+    }
+    return pages.flatMap(page => (table.pages[page.pageNumber] ?? []).map((fn, index) => ({
+        id: `${page.id}-fn${index}`,
+        pageId: page.id,
+        footnoteNumber: fn.number,
+        text: fn.text
+    })));
+}
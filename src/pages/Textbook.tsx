@@ -6,7 +6,7 @@ import { Check, BookOpen, Scale, ScrollText, BookOpenCheck, ChevronDown, FileTex
 import { useState, useEffect, useRef } from "react";
 import { db, Textbook as ITextbook, Chapter as IChapter, Part as IPart, Section as ISection, ContentMarker } from "@/lib/db";
 import type { TextbookPage, PageFootnote } from "@/lib/db";
-import { getPagesByRange, getFootnotesForPages } from "@/lib/import-textbook";
+import { getPagesByRange, getChapterFootnotes } from "@/lib/import-textbook";
 import { v4 as uuidv4 } from 'uuid';
 import { useLiveQuery } from "dexie-react-hooks";
 import { useOutletContext } from "react-router-dom";
@@ -202,7 +202,7 @@ const TextbookPage = () => {
 
             if (pages.length > 0) {
                 setSectionPages(pages);
-                const footnotes = await getFootnotesForPages(pages.map(p => p.id));
+                const footnotes = await getChapterFootnotes(chapter, pages);
                 const footnotesMap = new Map<string, PageFootnote[]>();
                 for (const fn of footnotes) {
                     if (!footnotesMap.has(fn.pageId)) {
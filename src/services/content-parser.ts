@@ -7,12 +7,14 @@
 import {
     ContentBlock,
     FormattedContent,
+    ImageBlock,
     Reference,
     CheckPrompt,
     TableBlock
 } from '@/types/reader';
-import { Chunk, Section } from '@/lib/db';
-import { cleanExtractedText, CleanedPage, Footnote } from './text-cleaner';
+import { fetchData } from '@/lib/data-manifest';
+import { Chunk, ContentMarker, Section } from '@/lib/db';
+import { cleanExtractedText, CleanedPage, Footnote, textFingerprint } from './text-cleaner';
 
 // ============================================================================
 // SLUGIFY
@@ -126,8 +128,19 @@ export function parseStructuralElements(text: string, sectionLetter?: string): C
         // MARKDOWN & STRUCTURE DETECTION
         // --------------------------------------------------------
 
+        // MinerU figure: "![](images/<hash>.jpg)", any text after it is the caption.
+        // The src is resolved against the image manifest by resolveImageBlocks()
+        const image = trimmed.match(/^!\[([^\]]*)\]\(([^)\s]+)\)\s*([\s\S]*)$/);
+        if (image) {
+            blocks.push({
+                type: 'image',
+                src: image[2],
+                alt: image[1] || undefined,
+                caption: image[3].trim() || undefined
+            });
+        }
         // Markdown Header 1: "# Title"
-        if (/^#\s+(.+)/.test(trimmed)) {
+        else if (/^#\s+(.+)/.test(trimmed)) {
             const content = trimmed.replace(/^#\s+/, '').trim();
             blocks.push({
                 type: 'heading',
@@ -322,6 +335,46 @@ export function extractReferences(text: string): Reference[] {
     return refs;
 }
 
+// ============================================================================
+// CLEANED PAGES - built by scripts/clean_text.py
+// ============================================================================
+
+export interface CleanedChapter {
+    chapter: number;
+    source: 'boundaries' | 'pages';
+    pages: CleanedPage[];
+    /** Book page -> textFingerprint() of the raw text the page was cleaned from */
+    inputs?: Record<string, string>;
+}
+
+const cleanedChapters = new Map<number, Promise<CleanedChapter | null>>();
+
+/**
+ * Load a chapter's build-time cleaned pages (fetched once per session), or null if not shipped
+ */
+export function loadCleanedChapter(chapterNumber: number): Promise<CleanedChapter | null> {
+    let pending = cleanedChapters.get(chapterNumber);
+    if (!pending) {
+        pending = fetchData(`cleaned/Ch${chapterNumber}.json`)
+            .then(response => response.ok ? response.json() as Promise<CleanedChapter> : null)
+            .catch(() => null);
+        cleanedChapters.set(chapterNumber, pending);
+    }
+    return pending;
+}
+
+/**
+ * cleanExtractedText(text, pageNumber), read from the cleaned chapter when it was built from the same text
+ */
+function cleanPage(text: string, pageNumber: number, cleanedChapter?: CleanedChapter | null): CleanedPage {
+    const fingerprint = cleanedChapter?.inputs?.[pageNumber];
+    if (fingerprint && fingerprint === textFingerprint(text)) {
+        const page = cleanedChapter!.pages.find(p => p.pageNumber === pageNumber);
+        if (page) return page;
+    }
+    return cleanExtractedText(text, pageNumber);
+}
+
 // ============================================================================
 // MAIN PARSING FUNCTION
 // ============================================================================
@@ -335,7 +388,8 @@ export function formatSectionContent(
     sectionId: string,
     chapterId: string,
     sectionTitle: string,
-    sectionLetter?: string
+    sectionLetter?: string,
+    cleanedChapter?: CleanedChapter | null
 ): FormattedContent & { footnotes: Footnote[] } {
     let blocks: ContentBlock[] = [];
     const allFootnotes: Footnote[] = [];
@@ -366,8 +420,8 @@ export function formatSectionContent(
             // Not JSON - fall through to text parsing
         }
 
-        // Legacy: Parse as text
-        const cleaned = cleanExtractedText(chunk.content, chunk.pageNumbers[0] || 0);
+        // Legacy: Parse as text, cleaned at build time when the page was shipped
+        const cleaned = cleanPage(chunk.content, chunk.pageNumbers[0] || 0, cleanedChapter);
         blocks = blocks.concat(parseStructuralElements(cleaned.mainText, sectionLetter));
         allFootnotes.push(...cleaned.footnotes);
     }
@@ -393,6 +447,115 @@ export function formatSectionContent(
     };
 }
 
+// ============================================================================
+// PREBUILT SECTIONS - built by scripts/build_content_blocks.py
+// ============================================================================
+
+export interface PrebuiltChapter {
+    chapter: number;
+    sections: (FormattedContent & { letter: string })[];
+    markers: ContentMarker[];
+}
+
+const prebuiltChapters = new Map<number, Promise<PrebuiltChapter | null>>();
+
+/**
+ * Load a chapter's prebuilt ContentBlocks (fetched once per session), or null if not shipped
+ */
+export function loadPrebuiltChapter(chapterNumber: number): Promise<PrebuiltChapter | null> {
+    let pending = prebuiltChapters.get(chapterNumber);
+    if (!pending) {
+        pending = fetchData(`blocks/Ch${chapterNumber}.json`)
+            .then(response => response.ok ? response.json() as Promise<PrebuiltChapter> : null)
+            .catch(() => null);
+        prebuiltChapters.set(chapterNumber, pending);
+    }
+    return pending;
+}
+
+/**
+ * A section's FormattedContent as formatSectionContent() would build it, without parsing
+ */
+export async function getPrebuiltSection(
+    chapterNumber: number,
+    sectionId: string
+): Promise<(FormattedContent & { footnotes: Footnote[] }) | null> {
+    const chapter = await loadPrebuiltChapter(chapterNumber);
+    const section = chapter?.sections.find(s => s.sectionId === sectionId);
+    return section ? { ...section, blocks: await resolveImageBlocks(section.blocks), footnotes: [] } : null;
+}
+
+const renderedChapters = new Map<number, Promise<string | null>>();
+
+/**
+ * A chapter's markdown with its math typeset at build time by scripts/prerender_math.py
+ * (fetched once per session), or null if not shipped
+ */
+export function loadRenderedChapter(chapterNumber: number): Promise<string | null> {
+    let pending = renderedChapters.get(chapterNumber);
+    if (!pending) {
+        pending = fetchData(`rendered/Ch${chapterNumber}.json`)
+            .then(response => response.ok ? response.json() as Promise<{ md_content: string }> : null)
+            .then(chapter => chapter?.md_content ?? null)
+            .catch(() => null);
+        renderedChapters.set(chapterNumber, pending);
+    }
+    return pending;
+}
+
+export interface OptimizedImage {
+    chapter: number | null;
+    width: number;
+    height: number;
+    src: string;
+    sources: { type: string; srcSet: string }[];
+}
+
+let imageManifest: Promise<Record<string, OptimizedImage>> | null = null;
+
+/**
+ * The figure manifest from scripts/optimize_images.py (fetched once per session)
+ */
+export function loadImageManifest(): Promise<Record<string, OptimizedImage>> {
+    if (!imageManifest) {
+        imageManifest = fetchData('images/manifest.json')
+            .then(response => response.ok ? response.json() : { images: {} })
+            .then(manifest => manifest.images ?? {})
+            .catch(() => ({}));
+    }
+    return imageManifest;
+}
+
+/**
+ * An ImageBlock for a MinerU image path (images/<hash>.jpg), with srcset and intrinsic size when optimized
+ */
+export async function getImageBlock(imagePath: string, caption?: string, alt?: string): Promise<ImageBlock> {
+    const stem = imagePath.split('/').pop()?.replace(/\.[^.]+$/, '') ?? imagePath;
+    const image = (await loadImageManifest())[stem];
+    if (!image) {
+        return { type: 'image', src: imagePath, alt, caption };
+    }
+    return {
+        type: 'image',
+        src: image.src,
+        width: image.width || undefined,
+        height: image.height || undefined,
+        sources: image.sources,
+        alt,
+        caption,
+    };
+}
+
+/**
+ * Replace the MinerU-path image blocks parseStructuralElements() makes with their optimized figures
+ */
+export async function resolveImageBlocks(blocks: ContentBlock[]): Promise<ContentBlock[]> {
+    if (!blocks.some(b => b.type === 'image')) return blocks;
+    return Promise.all(blocks.map(block => block.type === 'image'
+        ? getImageBlock(block.src, block.caption, block.alt)
+        : block));
+}
+
 // ============================================================================
 // DEMO CHECK PROMPTS
 // ============================================================================
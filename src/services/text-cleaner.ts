@@ -50,6 +50,18 @@ function escapeRegex(str: string): string {
     return str.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
 }
 
+/**
+ * 32-bit FNV-1a over the UTF-16 code units, as 8 hex digits: identifies the raw text
+ * a page in public/data/cleaned/ was cleaned from (scripts/clean_text.py)
+ */
+export function textFingerprint(text: string): string {
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash = Math.imul(hash ^ text.charCodeAt(i), 0x01000193) >>> 0;
+    }
+    return hash.toString(16).padStart(8, '0');
+}
+
 // ============================================================================
 // MAIN CLEANING FUNCTION
 // ============================================================================
@@ -116,6 +116,11 @@ export interface HtmlTableBlock {
 export interface ImageBlock {
     type: 'image';
     src: string;
+    /** Intrinsic size, so the figure reserves its space before it loads */
+    width?: number;
+    height?: number;
+    /** Responsive variants from scripts/optimize_images.py, preferred format first */
+    sources?: { type: string; srcSet: string }[];
     alt?: string;
     caption?: string;
     footnotes?: string[];